@@ -1147,11 +1147,12 @@ app.post('/api/recommend', isAuthenticated, async (req, res) => {
       exited: userProfile.exited ? 1 : 0
     };
 
-    // Call Python script using spawn for better error handling
+    // Call Python script using spawn for better error handling. One JSON
+    // argument, so description and username are read from its fields;
+    // with_trust attaches trust scores to every policy in the same process
     const pythonProcess = spawn(pythonpath, [
       path.join(__dirname, 'policy_recommend.py'),
-      JSON.stringify(userData),
-      username
+      JSON.stringify({ ...userData, with_trust: true })
     ], {
       cwd: __dirname
     });
@@ -1195,7 +1196,24 @@ app.post('/api/recommend', isAuthenticated, async (req, res) => {
 
         console.log('Policy prediction successful:', prediction);
         
-        // Initialize trust calculator
+        // Trust scores computed inline by policy_recommend.py need no second process
+        const scoredPolicies = Array.isArray(prediction.policies) ? prediction.policies : [];
+        if (scoredPolicies.length && scoredPolicies.every(policy => typeof policy.trust_score === 'number')) {
+          const enhancedPolicies = await enhancedTrustVerification(scoredPolicies, userData);
+
+          return res.json({
+            success: true,
+            message: "Policy recommendation generated successfully",
+            policies: enhancedPolicies.map(policy => ({
+              ...prepareEnhancedPolicyData(policy.name, userProfile),
+              trust_score: policy.trust_score,
+              confidence_level: policy.confidence_level,
+              interpretation: policy.interpretation
+            }))
+          });
+        }
+        
+        // Otherwise fall back to the separate trust calculator
         const trustCalculator = spawn(pythonpath, [
           path.join(__dirname, 'trust_policy.py'),
           JSON.stringify(userData),
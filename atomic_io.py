@@ -0,0 +1,38 @@
+"""File helpers shared by the on-disk caches and artifacts
+
+write_atomic() writes through a temporary file in the target's directory and
+renames it into place, so concurrent readers never see a partial file.
+source_signature() and file_sha256() describe a source file for freshness
+checks: mtime and size first, the content hash when those differ.
+"""
+
+import os
+import hashlib
+import tempfile
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_signature(path, with_hash=False):
+    """mtime/size of a file, plus its content hash when requested"""
+    stat = os.stat(path)
+    signature = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if with_hash:
+        signature['sha256'] = file_sha256(path)
+    return signature
+
+def write_atomic(path, write):
+    """Call write(tmp_path) on a temporary file, then move it over path"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""Benchmarks for the policy recommendation path on synthetic catalogs
+
+Usage:
+    python benchmark_recommend.py [quick]
+    python benchmark_recommend.py suite [--sizes 10 100 1000 10000 100000] [--output run.json]
+                                        [--baseline previous.json] [--tolerance 0.2]
+    python benchmark_recommend.py topk [--sizes 100 10000 100000] [--ks 1 5 20]
+    python benchmark_recommend.py ingest [--rows 1000000] [--reference-rows 100000]
+    python benchmark_recommend.py semantic [--sizes 1000 10000 100000] [--ks 1 5 20]
+    python benchmark_recommend.py features [--sizes 1000 10000 100000] [--append 100]
+
+The suite runs every (catalog size, matching method) case in a fresh process
+and reports cold start, per-query latency percentiles, throughput and peak
+RSS. With --baseline, cases slower than the previous run by more than the
+tolerance are listed as regressions and the exit status is 1.
+
+ingest checks that the vectorized catalog normalization matches clean_text
+and the per-text keyword matchers, then compares their throughput; the exit
+status is 1 on any mismatch.
+
+semantic checks that inverted-index candidate scoring returns exactly the
+brute-force cosine ranking, and compares their latency; the exit status is 1
+on any mismatch.
+
+quick, the default, runs the ingest and semantic parity checks on
+sbilife.xlsx in a few seconds; the exit status is 1 on any mismatch.
+
+features compares the TF-IDF and hashing semantic feature modes: ranking
+agreement on the main() test queries against sbilife.xlsx, and build time,
+index memory and append time on synthetic catalogs.
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import platform
+import resource
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import sklearn
+
+import policy_recommend
+
+BASE_VOCABULARY = [
+    'policy', 'plan', 'life', 'cover', 'protection', 'family', 'benefit', 'premium', 'returns',
+    'savings', 'guaranteed', 'investment', 'market', 'ulip', 'growth', 'pension', 'retirement',
+    'annuity', 'child', 'education', 'future', 'term', 'endowment', 'traditional', 'assured',
+    'money back', 'liquidity', 'bonus', 'maturity', 'death', 'income', 'tax', 'flexible', 'secure',
+    'wealth', 'fund', 'loyalty', 'rider', 'waiver', 'spouse', 'health', 'critical', 'illness'
+]
+
+def synthetic_vocabulary(size, rng):
+    """Base insurance terms plus pronounceable synthetic words"""
+    syllables = ['ka', 'ri', 'so', 'ne', 'lu', 'ta', 'mi', 'po', 've', 'da', 'shi', 'ro', 'ga', 'fe']
+    words = set(BASE_VOCABULARY)
+    while len(words) < size:
+        words.add(''.join(rng.choice(syllables, size=rng.integers(2, 5))))
+    return sorted(words)
+
+def synthetic_catalog(n_policies, seed=42, vocabulary_size=5000, words_per_field=30, zipf=True):
+    """Raw policy sheet with the same columns as sbilife.xlsx"""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(synthetic_vocabulary(vocabulary_size, rng))
+
+    # Zipf-like word frequencies, as in natural product descriptions; uniform
+    # frequencies give short posting lists, as in catalogs of distinct products
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1) if zipf else np.ones(len(vocabulary))
+    weights /= weights.sum()
+
+    def field():
+        words = rng.choice(vocabulary, size=(n_policies, words_per_field), p=weights)
+        return [' '.join(row) for row in words]
+
+    return pd.DataFrame({
+        'Policies': [f"SBI Life Synthetic Plan {i}" for i in range(n_policies)],
+        'Desc': field(),
+        'Why': field(),
+        'WhyGet': field()
+    })
+
+def synthetic_queries(n_queries, seed=7, rule_keywords=True):
+    """Customer-style queries; without rule keywords they exercise semantic scoring"""
+    rng = np.random.default_rng(seed)
+    if rule_keywords:
+        vocabulary = BASE_VOCABULARY
+    else:
+        rule_words = {keyword for keywords in policy_recommend.create_policy_categories().values() for keyword in keywords}
+        vocabulary = [word for word in BASE_VOCABULARY if not any(keyword in word for keyword in rule_words)]
+    return [
+        'I want a ' + ' '.join(rng.choice(vocabulary, size=rng.integers(2, 6))) + ' plan'
+        for _ in range(n_queries)
+    ]
+
+def latency_summary(samples_ms):
+    """Mean and percentile summary of per-query latencies in milliseconds"""
+    samples = np.asarray(samples_ms)
+    return {
+        'mean_ms': round(float(samples.mean()), 4),
+        'p50_ms': round(float(np.percentile(samples, 50)), 4),
+        'p95_ms': round(float(np.percentile(samples, 95)), 4),
+        'p99_ms': round(float(np.percentile(samples, 99)), 4)
+    }
+
+METHODS = ('rule_based', 'semantic_similarity', 'machine_learning')
+
+def peak_rss_mb():
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_case(size, method, n_queries, seed=42):
+    """One (catalog size, method) case; run in a fresh process for clean RSS"""
+    baseline_rss = peak_rss_mb()
+    raw = synthetic_catalog(size, seed=seed)
+
+    start = time.perf_counter()
+    df, policy_descriptions, label_encoder = policy_recommend.prepare_catalog(raw)
+    prepare_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    index = policy_recommend.PolicyCatalogIndex(df, persist_classifier=False)
+    if method == 'machine_learning':
+        index.get_classifier()
+    index_ms = (time.perf_counter() - start) * 1000
+
+    matchers = {
+        'rule_based': lambda query: policy_recommend.rule_based_match(query, df, policy_descriptions),
+        'semantic_similarity': lambda query: policy_recommend.enhanced_policy_matching(query, df, policy_descriptions, index=index),
+        'machine_learning': lambda query: policy_recommend.predict_policy_original(query, None, df, policy_descriptions, index=index)
+    }
+    match = matchers[method]
+    queries = synthetic_queries(n_queries, rule_keywords=(method == 'rule_based'))
+
+    match(queries[0])  # warm-up
+    samples_ms = []
+    total_start = time.perf_counter()
+    for query in queries:
+        start = time.perf_counter()
+        match(query)
+        samples_ms.append((time.perf_counter() - start) * 1000)
+    total_s = time.perf_counter() - total_start
+
+    return {
+        'catalog_size': size,
+        'method': method,
+        'queries': len(queries),
+        'cold_start_ms': round(prepare_ms + index_ms, 3),
+        'cold_start_breakdown_ms': {'prepare_catalog': round(prepare_ms, 3), 'build_index': round(index_ms, 3)},
+        'latency': latency_summary(samples_ms),
+        'throughput_qps': round(len(queries) / total_s, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'baseline_rss_mb': round(baseline_rss, 1),
+        'index_memory_bytes': index.memory_bytes()
+    }
+
+def benchmark_suite(sizes, n_queries, ml_max_size):
+    """Run all cases, each in its own spawned process"""
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for size in sizes:
+        for method in METHODS:
+            if method == 'machine_learning' and size > ml_max_size:
+                # One class per policy makes forest training infeasible at this size
+                results.append({'catalog_size': size, 'method': method, 'skipped': f'catalog larger than --ml-max-size {ml_max_size}'})
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_case, size, method, n_queries).result()
+            results.append(result)
+            print(f"n={size:>7} {method:<20} cold {result['cold_start_ms']:10.1f} ms  "
+                  f"p50 {result['latency']['p50_ms']:8.3f} ms  p99 {result['latency']['p99_ms']:8.3f} ms  "
+                  f"{result['throughput_qps']:9.1f} q/s  rss {result['peak_rss_mb']:7.1f} MB", file=sys.stderr)
+    return results
+
+REGRESSION_METRICS = {
+    'p50_ms': lambda result: result['latency']['p50_ms'],
+    'p99_ms': lambda result: result['latency']['p99_ms'],
+    'cold_start_ms': lambda result: result['cold_start_ms'],
+    'peak_rss_mb': lambda result: result['peak_rss_mb']
+}
+
+def find_regressions(results, baseline_results, tolerance):
+    """Metrics that grew by more than tolerance relative to the baseline run"""
+    previous = {(result['catalog_size'], result['method']): result for result in baseline_results}
+    regressions = []
+    for result in results:
+        before = previous.get((result['catalog_size'], result['method']))
+        if before is None or 'skipped' in before or 'skipped' in result:
+            continue
+        for metric, value in REGRESSION_METRICS.items():
+            old, new = value(before), value(result)
+            if old > 0 and new > old * (1 + tolerance):
+                regressions.append({
+                    'catalog_size': result['catalog_size'],
+                    'method': result['method'],
+                    'metric': metric,
+                    'baseline': old,
+                    'current': new,
+                    'change': round(new / old - 1, 3)
+                })
+    return regressions
+
+def environment():
+    """Versions and hardware the results were measured on"""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def benchmark_topk(sizes, ks, n_queries):
+    """Top-k latency of semantic matching and of the selection step alone"""
+    results = []
+    queries = synthetic_queries(n_queries, rule_keywords=False)
+
+    for size in sizes:
+        df, policy_descriptions, label_encoder = policy_recommend.prepare_catalog(synthetic_catalog(size))
+        index = policy_recommend.get_catalog_index(df)
+        similarity_vectors = [index.semantic_similarities(query) for query in queries]
+
+        for k in ks:
+            match_ms, argpartition_ms, argsort_ms = [], [], []
+            for query, similarities in zip(queries, similarity_vectors):
+                start = time.perf_counter()
+                policy_recommend.enhanced_policy_matching(query, df, policy_descriptions, index=index, top_k=k)
+                match_ms.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                policy_recommend.top_k_indices(similarities, k)
+                argpartition_ms.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                np.argsort(-similarities, kind='stable')[:k]
+                argsort_ms.append((time.perf_counter() - start) * 1000)
+
+            result = {
+                'catalog_size': size,
+                'k': k,
+                'queries': len(queries),
+                'matching': latency_summary(match_ms),
+                'selection_argpartition': latency_summary(argpartition_ms),
+                'selection_full_sort': latency_summary(argsort_ms)
+            }
+            results.append(result)
+            print(f"n={size:>7} k={k:>3}  match p50 {result['matching']['p50_ms']:8.3f} ms  "
+                  f"argpartition p50 {result['selection_argpartition']['p50_ms']:7.4f} ms  "
+                  f"full sort p50 {result['selection_full_sort']['p50_ms']:7.4f} ms", file=sys.stderr)
+    return results
+
+EDGE_TEXTS = [
+    '  Héllo  World ', 'ﬁxed ① return', 'ÀÉÎ Term  Plan', 'İstanbul', 'Pensión\u00a0plan',
+    '\t\x1c money \n back ', '', ' ', 'a\x00b', None, float('nan'), 12, 3.5
+]
+
+def ingest_stages_per_row(raw):
+    """Catalog normalization and keyword tagging one Python call per value"""
+    policies = raw['Policies'].apply(policy_recommend.clean_text)
+    why_get = raw['WhyGet'].fillna('').apply(policy_recommend.clean_text)
+    desc = raw['Desc'].fillna('').apply(policy_recommend.clean_text)
+    combined_text = policies + ' ' + why_get + ' ' + desc
+    categories = combined_text.apply(policy_recommend.get_policy_category)
+    rule_masks = [policy_recommend.RULE_MATCHER.mask(text) for text in combined_text]
+    return combined_text.tolist(), categories.tolist(), rule_masks
+
+def ingest_stages_vectorized(raw):
+    """The same stages as prepare_catalog runs them"""
+    policies = policy_recommend.clean_text_series(raw['Policies'])
+    why_get = policy_recommend.clean_text_series(raw['WhyGet'].fillna(''))
+    desc = policy_recommend.clean_text_series(raw['Desc'].fillna(''))
+    combined_text = (policies + ' ' + why_get + ' ' + desc).tolist()
+    matcher = policy_recommend.POLICY_CATEGORY_MATCHER
+    categories = matcher.first_names(matcher.masks(combined_text), 'general').tolist()
+    rule_masks = policy_recommend.RULE_MATCHER.masks(combined_text).tolist()
+    return combined_text, categories, rule_masks
+
+def ingest_mismatches(raw):
+    """Rows where the vectorized stages differ from the per-row ones"""
+    expected = ingest_stages_per_row(raw)
+    actual = ingest_stages_vectorized(raw)
+    return sum(
+        1 for row in range(len(raw))
+        if any(expected_stage[row] != actual_stage[row] for expected_stage, actual_stage in zip(expected, actual))
+    )
+
+def benchmark_ingest(rows, reference_rows):
+    """Parity and throughput of catalog normalization at scale"""
+    edge = pd.DataFrame({'Policies': EDGE_TEXTS, 'Desc': EDGE_TEXTS[::-1], 'Why': EDGE_TEXTS, 'WhyGet': EDGE_TEXTS})
+    sample = synthetic_catalog(20000, seed=11)
+    # Sprinkle accented and compatibility characters over the ASCII vocabulary
+    sample['Desc'] = sample['Desc'].str.replace('pension', 'Pensión', regex=False).str.replace('fi', 'ﬁ', regex=False)
+    parity = {
+        'edge_cases': {'rows': len(edge), 'mismatches': ingest_mismatches(edge)},
+        'synthetic': {'rows': len(sample), 'mismatches': ingest_mismatches(sample)}
+    }
+
+    raw = synthetic_catalog(rows)
+    reference = raw.iloc[:reference_rows]
+    start = time.perf_counter()
+    ingest_stages_per_row(reference)
+    per_row_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ingest_stages_vectorized(raw)
+    vectorized_s = time.perf_counter() - start
+
+    result = {
+        'parity': parity,
+        'per_row': {'rows': len(reference), 'seconds': round(per_row_s, 2), 'rows_per_s': round(len(reference) / per_row_s)},
+        'vectorized': {'rows': len(raw), 'seconds': round(vectorized_s, 2), 'rows_per_s': round(len(raw) / vectorized_s)}
+    }
+    print(f"per-row {result['per_row']['rows_per_s']:,} rows/s  vectorized {result['vectorized']['rows_per_s']:,} rows/s",
+          file=sys.stderr)
+    return result
+
+def semantic_case(index, queries, k):
+    """Full-scan and inverted-index latencies, and queries where their top k differ"""
+    threshold = policy_recommend.SEMANTIC_MIN_SIMILARITY
+    full_scan_ms, inverted_ms, mismatches = [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        similarities = index.semantic_similarities(query)
+        best = policy_recommend.top_k_indices(similarities, k)
+        full_scan_ms.append((time.perf_counter() - start) * 1000)
+        best = best[similarities[best] > threshold]
+
+        start = time.perf_counter()
+        indices, scores = index.semantic_candidates(query, k, min_score=threshold)
+        inverted_ms.append((time.perf_counter() - start) * 1000)
+
+        if not (np.array_equal(best, indices) and np.array_equal(similarities[best], scores)):
+            mismatches += 1
+    return full_scan_ms, inverted_ms, mismatches
+
+def benchmark_semantic(sizes, ks, n_queries):
+    """Parity and latency of inverted-index semantic matching against the full scan"""
+    results = []
+    for distribution in ('zipf', 'uniform'):
+        for size in sizes:
+            raw = synthetic_catalog(size, vocabulary_size=3000, words_per_field=12, zipf=distribution == 'zipf')
+            df, policy_descriptions, label_encoder = policy_recommend.prepare_catalog(raw)
+            index = policy_recommend.PolicyCatalogIndex(df, persist_classifier=False, features='tfidf')
+            rng = np.random.default_rng(size)
+            terms = list(index.semantic_vectorizer.vocabulary_)
+            queries = [' '.join(rng.choice(terms, size=rng.integers(2, 6))) for _ in range(n_queries)] + ['', 'zzz']
+
+            for k in ks:
+                full_scan_ms, inverted_ms, mismatches = semantic_case(index, queries, k)
+                result = {
+                    'words': distribution,
+                    'catalog_size': size,
+                    'k': k,
+                    'queries': len(queries),
+                    'mismatches': mismatches,
+                    'full_scan': latency_summary(full_scan_ms),
+                    'inverted_index': latency_summary(inverted_ms)
+                }
+                results.append(result)
+                print(f"{distribution:>7} n={size:>7} k={k:>3}  full scan p50 {result['full_scan']['p50_ms']:7.3f} ms  "
+                      f"inverted p50 {result['inverted_index']['p50_ms']:7.3f} ms  mismatches {mismatches}", file=sys.stderr)
+    return results
+
+def feature_mode_quality(k=5):
+    """Semantic rankings of both feature modes for the main() test queries"""
+    df, policy_descriptions, label_encoder = policy_recommend.load_and_prepare_data()
+    indexes = {features: policy_recommend.PolicyCatalogIndex(df, persist_classifier=False, features=features)
+               for features in ('tfidf', 'hashing')}
+
+    queries = []
+    for query in policy_recommend.TEST_QUERIES:
+        rankings = {}
+        for features, index in indexes.items():
+            rows, scores = index.semantic_candidates(query, k)
+            rankings[features] = [{'name': df['Policies'].iloc[row], 'score': round(float(score), 4)}
+                                  for row, score in zip(rows, scores)]
+        tfidf_names = [match['name'] for match in rankings['tfidf']]
+        hashing_names = [match['name'] for match in rankings['hashing']]
+        queries.append({
+            'query': query,
+            'top1_agrees': tfidf_names[:1] == hashing_names[:1],
+            f'overlap_at_{k}': len(set(tfidf_names) & set(hashing_names)) / max(len(tfidf_names), 1),
+            'rankings': rankings
+        })
+
+    return {
+        'policies': len(df),
+        'top1_agreement': sum(query['top1_agrees'] for query in queries) / len(queries),
+        f'mean_overlap_at_{k}': sum(query[f'overlap_at_{k}'] for query in queries) / len(queries),
+        'queries': queries
+    }
+
+def benchmark_features(sizes, n_append):
+    """Quality, memory and append cost of the TF-IDF and hashing feature modes"""
+    results = {'quality': feature_mode_quality(), 'scale': []}
+    quality = results['quality']
+    print(f"test queries: top-1 agreement {quality['top1_agreement']:.0%}  "
+          f"mean overlap@5 {quality['mean_overlap_at_5']:.0%}", file=sys.stderr)
+
+    for size in sizes:
+        raw = synthetic_catalog(size + n_append)
+        full_df, policy_descriptions, label_encoder = policy_recommend.prepare_catalog(raw)
+        df = full_df.iloc[:size].reset_index(drop=True)
+        for features in ('tfidf', 'hashing'):
+            index = policy_recommend.PolicyCatalogIndex(df, persist_classifier=False, features=features)
+            start = time.perf_counter()
+            old_rows = np.concatenate([np.arange(size), np.full(n_append, -1)])
+            appended = index.incremental(full_df, old_rows)
+            append_ms = (time.perf_counter() - start) * 1000
+
+            result = {
+                'features': features,
+                'catalog_size': size,
+                'build_ms': round(index.build_time_ms, 1),
+                'memory_mb': round(index.memory_bytes() / 2**20, 2),
+                'vectorizer_kb': round(len(pickle.dumps(index.semantic_vectorizer)) / 1024, 1),
+                'appended_rows': n_append,
+                'append_ms': round(append_ms, 1)
+            }
+            results['scale'].append(result)
+            print(f"{features:>7} n={size:>7}  build {result['build_ms']:9.1f} ms  memory {result['memory_mb']:7.2f} MB  "
+                  f"vectorizer {result['vectorizer_kb']:9.1f} KB  append {n_append} in {result['append_ms']:7.1f} ms", file=sys.stderr)
+    return results
+
+def quick_parity(ks=(1, 5, 20)):
+    """Ingest and semantic parity on sbilife.xlsx, small enough to run on every change"""
+    raw = policy_recommend.load_raw_catalog()
+    edge = pd.DataFrame({'Policies': EDGE_TEXTS, 'Desc': EDGE_TEXTS[::-1], 'Why': EDGE_TEXTS, 'WhyGet': EDGE_TEXTS})
+    mismatches = {
+        'ingest_sheet': ingest_mismatches(raw),
+        'ingest_edge_cases': ingest_mismatches(edge)
+    }
+
+    df, policy_descriptions, label_encoder = policy_recommend.prepare_catalog(raw.copy())
+    index = policy_recommend.PolicyCatalogIndex(df, persist_classifier=False, features='tfidf')
+    rng = np.random.default_rng(0)
+    terms = list(index.semantic_vectorizer.vocabulary_)
+    queries = policy_recommend.TEST_QUERIES + [text for text in EDGE_TEXTS if isinstance(text, str)]
+    queries += [' '.join(rng.choice(terms, size=rng.integers(1, 6))) for _ in range(200)]
+    for k in ks:
+        mismatches[f'semantic_k{k}'] = semantic_case(index, queries, k)[2]
+
+    result = {'policies': len(df), 'queries': len(queries), 'mismatches': mismatches}
+    print(f"n={len(df)}  {len(queries)} queries  mismatches {mismatches}", file=sys.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command')
+
+    quick = subparsers.add_parser('quick', help='Ingest and semantic parity on sbilife.xlsx (default)')
+    quick.add_argument('--output', help='Write results as JSON to this file')
+
+    suite = subparsers.add_parser('suite', help='Cold start, latency, throughput and RSS per method and catalog size')
+    suite.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000])
+    suite.add_argument('--queries', type=int, default=200)
+    suite.add_argument('--ml-max-size', type=int, default=1000,
+                       help='Largest catalog for the machine_learning method (one class per policy)')
+    suite.add_argument('--baseline', help='Previous suite JSON to compare against')
+    suite.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative slowdown before flagging')
+    suite.add_argument('--output', help='Write results as JSON to this file')
+
+    topk = subparsers.add_parser('topk', help='Top-k ranking latency across catalog sizes')
+    topk.add_argument('--sizes', type=int, nargs='+', default=[100, 10000, 100000])
+    topk.add_argument('--ks', type=int, nargs='+', default=[1, 5, 20])
+    topk.add_argument('--queries', type=int, default=200)
+    topk.add_argument('--output', help='Write results as JSON to this file')
+
+    ingest = subparsers.add_parser('ingest', help='Parity and throughput of catalog text normalization')
+    ingest.add_argument('--rows', type=int, default=1000000)
+    ingest.add_argument('--reference-rows', type=int, default=100000,
+                        help='Rows timed on the per-row reference path')
+    ingest.add_argument('--output', help='Write results as JSON to this file')
+
+    semantic = subparsers.add_parser('semantic', help='Parity and latency of inverted-index semantic matching')
+    semantic.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    semantic.add_argument('--ks', type=int, nargs='+', default=[1, 5, 20])
+    semantic.add_argument('--queries', type=int, default=200)
+    semantic.add_argument('--output', help='Write results as JSON to this file')
+
+    features = subparsers.add_parser('features', help='Compare the TF-IDF and hashing semantic feature modes')
+    features.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    features.add_argument('--append', type=int, default=100, help='Policies appended incrementally per catalog')
+    features.add_argument('--output', help='Write results as JSON to this file')
+
+    args = parser.parse_args()
+    if args.command is None:
+        args = parser.parse_args(['quick'])
+
+    report = {
+        'benchmark': args.command,
+        'timestamp': datetime.now().isoformat(),
+        'environment': environment()
+    }
+    if args.command == 'quick':
+        report['results'] = quick_parity()
+        report['mismatches'] = sum(report['results']['mismatches'].values())
+    elif args.command == 'suite':
+        report['results'] = benchmark_suite(args.sizes, args.queries, args.ml_max_size)
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            report['baseline'] = args.baseline
+            report['regressions'] = find_regressions(report['results'], baseline.get('results', []), args.tolerance)
+    elif args.command == 'topk':
+        report['results'] = benchmark_topk(args.sizes, args.ks, args.queries)
+    elif args.command == 'ingest':
+        report['results'] = benchmark_ingest(args.rows, args.reference_rows)
+        report['mismatches'] = sum(case['mismatches'] for case in report['results']['parity'].values())
+    elif args.command == 'features':
+        report['results'] = benchmark_features(args.sizes, args.append)
+    elif args.command == 'semantic':
+        report['results'] = benchmark_semantic(args.sizes, args.ks, args.queries)
+        report['mismatches'] = sum(result['mismatches'] for result in report['results'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    for regression in report.get('regressions', []):
+        print(f"REGRESSION n={regression['catalog_size']} {regression['method']} {regression['metric']}: "
+              f"{regression['baseline']} -> {regression['current']} (+{regression['change']:.0%})", file=sys.stderr)
+    if report.get('regressions') or report.get('mismatches'):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Benchmarks for trust score lookups in trust_policy.py
+
+Usage:
+    python benchmark_trust.py [quick]
+    python benchmark_trust.py lookup [--sizes 26 1000 100000] [--lookups 2000]
+    python benchmark_trust.py batch [--profiles 200000] [--parity-pairs 200000]
+    python benchmark_trust.py types [--adhoc 2000]
+
+lookup checks that PolicyScoreIndex returns the same scores as the previous
+pandas column scans for exact, partial, regex-like and unknown names, then
+compares their per-lookup latency. batch checks calculate_trust_scores_batch
+against calculate_trust_score pair by pair and reports pairs/s for both.
+types checks classify_policy_type against the previous chain of keyword
+scans for catalog and ad-hoc policies and times both. quick, the default,
+runs the three parity checks at small sizes on sbilife.xlsx in a few
+seconds. The exit status is 1 on any mismatch.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import numpy as np
+import pandas as pd
+
+from trust_policy import PolicyClassifierAndTrustCalculator, PolicyScoreIndex, SCORE_DEFAULTS, POLICY_TYPE_KEYWORDS, policy_type_of_text
+from benchmark_recommend import synthetic_catalog, latency_summary, environment
+
+def pandas_policy_scores(policy_data, policy_name):
+    """Reference: the lookup as get_policy_scores_from_excel did it with pandas"""
+    policy_name_lower = policy_name.lower()
+    exact_match = policy_data[policy_data['Policies'].str.lower() == policy_name_lower]
+    if not exact_match.empty:
+        policy_row = exact_match.iloc[0]
+    else:
+        partial_match = policy_data[policy_data['Policies'].str.lower().str.contains(policy_name_lower, na=False)]
+        if partial_match.empty:
+            return None
+        policy_row = partial_match.iloc[0]
+    return {
+        'transparency_score': float(policy_row.get('transparency_score', 0.8)),
+        'suitability_score': float(policy_row.get('suitability_score', 0.8)),
+        'financial_safety_score': float(policy_row.get('financial_safety_score', 0.85)),
+        'compliance_score': float(policy_row.get('compliance_score', 0.9)),
+        'policy_name': policy_row.get('Policies', policy_name),
+        'description': policy_row.get('Description', ''),
+        'combined_text': policy_row.get('Combined_Text', '')
+    }
+
+def indexed_policy_scores(index, policy_name):
+    """The same lookup through PolicyScoreIndex"""
+    policy_name_lower = policy_name.lower()
+    row = index.find_exact(policy_name_lower)
+    if row is None:
+        row = index.find_partial(policy_name_lower)
+    return None if row is None else index.scores(row, policy_name)
+
+def outcome(lookup, *args):
+    """Result or exception type, so raising lookups can be compared too"""
+    try:
+        return lookup(*args)
+    except Exception as e:
+        return type(e).__name__
+
+def policy_sheet(size):
+    """Trust sheet: sbilife.xlsx for 26, otherwise synthetic names with random scores"""
+    if size == 26:
+        with contextlib.redirect_stderr(open(os.devnull, 'w')):
+            return PolicyClassifierAndTrustCalculator().policy_data
+    rng = np.random.default_rng(size)
+    sheet = synthetic_catalog(size, vocabulary_size=200, words_per_field=3)
+    # Repeat some names so first-match order matters
+    sheet.loc[rng.choice(size, size // 50), 'Policies'] = sheet['Policies'].iloc[:size // 50].to_numpy()
+    for column in SCORE_DEFAULTS:
+        sheet[column] = rng.uniform(0.5, 1.0, size).round(3)
+    return sheet
+
+def lookup_names(policy_data, n_lookups, seed=0):
+    """Mix of exact, case-changed, partial, regex-like and unknown names"""
+    rng = np.random.default_rng(seed)
+    names = [name for name in policy_data['Policies'].tolist() if isinstance(name, str)]
+    picks = [names[i] for i in rng.integers(0, len(names), n_lookups)]
+    lookups = []
+    for position, name in enumerate(picks):
+        kind = position % 5
+        if kind == 0:
+            lookups.append(name)
+        elif kind == 1:
+            lookups.append(name.upper())
+        elif kind == 2:
+            start = rng.integers(0, max(len(name) - 6, 1))
+            lookups.append(name[start:start + 6])
+        elif kind == 3:
+            lookups.append(name.split()[-1] + ' unknown plan')
+        else:
+            lookups.append(name[:4] + '.*' + name[-2:])
+    return lookups + ['', 'sb', 'smart (', 'life+', 'ZZZ']
+
+def lookup_mismatches(policy_data, index, names):
+    """Names whose indexed lookup differs from the pandas scans"""
+    return [name for name in names
+            if outcome(pandas_policy_scores, policy_data, name) != outcome(indexed_policy_scores, index, name)]
+
+def benchmark_lookup(sizes, n_lookups):
+    results = []
+    for size in sizes:
+        policy_data = policy_sheet(size)
+        start = time.perf_counter()
+        index = PolicyScoreIndex(policy_data)
+        build_ms = (time.perf_counter() - start) * 1000
+        names = lookup_names(policy_data, n_lookups)
+        mismatches = lookup_mismatches(policy_data, index, names)
+
+        timings = {}
+        for label, lookup, target in (('pandas', pandas_policy_scores, policy_data), ('indexed', indexed_policy_scores, index)):
+            samples = []
+            for name in names[:min(len(names), 500 if size >= 100000 else len(names))]:
+                start = time.perf_counter()
+                outcome(lookup, target, name)
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[label] = latency_summary(samples)
+
+        result = {
+            'catalog_size': size,
+            'lookups': len(names),
+            'index_build_ms': round(build_ms, 2),
+            'mismatches': len(mismatches),
+            'mismatched_names': mismatches[:10],
+            'pandas': timings['pandas'],
+            'indexed': timings['indexed']
+        }
+        results.append(result)
+        print(f"n={size:>7}  pandas p50 {timings['pandas']['p50_ms']:8.3f} ms  indexed p50 {timings['indexed']['p50_ms']:7.4f} ms  "
+              f"build {build_ms:8.1f} ms  mismatches {len(mismatches)}", file=sys.stderr)
+    return results
+
+def keyword_policy_type(policy_name, policy_description=""):
+    """Reference: classify_policy_type as a chain of keyword scans"""
+    combined_text = f"{policy_name} {policy_description}".lower()
+    if any(keyword in combined_text for keyword in ['term', 'protection', 'cover', 'shield']):
+        return 'Term Insurance'
+    elif any(keyword in combined_text for keyword in ['ulip', 'investment', 'growth', 'market', 'fund']):
+        return 'ULIP'
+    elif any(keyword in combined_text for keyword in ['endowment', 'traditional', 'assured', 'guaranteed']):
+        return 'Endowment'
+    elif any(keyword in combined_text for keyword in ['pension', 'retirement', 'annuity']):
+        return 'Pension'
+    elif any(keyword in combined_text for keyword in ['child', 'education', 'future']):
+        return 'Child Plan'
+    elif any(keyword in combined_text for keyword in ['money back', 'return', 'savings']):
+        return 'Money Back'
+    elif any(keyword in combined_text for keyword in ['health', 'medical', 'critical']):
+        return 'Health Insurance'
+    else:
+        return 'General Insurance'
+
+def adhoc_policies(n_policies, seed=0):
+    """(name, description) pairs built from type keywords, their fragments and filler words"""
+    rng = np.random.default_rng(seed)
+    words = [keyword for keywords in POLICY_TYPE_KEYWORDS.values() for keyword in keywords]
+    words += ['Money Back', 'moneyback', 'Retire', 'ULIPs', 'Term', 'smart', 'plus', 'sbi', 'life', 'gold', 'saver', '']
+    return [
+        (' '.join(rng.choice(words, rng.integers(1, 4))), ' '.join(rng.choice(words, rng.integers(0, 6))))
+        for _ in range(n_policies)
+    ]
+
+def catalog_policies(sheet):
+    """(name, description) pairs of the sheet: names alone, then with each text column"""
+    catalog = [(name, '') for name in sheet['Policies'].tolist()]
+    for column in ('Desc', 'Why', 'WhyGet'):
+        if column in sheet.columns:
+            catalog += list(zip(sheet['Policies'].tolist(), sheet[column].tolist()))
+    return catalog
+
+def type_mismatches(calculator, catalog, adhoc):
+    """Catalog and ad-hoc policies classified differently from the keyword scans"""
+    mismatches = {
+        label: sum(keyword_policy_type(*policy) != calculator.classify_policy_type(*policy) for policy in policies)
+        for label, policies in (('catalog', catalog), ('adhoc', adhoc))
+    }
+    policy_type_of_text.cache_clear()
+    return mismatches
+
+def benchmark_types(n_adhoc):
+    with contextlib.redirect_stderr(open(os.devnull, 'w')):
+        calculator = PolicyClassifierAndTrustCalculator()
+    sheet = calculator.policy_data
+    catalog = catalog_policies(sheet)
+    adhoc = adhoc_policies(n_adhoc)
+    mismatches = type_mismatches(calculator, catalog, adhoc)
+    
+    def per_call_us(classify, policies, repeats):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for policy in policies:
+                classify(*policy)
+        return round((time.perf_counter() - start) / (repeats * len(policies)) * 1e6, 3)
+    
+    catalog_with_desc = catalog[len(sheet):] or catalog
+    result = {
+        'mismatches': mismatches,
+        'catalog_us': {
+            'keyword_scans': per_call_us(keyword_policy_type, catalog_with_desc, 200),
+            'precomputed': per_call_us(calculator.classify_policy_type, catalog_with_desc, 200)
+        },
+        'adhoc_us': {
+            'keyword_scans': per_call_us(keyword_policy_type, adhoc, 1),
+            'matcher_first_call': per_call_us(calculator.classify_policy_type, adhoc, 1),
+            'memoised_repeat': per_call_us(calculator.classify_policy_type, adhoc, 1)
+        }
+    }
+    print(f"catalog {result['catalog_us']}  adhoc {result['adhoc_us']}  mismatches {mismatches}", file=sys.stderr)
+    return result
+
+def random_profiles(n_profiles, seed=0):
+    """Profiles spread around every step boundary, some with missing or NaN fields"""
+    rng = np.random.default_rng(seed)
+    profiles = pd.DataFrame({
+        'age': rng.choice([18, 29, 30, 31, 45, 50, 51, 70], n_profiles),
+        'salary': rng.choice([10000, 29999.5, 30000, 50000, 100000, 100000.5, 250000], n_profiles),
+        'credit_score': rng.choice([500, 599, 600, 650, 750, 751, 820], n_profiles),
+        'balance': rng.choice([0, 49999, 50000, 100000, 200000, 200001, 1e6], n_profiles).astype(float)
+    })
+    profiles.loc[rng.random(n_profiles) < 0.05, 'balance'] = np.nan
+    return profiles
+
+def scalar_profile(profile):
+    """Profile dict as the scalar path sees it, NaN fields dropped to their defaults"""
+    return {field: value for field, value in profile.items() if not (isinstance(value, float) and np.isnan(value))}
+
+def batch_mismatches(calculator, policy_names, profiles, n_pairs, seed=0):
+    """Pairs where the batch result differs from calculate_trust_score"""
+    batch = calculator.calculate_trust_scores_batch(policy_names, profiles)
+    rng = np.random.default_rng(seed)
+    records = profiles.to_dict('records')
+    policy_rows = rng.integers(0, len(policy_names), n_pairs)
+    profile_columns = rng.integers(0, len(records), n_pairs)
+    score_cache = {}
+    mismatches = 0
+    for row, column in zip(policy_rows, profile_columns):
+        if row not in score_cache:
+            with contextlib.redirect_stderr(open(os.devnull, 'w')):
+                score_cache[row] = calculator.get_policy_scores_from_excel(policy_names[row])
+        expected = calculator.calculate_trust_score(score_cache[row], records[column])
+        if (expected['trust_score'] != batch['trust_score'][row, column]
+                or expected['confidence_level'] != batch['confidence_level'][row, column]
+                or expected['interpretation'] != batch['interpretation'][row, column]):
+            mismatches += 1
+    return mismatches
+
+def batch_parity(calculator, profiles, n_pairs, synthetic_size=1000):
+    """batch_mismatches on the real sheet, then on a synthetic sheet with
+    fine-grained scores to exercise rounding ties"""
+    mismatches = {'sheet': batch_mismatches(calculator, calculator.policy_data['Policies'].tolist(), profiles, n_pairs)}
+    synthetic = policy_sheet(synthetic_size)
+    for column in SCORE_DEFAULTS:
+        synthetic[column] = np.random.default_rng(1).integers(0, 10001, len(synthetic)) / 10000
+    real_data = calculator.policy_data
+    calculator.policy_data = synthetic
+    mismatches['synthetic'] = batch_mismatches(calculator, synthetic['Policies'].tolist(), profiles, n_pairs)
+    calculator.policy_data = real_data
+    return mismatches
+
+def benchmark_batch(n_profiles, n_parity_pairs):
+    with contextlib.redirect_stderr(open(os.devnull, 'w')):
+        calculator = PolicyClassifierAndTrustCalculator()
+    sheet_names = calculator.policy_data['Policies'].tolist()
+    profiles = random_profiles(n_profiles)
+    mismatches = batch_parity(calculator, profiles, n_parity_pairs)
+    
+    # Throughput: every sheet policy against every profile
+    start = time.perf_counter()
+    calculator.calculate_trust_scores_batch(sheet_names, profiles)
+    batch_seconds = time.perf_counter() - start
+    batch_pairs = len(sheet_names) * len(profiles)
+    
+    records = profiles.to_dict('records')[:20000]
+    with contextlib.redirect_stderr(open(os.devnull, 'w')):
+        policy_scores = [calculator.get_policy_scores_from_excel(name) for name in sheet_names]
+    start = time.perf_counter()
+    for scores in policy_scores:
+        for profile in records:
+            calculator.calculate_trust_score(scores, profile)
+    scalar_seconds = time.perf_counter() - start
+    scalar_pairs = len(policy_scores) * len(records)
+    
+    result = {
+        'parity_pairs': n_parity_pairs,
+        'mismatches': mismatches,
+        'scalar': {'pairs': scalar_pairs, 'pairs_per_s': round(scalar_pairs / scalar_seconds)},
+        'batch': {'pairs': batch_pairs, 'seconds': round(batch_seconds, 3), 'pairs_per_s': round(batch_pairs / batch_seconds)}
+    }
+    print(f"scalar {result['scalar']['pairs_per_s']:,} pairs/s  batch {result['batch']['pairs_per_s']:,} pairs/s  "
+          f"mismatches {mismatches}", file=sys.stderr)
+    return result
+
+def quick_parity(n_lookups=500, n_profiles=2000, n_adhoc=500):
+    """Lookup, batch and type parity on sbilife.xlsx, small enough to run on every change"""
+    with contextlib.redirect_stderr(open(os.devnull, 'w')):
+        calculator = PolicyClassifierAndTrustCalculator()
+    sheet = calculator.policy_data
+    mismatches = {'lookup': len(lookup_mismatches(sheet, PolicyScoreIndex(sheet), lookup_names(sheet, n_lookups)))}
+    for label, count in batch_parity(calculator, random_profiles(n_profiles), n_profiles, synthetic_size=200).items():
+        mismatches[f'batch_{label}'] = count
+    for label, count in type_mismatches(calculator, catalog_policies(sheet), adhoc_policies(n_adhoc)).items():
+        mismatches[f'types_{label}'] = count
+    result = {'policies': len(sheet), 'mismatches': mismatches}
+    print(f"n={len(sheet)}  mismatches {mismatches}", file=sys.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command')
+
+    quick = subparsers.add_parser('quick', help='Lookup, batch and type parity on sbilife.xlsx (default)')
+    quick.add_argument('--output', help='Write results as JSON to this file')
+
+    lookup = subparsers.add_parser('lookup', help='Parity and latency of policy score lookups')
+    lookup.add_argument('--sizes', type=int, nargs='+', default=[26, 1000, 100000])
+    lookup.add_argument('--lookups', type=int, default=2000)
+    lookup.add_argument('--output', help='Write results as JSON to this file')
+
+    batch = subparsers.add_parser('batch', help='Parity and throughput of batch trust scoring')
+    batch.add_argument('--profiles', type=int, default=200000)
+    batch.add_argument('--parity-pairs', type=int, default=200000)
+    batch.add_argument('--output', help='Write results as JSON to this file')
+
+    types = subparsers.add_parser('types', help='Parity and latency of policy type classification')
+    types.add_argument('--adhoc', type=int, default=2000)
+    types.add_argument('--output', help='Write results as JSON to this file')
+
+    args = parser.parse_args()
+    if args.command is None:
+        args = parser.parse_args(['quick'])
+
+    report = {'benchmark': args.command, 'environment': environment()}
+    if args.command == 'quick':
+        report['results'] = quick_parity()
+        report['mismatches'] = sum(report['results']['mismatches'].values())
+    elif args.command == 'lookup':
+        report['results'] = benchmark_lookup(args.sizes, args.lookups)
+        report['mismatches'] = sum(result['mismatches'] for result in report['results'])
+    elif args.command == 'batch':
+        report['results'] = benchmark_batch(args.profiles, args.parity_pairs)
+        report['mismatches'] = sum(report['results']['mismatches'].values())
+    elif args.command == 'types':
+        report['results'] = benchmark_types(args.adhoc)
+        report['mismatches'] = sum(report['results']['mismatches'].values())
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if report.get('mismatches'):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
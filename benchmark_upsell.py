@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Benchmarks for upsell model inference in upsell_predictor.py
+
+Usage:
+    python benchmark_upsell.py [quick]
+    python benchmark_upsell.py engine [--model path.pkl | --model synthetic] [--rows 20000] [--single 300]
+    python benchmark_upsell.py features [--model path.pkl | --model synthetic] [--rows 20000] [--single 300]
+
+engine checks that upsell_tree_engine's NumPy evaluation of the model gives
+the same probabilities (within --tolerance) and classes as the scikit-learn
+pipeline, then compares single-row latency and batch throughput of both,
+with and without preprocessing. --model synthetic fits a soft-voting random
+forest + gradient boosting ensemble on model_upsell/preprocessor.pkl for
+trees without the production model.
+
+features checks that upsell_features.FeatureEncoder rows equal the
+ColumnTransformer output (float64, and cast to float32) for
+model_upsell/preprocessor.pkl and the model's own preprocessing, on
+synthetic and edge-case customers, then compares per-customer feature
+preparation and single-row prediction latency with and without pandas.
+
+quick, the default, runs both parity checks without timings on a few
+thousand customers, against the upsell model when it is present and a small
+synthetic ensemble otherwise. The exit status is 1 on any mismatch.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import joblib
+import numpy as np
+import pandas as pd
+
+from upsell_artifact import MODEL_DIR, SOURCE_PATH, FEATURE_ORDER, load_artifact
+from upsell_tree_engine import export_model
+from upsell_features import FeatureEncoder, PREPROCESSOR_PATH
+import upsell_predictor
+from benchmark_recommend import latency_summary, environment
+
+def synthetic_customers(n_rows, seed=0):
+    """Random customers in the model's input columns"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'CreditScore': rng.integers(350, 850, n_rows),
+        'Geography': rng.choice(['France', 'Spain', 'Germany'], n_rows),
+        'Gender': rng.choice(['Male', 'Female'], n_rows),
+        'Age': rng.integers(18, 90, n_rows),
+        'Tenure': rng.integers(0, 11, n_rows),
+        'Balance': rng.uniform(0, 250000, n_rows),
+        'NumOfProducts': rng.integers(1, 5, n_rows),
+        'HasCrCard': rng.integers(0, 2, n_rows),
+        'IsActiveMember': rng.integers(0, 2, n_rows),
+        'EstimatedSalary': rng.uniform(0, 200000, n_rows),
+        'Exited': rng.integers(0, 2, n_rows)
+    }, columns=FEATURE_ORDER)
+
+def synthetic_pipeline(n_rows=5000, seed=0, n_trees=300, n_stages=50):
+    """Stand-in for the upsell model: the real preprocessor and a soft-voting tree ensemble"""
+    from sklearn.pipeline import Pipeline
+    from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
+    customers = synthetic_customers(n_rows, seed)
+    labels = (customers['Tenure'] // 2 + customers['NumOfProducts']) % 7
+    classifier = VotingClassifier([
+        ('rf', RandomForestClassifier(n_trees, random_state=seed)),
+        ('gb', GradientBoostingClassifier(n_estimators=n_stages, random_state=seed))
+    ], voting='soft')
+    preprocessor = joblib.load(os.path.join(MODEL_DIR, 'preprocessor.pkl'))
+    return Pipeline([('preprocessor', preprocessor), ('classifier', classifier)]).fit(customers, labels)
+
+def load_benchmark_model(model_path):
+    if model_path == 'synthetic':
+        return synthetic_pipeline()
+    with contextlib.redirect_stderr(open(os.devnull, 'w')):
+        return load_artifact(model_path)[0]
+
+def per_call_ms(function, inputs):
+    """Latency of function(x) for every x, in milliseconds"""
+    function(inputs[0])
+    samples = []
+    for x in inputs:
+        start = time.perf_counter()
+        function(x)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def rows_per_s(function, X, repeats=3):
+    """Best-of-repeats throughput of function over all rows of X"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(X)
+        best = min(best, time.perf_counter() - start)
+    return round(len(X) / best)
+
+def engine_mismatches(pipeline, engine, customers, tolerance):
+    """Per-row largest probability difference, and rows whose probabilities or class differ"""
+    difference = np.abs(pipeline.predict_proba(customers) - engine.predict_proba(customers)).max(axis=1)
+    class_mismatches = int(np.count_nonzero(pipeline.predict(customers) != engine.predict(customers)))
+    return difference, {'probabilities': int(np.count_nonzero(difference > tolerance)), 'classes': class_mismatches}
+
+def benchmark_engine(model_path, n_rows, n_single, tolerance):
+    pipeline = load_benchmark_model(model_path)
+    start = time.perf_counter()
+    engine = export_model(pipeline)
+    export_ms = (time.perf_counter() - start) * 1000
+    estimator = pipeline[-1] if hasattr(pipeline, 'steps') else pipeline
+
+    customers = synthetic_customers(n_rows, seed=1)
+    difference, mismatches = engine_mismatches(pipeline, engine, customers, tolerance)
+
+    single_rows = [customers.iloc[i:i + 1] for i in range(n_single)]
+    features = engine.transform(customers)
+    single_features = [features[i:i + 1] for i in range(n_single)]
+    result = {
+        'model': model_path,
+        'rows': n_rows,
+        'trees': engine.engine.n_trees,
+        'export_ms': round(export_ms, 2),
+        'max_abs_difference': float(difference.max()),
+        'tolerance': tolerance,
+        'mismatches': mismatches,
+        'single_row': {
+            'sklearn': latency_summary(per_call_ms(pipeline.predict_proba, single_rows)),
+            'numpy': latency_summary(per_call_ms(engine.predict_proba, single_rows)),
+            'sklearn_trees_only': latency_summary(per_call_ms(estimator.predict_proba, single_features)),
+            'numpy_trees_only': latency_summary(per_call_ms(engine.engine.predict_proba, single_features))
+        },
+        'batch_rows_per_s': {
+            'sklearn': rows_per_s(pipeline.predict_proba, customers),
+            'numpy': rows_per_s(engine.predict_proba, customers)
+        }
+    }
+    single = result['single_row']
+    print(f"single row p50: sklearn {single['sklearn']['p50_ms']} ms  numpy {single['numpy']['p50_ms']} ms "
+          f"(trees only {single['sklearn_trees_only']['p50_ms']} / {single['numpy_trees_only']['p50_ms']} ms)  "
+          f"batch: sklearn {result['batch_rows_per_s']['sklearn']:,} rows/s  numpy {result['batch_rows_per_s']['numpy']:,} rows/s  "
+          f"max diff {result['max_abs_difference']:.3g}  mismatches {mismatches}", file=sys.stderr)
+    return result
+
+def edge_case_customers():
+    """Inputs the encoder must treat exactly like the pipeline"""
+    return [
+        {},  # every field defaulted
+        {'Geography': 'Italy', 'Gender': 'Other'},  # unknown categories
+        {'Geography': '', 'Gender': 'male'},
+        {'Geography': 1, 'Gender': 0},  # numeric codes become '1' / '0'
+        {'CreditScore': 0, 'Age': 0, 'Balance': 0.0, 'EstimatedSalary': 0.0, 'NumOfProducts': 0},
+        {'CreditScore': 10 ** 9, 'Balance': 1e30, 'EstimatedSalary': -1e12, 'Tenure': -5},
+        {'Balance': 1e-300, 'EstimatedSalary': 123456.789012345678, 'HasCrCard': True, 'IsActiveMember': False},
+        {'CreditScore': '720', 'Age': '41', 'Balance': '1000.5'}  # strings as a JSON client may send them
+    ]
+
+def feature_mismatches(preprocessor, records):
+    """Rows where FeatureEncoder differs from preprocessor.transform, per output dtype"""
+    expected = preprocessor.transform(pd.DataFrame(records, columns=FEATURE_ORDER))
+    expected = np.asarray(expected.toarray() if hasattr(expected, 'toarray') else expected, dtype=np.float64)
+    mismatches = {}
+    for dtype in (np.float64, np.float32):
+        encoder = FeatureEncoder(preprocessor, dtype)
+        actual = np.vstack([encoder.encode(record) for record in records])
+        same = (actual == expected.astype(dtype)) | (np.isnan(actual) & np.isnan(expected))
+        mismatches[np.dtype(dtype).name] = int(np.count_nonzero(~same.all(axis=1)))
+    return mismatches
+
+def encoder_mismatches(pipeline, customers):
+    """Model inputs of customers plus the edge cases, and feature_mismatches for both preprocessors"""
+    records = [upsell_predictor.model_input(customer)
+               for customer in customers.to_dict('records') + edge_case_customers()]
+    preprocessors = {'preprocessor.pkl': joblib.load(PREPROCESSOR_PATH), 'model': pipeline[0]}
+    return records, {name: feature_mismatches(preprocessor, records) for name, preprocessor in preprocessors.items()}
+
+def benchmark_features(model_path, n_rows, n_single):
+    pipeline = load_benchmark_model(model_path)
+    customers = synthetic_customers(n_rows, seed=2)
+    records, mismatches = encoder_mismatches(pipeline, customers)
+
+    # Per customer: dict -> model input, then -> probabilities
+    encoder = FeatureEncoder.from_model(pipeline, np.float64)
+    engine = export_model(pipeline).without_preprocessing()
+    engine_encoder = FeatureEncoder.from_model(pipeline)
+    customers = customers.to_dict('records')[:n_single]
+    with contextlib.redirect_stderr(open(os.devnull, 'w')):
+        prepare = lambda customer: pipeline[0].transform(upsell_predictor.prepare_data_for_prediction(customer))
+        result = {
+            'model': model_path,
+            'rows': len(records),
+            'mismatches': mismatches,
+            'feature_prep': {
+                'pandas': latency_summary(per_call_ms(prepare, customers)),
+                'encoder': latency_summary(per_call_ms(lambda customer: encoder.encode(upsell_predictor.model_input(customer)), customers))
+            },
+            'single_row_predict_proba': {
+                'pandas_sklearn': latency_summary(per_call_ms(
+                    lambda customer: pipeline.predict_proba(upsell_predictor.prepare_data_for_prediction(customer)), customers)),
+                'encoder_sklearn': latency_summary(per_call_ms(
+                    lambda customer: pipeline[-1].predict_proba(encoder.encode(upsell_predictor.model_input(customer))), customers)),
+                'encoder_numpy': latency_summary(per_call_ms(
+                    lambda customer: engine.predict_proba(engine_encoder.encode(upsell_predictor.model_input(customer))), customers))
+            }
+        }
+    prep, predict = result['feature_prep'], result['single_row_predict_proba']
+    print(f"feature prep p50: pandas {prep['pandas']['p50_ms']} ms  encoder {prep['encoder']['p50_ms']} ms  "
+          f"predict_proba p50: pandas+sklearn {predict['pandas_sklearn']['p50_ms']} ms  "
+          f"encoder+sklearn {predict['encoder_sklearn']['p50_ms']} ms  encoder+numpy {predict['encoder_numpy']['p50_ms']} ms  "
+          f"mismatches {mismatches}", file=sys.stderr)
+    return result
+
+def quick_parity(model_path, n_rows=2000, tolerance=1e-9):
+    """Engine and encoder parity without timings, small enough to run on every change"""
+    if model_path == 'synthetic' or not os.path.exists(model_path):
+        model_path = 'synthetic'
+        pipeline = synthetic_pipeline(2000, n_trees=30, n_stages=10)
+    else:
+        pipeline = load_benchmark_model(model_path)
+    difference, engine = engine_mismatches(pipeline, export_model(pipeline), synthetic_customers(n_rows, seed=1), tolerance)
+    records, features = encoder_mismatches(pipeline, synthetic_customers(n_rows, seed=2))
+    result = {
+        'model': model_path,
+        'rows': n_rows,
+        'max_abs_difference': float(difference.max()),
+        'mismatches': {'engine': engine, 'features': features}
+    }
+    print(f"model {model_path}  max diff {result['max_abs_difference']:.3g}  mismatches {result['mismatches']}", file=sys.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command')
+
+    quick = subparsers.add_parser('quick', help='Engine and feature parity on a few thousand customers (default)')
+    quick.add_argument('--model', default=SOURCE_PATH, help="Upsell model .pkl, or 'synthetic'; synthetic if it is missing")
+    quick.add_argument('--output', help='Write results as JSON to this file')
+
+    engine = subparsers.add_parser('engine', help='Parity, latency and throughput of the NumPy tree engine')
+    engine.add_argument('--model', default=SOURCE_PATH, help="Upsell model .pkl, or 'synthetic'")
+    engine.add_argument('--rows', type=int, default=20000)
+    engine.add_argument('--single', type=int, default=300, help='Rows timed one at a time')
+    engine.add_argument('--tolerance', type=float, default=1e-9)
+    engine.add_argument('--output', help='Write results as JSON to this file')
+
+    features = subparsers.add_parser('features', help='Parity and latency of pandas-free feature encoding')
+    features.add_argument('--model', default=SOURCE_PATH, help="Upsell model .pkl, or 'synthetic'")
+    features.add_argument('--rows', type=int, default=20000)
+    features.add_argument('--single', type=int, default=300, help='Customers timed one at a time')
+    features.add_argument('--output', help='Write results as JSON to this file')
+
+    args = parser.parse_args()
+    if args.command is None:
+        args = parser.parse_args(['quick'])
+
+    report = {'benchmark': args.command, 'environment': environment()}
+    if args.command == 'quick':
+        report['results'] = quick_parity(args.model)
+        mismatches = report['results']['mismatches']
+        report['mismatches'] = (sum(mismatches['engine'].values())
+                                + sum(sum(counts.values()) for counts in mismatches['features'].values()))
+    elif args.command == 'engine':
+        report['results'] = benchmark_engine(args.model, args.rows, args.single, args.tolerance)
+        report['mismatches'] = sum(report['results']['mismatches'].values())
+    elif args.command == 'features':
+        report['results'] = benchmark_features(args.model, args.rows, args.single)
+        report['mismatches'] = sum(sum(counts.values()) for counts in report['results']['mismatches'].values())
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if report.get('mismatches'):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
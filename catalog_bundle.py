@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Compiled binary bundle of the policy catalog in sbilife.xlsx
+
+Parsing the workbook with openpyxl is the slowest step of every cold start,
+so the sheet is compiled once into a joblib bundle next to it. The bundle
+holds the raw sheet (including any trust score columns), the cleaned and
+categorised catalog used for matching, and the label encoding. Numeric
+arrays are stored uncompressed so they can be memory-mapped.
+
+The bundle is rebuilt automatically when the workbook or the code that
+prepares it changes. It counts as fresh when the SHA-256 of the preparation
+sources matches and the workbook's mtime and size match, or, failing that,
+its SHA-256.
+
+Usage:
+    python catalog_bundle.py build     # compile sbilife.xlsx now
+    python catalog_bundle.py report    # compare cold-start load times
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import functools
+import subprocess
+import pandas as pd
+import joblib
+
+import timing
+from atomic_io import file_sha256, source_signature, write_atomic
+
+EXCEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sbilife.xlsx')
+BUNDLE_VERSION = 2
+
+# Modules whose code prepares the catalog; editing one invalidates every bundle
+PREPARATION_SOURCES = ['policy_recommend.py', 'keyword_matcher.py']
+
+def bundle_path_for(excel_path):
+    """Bundle file that belongs to a workbook"""
+    return os.path.splitext(excel_path)[0] + '.bundle.joblib'
+
+def bundle_enabled():
+    """The bundle can be bypassed with CATALOG_BUNDLE_DISABLED=1"""
+    return os.environ.get('CATALOG_BUNDLE_DISABLED', '') not in ('1', 'true', 'yes')
+
+@functools.lru_cache(maxsize=None)
+def preparation_digest():
+    """SHA-256 over the hashes of PREPARATION_SOURCES, computed once per process"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    digests = [file_sha256(os.path.join(directory, name)) for name in PREPARATION_SOURCES]
+    return hashlib.sha256(' '.join(digests).encode('ascii')).hexdigest()
+
+def is_fresh(bundle, excel_path):
+    """Whether a loaded bundle still describes the workbook on disk and the preparation code"""
+    if bundle.get('bundle_version') != BUNDLE_VERSION or bundle.get('preparation_digest') != preparation_digest():
+        return False
+    source = bundle.get('source', {})
+    current = source_signature(excel_path)
+    if current['mtime_ns'] == source.get('mtime_ns') and current['size'] == source.get('size'):
+        return True
+    # Touched or copied without a content change still counts as fresh
+    return current['size'] == source.get('size') and file_sha256(excel_path) == source.get('sha256')
+
+def compile_catalog(excel_path=EXCEL_PATH):
+    """Parse the workbook and derive everything the loaders need"""
+    # Imported lazily so loading a fresh bundle does not pull in scikit-learn
+    from policy_recommend import prepare_catalog
+
+    signature = source_signature(excel_path, with_hash=True)
+    raw = pd.read_excel(excel_path)
+    prepared, policy_descriptions, label_encoder = prepare_catalog(raw.copy())
+
+    return {
+        'bundle_version': BUNDLE_VERSION,
+        'preparation_digest': preparation_digest(),
+        'source': signature,
+        'raw': raw,
+        'prepared': prepared,
+        'label_classes': label_encoder.classes_,
+        'catalog_fingerprint': prepared.attrs.get('catalog_fingerprint')
+    }
+
+def build_bundle(excel_path=EXCEL_PATH, bundle_path=None):
+    """Compile the workbook and write the bundle atomically"""
+    bundle_path = bundle_path or bundle_path_for(excel_path)
+    bundle = compile_catalog(excel_path)
+
+    try:
+        write_atomic(bundle_path, lambda path: joblib.dump(bundle, path))
+    except Exception as e:
+        timing.warning("Catalog bundle write error: %s", str(e))
+
+    return bundle
+
+# Bundles already loaded by this process, so the raw and prepared loaders share one load
+_LOADED_BUNDLES = {}
+
+def load_bundle(excel_path=EXCEL_PATH, bundle_path=None):
+    """Fresh bundle for the workbook, rebuilding it from Excel only when stale"""
+    if not os.path.exists(excel_path):
+        raise FileNotFoundError(f"Excel file not found at: {excel_path}")
+    if not bundle_enabled():
+        return compile_catalog(excel_path)
+
+    bundle_path = bundle_path or bundle_path_for(excel_path)
+    bundle = _LOADED_BUNDLES.get(bundle_path)
+    if bundle is not None and is_fresh(bundle, excel_path):
+        return bundle
+
+    bundle = None
+    if os.path.exists(bundle_path):
+        try:
+            bundle = joblib.load(bundle_path, mmap_mode='r')
+            if not is_fresh(bundle, excel_path):
+                timing.info("Catalog bundle at %s is stale, rebuilding", bundle_path)
+                bundle = None
+        except Exception as e:
+            timing.warning("Catalog bundle load error: %s", str(e))
+            bundle = None
+
+    if bundle is None:
+        bundle = build_bundle(excel_path, bundle_path)
+    _LOADED_BUNDLES[bundle_path] = bundle
+    return bundle
+
+def load_raw_catalog(excel_path=EXCEL_PATH):
+    """Raw policy sheet exactly as pd.read_excel returns it"""
+    if not bundle_enabled():
+        return pd.read_excel(excel_path)
+    # Shallow copy: callers may add columns without touching the mapped arrays
+    return load_bundle(excel_path)['raw'].copy(deep=False)
+
+def load_prepared_catalog(excel_path=EXCEL_PATH):
+    """(prepared DataFrame, label classes) for the matching code"""
+    bundle = load_bundle(excel_path)
+    prepared = bundle['prepared'].copy(deep=False)
+    prepared.attrs['catalog_fingerprint'] = bundle['catalog_fingerprint']
+    return prepared, bundle['label_classes']
+
+COLD_START_SNIPPETS = {
+    'policy_recommend': "import policy_recommend; policy_recommend.load_and_prepare_data()",
+    'trust_policy': "import trust_policy; trust_policy.PolicyClassifierAndTrustCalculator()"
+}
+
+def cold_start_ms(snippet, bundle_disabled, repeats=3):
+    """Best wall time of a fresh interpreter running snippet"""
+    env = dict(os.environ, CATALOG_BUNDLE_DISABLED='1' if bundle_disabled else '0')
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', snippet], cwd=os.path.dirname(EXCEL_PATH), env=env,
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def load_ms(load, repeats):
+    """Best in-process time of one catalog load"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def load_bundle_uncached(excel_path=EXCEL_PATH):
+    """load_bundle as a new process sees it, without this process's loaded bundles"""
+    _LOADED_BUNDLES.clear()
+    return load_bundle(excel_path)
+
+def report(repeats=3):
+    """Catalog load and process cold-start times, Excel versus the bundle"""
+    build_bundle()
+    results = {
+        'catalog_load': {
+            'excel_ms': round(load_ms(lambda: compile_catalog(EXCEL_PATH), repeats), 1),
+            'bundle_ms': round(load_ms(lambda: load_bundle_uncached(EXCEL_PATH), repeats), 1)
+        }
+    }
+    for name, snippet in COLD_START_SNIPPETS.items():
+        excel_ms = cold_start_ms(snippet, bundle_disabled=True, repeats=repeats)
+        bundle_ms = cold_start_ms(snippet, bundle_disabled=False, repeats=repeats)
+        results[f'{name}_cold_start'] = {'excel_ms': round(excel_ms, 1), 'bundle_ms': round(bundle_ms, 1)}
+    return results
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    if command == 'build':
+        start = time.perf_counter()
+        bundle = build_bundle()
+        print(json.dumps({
+            'bundle_path': bundle_path_for(EXCEL_PATH),
+            'policies': len(bundle['raw']),
+            'build_ms': round((time.perf_counter() - start) * 1000, 1)
+        }))
+    elif command == 'report':
+        print(json.dumps(report(), indent=2))
+    else:
+        raise SystemExit(__doc__)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Hot reload of the policy catalog with incremental rebuilds
+
+A CatalogWatcher polls sbilife.xlsx. When the workbook changes, it diffs
+rows by content hash against the current snapshot. Only added or edited
+rows are re-cleaned and re-categorised; unchanged rows reuse their prepared
+text and trust scores. The semantic index matches a full build: TF-IDF
+indexes are refitted, hashing indexes reuse unchanged vectors. The new CatalogSnapshot is
+published with a single attribute assignment, so in-flight requests keep the
+snapshot they started with and are never blocked by a rebuild.
+"""
+
+import time
+import threading
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+import timing
+import policy_recommend
+from catalog_bundle import EXCEL_PATH, load_raw_catalog
+from atomic_io import source_signature
+from trust_policy import policy_score_rows
+
+CatalogSnapshot = namedtuple('CatalogSnapshot', [
+    'df',                   # prepared catalog used by the matchers
+    'policy_descriptions',  # cleaned policy name -> reason text
+    'label_encoder',
+    'index',                # PolicyCatalogIndex for this version
+    'trust_scores',         # (n_rows, 4) trust sheet scores of each row, aligned with df
+    'trust_rows',           # cleaned policy name -> row of trust_scores
+    'version',              # catalog fingerprint
+    'raw_columns',
+    'row_hashes',           # content hash of each raw row, aligned with df
+    'row_digests',          # fingerprint digest of each prepared row
+    'source',               # workbook mtime/size the snapshot was built from
+    'refit_rows',           # rows re-prepared since the last full build
+    'raw'                   # raw policy sheet, aligned with df
+])
+
+def raw_row_hashes(raw):
+    """64-bit content hash of every raw row"""
+    return pd.util.hash_pandas_object(raw, index=False).to_numpy()
+
+def build_snapshot(raw, source):
+    """Full build of a snapshot from a raw policy sheet"""
+    df, policy_descriptions, label_encoder = policy_recommend.prepare_catalog(raw.copy())
+    row_digests = policy_recommend.policy_row_digests(df)
+    df.attrs['catalog_fingerprint'] = policy_recommend.catalog_fingerprint(df, row_digests)
+    index = policy_recommend.register_catalog_index(policy_recommend.PolicyCatalogIndex(df))
+    return CatalogSnapshot(
+        df=df,
+        policy_descriptions=policy_descriptions,
+        label_encoder=label_encoder,
+        index=index,
+        trust_scores=policy_score_rows(raw),
+        trust_rows=policy_recommend.trust_name_rows(df, raw),
+        version=df.attrs['catalog_fingerprint'],
+        raw_columns=list(raw.columns),
+        row_hashes=raw_row_hashes(raw),
+        row_digests=row_digests,
+        source=source,
+        refit_rows=0,
+        raw=raw
+    )
+
+def update_snapshot(snapshot, raw, source, full_rebuild_ratio=0.25):
+    """New snapshot for an edited sheet, rebuilding only the changed rows
+
+    Falls back to a full build when the columns change or when the rows
+    re-prepared since the last full build exceed full_rebuild_ratio of the
+    catalog. Either way the matchers answer as a full build of raw would.
+    """
+    if list(raw.columns) != snapshot.raw_columns:
+        return build_snapshot(raw, source)
+
+    # Match each new row to an unused identical old row by content hash
+    available = {}
+    for old_row, row_hash in enumerate(snapshot.row_hashes):
+        available.setdefault(row_hash, []).append(old_row)
+    new_hashes = raw_row_hashes(raw)
+    old_rows = np.array([
+        available[row_hash].pop(0) if available.get(row_hash) else -1
+        for row_hash in new_hashes
+    ], dtype=np.int64)
+    changed = np.flatnonzero(old_rows < 0)
+
+    refit_rows = snapshot.refit_rows + len(changed)
+    if refit_rows > full_rebuild_ratio * max(len(raw), 1):
+        return build_snapshot(raw, source)
+
+    # Prepare only the changed rows, then splice them between reused rows
+    changed_raw = raw.iloc[changed].reset_index(drop=True)
+    changed_df = policy_recommend.prepare_catalog(changed_raw.copy())[0] if len(changed) else snapshot.df.iloc[:0]
+    source_rows = old_rows.copy()
+    source_rows[changed] = len(snapshot.df) + np.arange(len(changed))
+    df = pd.concat([snapshot.df, changed_df], ignore_index=True).iloc[source_rows].reset_index(drop=True)
+
+    label_encoder = LabelEncoder()
+    df['Policy_Label'] = label_encoder.fit_transform(df['Policies'])
+    policy_descriptions = dict(zip(df['Policies'], df['WhyGet']))
+
+    changed_digests = policy_recommend.policy_row_digests(changed_df)
+    row_digests = [
+        snapshot.row_digests[old_row] if old_row >= 0 else changed_digests[position]
+        for position, old_row in zip(np.cumsum(old_rows < 0) - 1, old_rows)
+    ]
+    df.attrs['catalog_fingerprint'] = policy_recommend.catalog_fingerprint(df, row_digests)
+
+    index = policy_recommend.register_catalog_index(snapshot.index.incremental(df, old_rows))
+
+    trust_scores = np.concatenate([snapshot.trust_scores, policy_score_rows(changed_raw)])[source_rows]
+
+    return CatalogSnapshot(
+        df=df,
+        policy_descriptions=policy_descriptions,
+        label_encoder=label_encoder,
+        index=index,
+        trust_scores=trust_scores,
+        trust_rows=policy_recommend.trust_name_rows(df, raw),
+        version=df.attrs['catalog_fingerprint'],
+        raw_columns=list(raw.columns),
+        row_hashes=new_hashes,
+        row_digests=row_digests,
+        source=source,
+        refit_rows=refit_rows,
+        raw=raw
+    )
+
+class CatalogWatcher:
+    """Keeps an up-to-date CatalogSnapshot of the workbook
+
+    Readers take watcher.snapshot once per request and use it throughout;
+    refresh() publishes a replacement atomically. start() polls in a daemon
+    thread every poll_interval seconds.
+    """
+
+    def __init__(self, excel_path=EXCEL_PATH, poll_interval=5.0, full_rebuild_ratio=0.25):
+        self.excel_path = excel_path
+        self.poll_interval = poll_interval
+        self.full_rebuild_ratio = full_rebuild_ratio
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        source = source_signature(excel_path)
+        self.snapshot = build_snapshot(load_raw_catalog(excel_path), source)
+
+    def refresh(self):
+        """Rebuild the snapshot if the workbook changed; returns True on reload"""
+        with self._refresh_lock:
+            current = self.snapshot
+            source = source_signature(self.excel_path)
+            if source == current.source:
+                return False
+
+            start = time.perf_counter()
+            raw = pd.read_excel(self.excel_path)
+            self.snapshot = update_snapshot(current, raw, source, self.full_rebuild_ratio)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            timing.info("Reloaded catalog (%d policies, version %s) in %.1f ms",
+                        len(raw), self.snapshot.version[:12], elapsed_ms)
+            return True
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the last good snapshot
+                timing.warning("Catalog reload error: %s", str(e))
+
+    def start(self):
+        """Start polling for changes in a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name='catalog-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -2,6 +2,65 @@ import joblib
 import sklearn
 import sys
 import os
+import json
+import subprocess
+
+from upsell_artifact import SOURCE_PATH, artifact_paths, load_artifact
+
+# Each load is measured in a fresh interpreter so RSS starts from the same imports
+LOAD_SNIPPETS = {
+    'pickle': "import joblib; model = joblib.load({source!r})",
+    'artifact': "import joblib; model = joblib.load({artifact!r}, mmap_mode='r')"
+}
+MEASURE = """
+import json, time
+import sklearn, pandas as pd
+from upsell_artifact import FEATURE_ORDER
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+
+before = rss_kb()
+start = time.perf_counter()
+{load}
+load_ms = (time.perf_counter() - start) * 1000
+after_load = rss_kb()
+row = pd.DataFrame([[600, 'France', 'Male', 30, 5, 50000.0, 2, 0, 1, 100000.0, 0]], columns=FEATURE_ORDER)
+start = time.perf_counter()
+model.predict_proba(row)
+predict_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{'load_ms': round(load_ms, 2), 'first_predict_ms': round(predict_ms, 2),
+                  'rss_load_kb': after_load - before, 'rss_after_predict_kb': rss_kb() - before}}))
+"""
+
+def measure_load(snippet, repeats=3):
+    """Best load of repeats fresh processes, with the RSS growth it caused"""
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', MEASURE.format(load=snippet)], check=True,
+                                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        runs.append(json.loads(output.stdout))
+    return min(runs, key=lambda run: run['load_ms'])
+
+def load_report(source_path=SOURCE_PATH):
+    """Load time and RSS of the original .pkl versus the canonical artifact"""
+    load_artifact(source_path)
+    artifact_path = artifact_paths(source_path)[0]
+    report = {
+        'sizes_kb': {
+            'pickle': os.path.getsize(source_path) // 1024,
+            'artifact': os.path.getsize(artifact_path) // 1024
+        }
+    }
+    for name, snippet in LOAD_SNIPPETS.items():
+        report[name] = measure_load(snippet.format(source=source_path, artifact=artifact_path))
+    return report
+
+if len(sys.argv) > 1 and sys.argv[1] == '--load-report':
+    source_path = sys.argv[2] if len(sys.argv) > 2 else SOURCE_PATH
+    print(json.dumps(load_report(source_path), indent=2))
+    sys.exit(0)
 
 try:
     print(f"Current scikit-learn version: {sklearn.__version__}")
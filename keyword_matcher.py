@@ -0,0 +1,113 @@
+"""Substring keyword matching of many keyword groups in one regex pass per text"""
+
+import re
+import bisect
+from itertools import accumulate
+import numpy as np
+
+SEPARATOR = '\x00'
+
+class KeywordMatcher:
+    """Match several keyword groups in one compiled regex pass
+
+    Each group gets one bit, and mask(text) returns the bits of every group
+    that has a keyword in the text. This gives the same result as running
+    any(keyword in text for keyword in keywords) for each group, including
+    when one keyword is a substring of another (e.g. 'term' in 'retirement').
+    """
+
+    def __init__(self, groups):
+        """groups: ordered mapping of group name -> list of keywords"""
+        self.groups = list(groups)
+        self.bits = {name: 1 << position for position, name in enumerate(self.groups)}
+
+        self._keyword_masks = keyword_masks = {}
+        for name, keywords in groups.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                keyword_masks[keyword] = keyword_masks.get(keyword, 0) | self.bits[name]
+
+        # The lookahead reports the longest keyword starting at each position,
+        # so a reported keyword also implies every keyword that is its prefix
+        self._masks = {}
+        for keyword in keyword_masks:
+            mask = 0
+            for other, other_mask in keyword_masks.items():
+                if keyword.startswith(other):
+                    mask |= other_mask
+            self._masks[keyword] = mask
+
+        alternation = '|'.join(re.escape(keyword) for keyword in sorted(keyword_masks, key=len, reverse=True))
+        self._pattern = re.compile(f'(?=({alternation}))')
+
+        # One pattern per group, for first_match()
+        self._group_patterns = [
+            (name, re.compile('|'.join(re.escape(keyword.lower()) for keyword in keywords)))
+            for name, keywords in groups.items() if keywords
+        ]
+
+    def mask(self, text):
+        """Bitmask of the groups with at least one keyword in text"""
+        mask = 0
+        for match in self._pattern.finditer(str(text).lower()):
+            mask |= self._masks[match.group(1)]
+        return mask
+
+    def masks(self, texts, chunk_size=50000):
+        """Bitmasks for many texts as an int64 array
+
+        Each chunk of texts is joined with NUL separators and every keyword
+        is searched across the chunk with str.find, skipping to the next text
+        after each hit; keywords never contain NUL, so a hit maps back to
+        exactly one text. Chunks with a NUL in their text fall back to mask().
+        """
+        texts = [str(text).lower() for text in texts]
+        masks = np.zeros(len(texts), dtype=np.int64)
+        for start in range(0, len(texts), chunk_size):
+            chunk = texts[start:start + chunk_size]
+            joined = SEPARATOR.join(chunk)
+            if joined.count(SEPARATOR) != len(chunk) - 1:
+                masks[start:start + len(chunk)] = [self.mask(text) for text in chunk]
+                continue
+            ends = list(accumulate(len(text) + 1 for text in chunk))
+            chunk_masks = masks[start:start + len(chunk)]
+            for keyword, mask in self._keyword_masks.items():
+                rows = []
+                position = joined.find(keyword)
+                while position >= 0:
+                    row = bisect.bisect_right(ends, position)
+                    rows.append(row)
+                    position = joined.find(keyword, ends[row])
+                chunk_masks[rows] |= mask
+        return masks
+
+    def names(self, mask):
+        """Group names set in mask, in group order"""
+        return [name for name in self.groups if mask & self.bits[name]]
+
+    def first(self, mask, default=None):
+        """First group set in mask, following group precedence"""
+        for name in self.groups:
+            if mask & self.bits[name]:
+                return name
+        return default
+
+    def first_match(self, text, default=None):
+        """First group with a keyword in text, searching groups in precedence order
+
+        Same result as first(mask(text)), but stops at the first matching
+        group, which is faster for a single short text.
+        """
+        text = str(text).lower()
+        for name, pattern in self._group_patterns:
+            if pattern.search(text):
+                return name
+        return default
+
+    def first_names(self, masks, default=None):
+        """first() for an array of masks, as an object array of names"""
+        masks = np.asarray(masks, dtype=np.int64)
+        names = np.array(self.groups + [default], dtype=object)
+        lowest_bit = masks & -masks
+        positions = np.where(masks == 0, len(self.groups), np.log2(np.maximum(lowest_bit, 1)).astype(np.int64))
+        return names[positions]
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
+import timing  # first, so its import time marks the process start
 import sys
 import json
 from trust_policy import PolicyClassifierAndTrustCalculator
 
 def main():
+    timing.record_import()
     try:
         if len(sys.argv) != 2:
             raise ValueError("Usage: python policy_classifier.py '<json_data>'")
@@ -15,17 +17,19 @@ def main():
         user_profile = input_data.get('user_profile', {})
         
         # Initialize classifier
-        classifier = PolicyClassifierAndTrustCalculator()
+        with timing.span('data_load'):
+            classifier = PolicyClassifierAndTrustCalculator()
         
         # Get enhanced trust scores
-        result = classifier.get_enhanced_trust_scores(
-            policy_name=policy_name,
-            policy_description=policy_description,
-            user_profile=user_profile
-        )
+        with timing.span('inference'):
+            result = classifier.get_enhanced_trust_scores(
+                policy_name=policy_name,
+                policy_description=policy_description,
+                user_profile=user_profile
+            )
         
-        # Output result as JSON
-        print(json.dumps(result))
+        # Output result as JSON, with per-stage timings when requested
+        print(timing.dumps(result, timing.requested(input_data)))
         
     except Exception as e:
         error_result = {
@@ -1,59 +1,57 @@
 # Enhanced policy_recommend.py with better classification
 
+import timing  # first, so its import time marks the process start
 import sys
 import os
+import csv
+import argparse
+from collections import deque
 import pandas as pd
-import sqlite3
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import LabelEncoder, normalize
 import unicodedata
 import re
 import json
+import time
+import copy
+import pickle
+import hashlib
 import traceback
 import numpy as np
+import scipy.sparse as sp
+import joblib
+import sklearn
+from keyword_matcher import KeywordMatcher
+from profile_repository import get_profile_repository
+from catalog_bundle import load_prepared_catalog, load_raw_catalog
+from atomic_io import write_atomic
+from recommend_cache import get_recommendation_cache
 
 def get_user_data(username):
     """Get user data from database with better error handling"""
     try:
-        db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-        
-        if not os.path.exists(db_path):
-            print(f"Database file not found at: {db_path}", file=sys.stderr)
-            return None
-            
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM users WHERE username = ?", (username,))
-        if cursor.fetchone()[0] == 0:
+        user_data = get_profile_repository().get(username)
+        if user_data is None:
             print(f"User {username} not found in database", file=sys.stderr)
-            conn.close()
-            return None
-            
-        cursor.execute("""
-            SELECT gender, age, marital_status, salary, balance
-            FROM users
-            WHERE username = ?
-        """, (username,))
-        user_data = cursor.fetchone()
-        conn.close()
-        
-        if user_data:
-            return {
-                'gender': user_data[0] or 'Unknown',
-                'age': user_data[1] or 25,
-                'marital_status': user_data[2] or 'Single',
-                'salary': user_data[3] or 50000,
-                'balance': user_data[4] or 10000
-            }
+        return user_data
+    except FileNotFoundError as e:
+        print(str(e), file=sys.stderr)
         return None
     except Exception as e:
         print(f"Database error: {str(e)}", file=sys.stderr)
         return None
 
+def get_user_data_many(usernames):
+    """Get user data for many usernames with one batched lookup"""
+    usernames = [username for username in usernames if username]
+    try:
+        return get_profile_repository().get_many(usernames) if usernames else {}
+    except Exception as e:
+        print(f"Database error: {str(e)}", file=sys.stderr)
+        return {}
+
 def clean_text(text):
     """Clean text with better error handling"""
     try:
@@ -66,6 +64,29 @@ def clean_text(text):
         print(f"Text cleaning error: {str(e)}", file=sys.stderr)
         return str(text).lower()
 
+def clean_text_series(series, chunk_size=100000):
+    """clean_text for a whole column, with identical output
+    
+    Each chunk of values is joined with NUL separators so normalisation,
+    ASCII folding, whitespace collapsing and lowercasing run once per chunk
+    instead of once per value. None of these steps moves text across a NUL;
+    chunks whose values contain one fall back to clean_text.
+    """
+    values = [value if isinstance(value, str) else str(value) for value in series.tolist()]
+    cleaned = []
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        joined = '\x00'.join(chunk)
+        if joined.count('\x00') != len(chunk) - 1:
+            cleaned.extend(clean_text(value) for value in chunk)
+            continue
+        if not joined.isascii():
+            joined = unicodedata.normalize('NFKD', joined).encode('ascii', 'ignore').decode('ascii')
+        # str.split() and re's \s agree on whitespace; NUL is not whitespace
+        joined = ' '.join(joined.split()).replace(' \x00', '\x00').replace('\x00 ', '\x00').lower()
+        cleaned.extend(joined.split('\x00'))
+    return pd.Series(cleaned, index=series.index, name=series.name, dtype=series.dtype if not cleaned else None)
+
 def create_policy_categories():
     """Create rule-based policy categories for better matching"""
     return {
@@ -77,18 +98,100 @@ def create_policy_categories():
         'retirement': ['pension', 'retirement', 'annuity', 'senior', 'old age']
     }
 
+def create_rule_match_keywords():
+    """Catalog keywords that satisfy each query category in rule-based matching"""
+    return {
+        'high_risk': ['ulip', 'investment', 'market', 'growth'],
+        'low_risk': ['traditional', 'endowment', 'guaranteed', 'assured'],
+        'long_term': ['pension', 'retirement', 'child', 'education'],
+        'retirement': ['pension', 'retirement', 'annuity']
+    }
+
+def create_policy_type_keywords():
+    """Keywords for get_policy_category, in precedence order"""
+    return {
+        'retirement': ['pension', 'retirement', 'annuity'],
+        'protection': ['term', 'protection', 'cover'],
+        'investment': ['ulip', 'investment', 'growth', 'market'],
+        'child': ['child', 'education', 'future'],
+        'savings': ['money back', 'return', 'liquidity']
+    }
+
+# Keyword tables compiled once; each returns a bitmask of matched groups
+QUERY_CATEGORY_MATCHER = KeywordMatcher(create_policy_categories())
+RULE_MATCHER = KeywordMatcher(create_rule_match_keywords())
+POLICY_CATEGORY_MATCHER = KeywordMatcher(create_policy_type_keywords())
+
 def categorize_user_query(user_input):
     """Categorize user query based on keywords"""
-    user_input_lower = user_input.lower()
-    categories = create_policy_categories()
-    matched_categories = []
+    return QUERY_CATEGORY_MATCHER.names(QUERY_CATEGORY_MATCHER.mask(user_input))
+
+def get_rule_masks(df):
+    """Per-policy rule bitmasks, precomputed at load time when available"""
+    if 'Rule_Mask' in df.columns:
+        return df['Rule_Mask'].to_numpy()
+    return RULE_MATCHER.masks(df['Combined_Text'].tolist())
+
+def top_k_indices(scores, k, tie_keys=None):
+    """Indices of the k highest scores, best first, ties broken by lower index
+
+    Uses np.argpartition to find the k-th best score, so selection is O(n)
+    and only the k survivors are sorted. tie_keys, if given, replaces the
+    index as the tie-breaker (e.g. policy ids of unsorted sparse scores).
+    """
+    scores = np.asarray(scores)
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    keys = np.arange(n) if tie_keys is None else np.asarray(tie_keys)
+    
+    if k < n:
+        kth_score = scores[np.argpartition(scores, n - k)[n - k]]
+        above = np.flatnonzero(scores > kth_score)
+        ties = np.flatnonzero(scores == kth_score)
+        ties = ties[np.argsort(keys[ties], kind='stable')[:k - len(above)]]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+    
+    order = np.lexsort((keys[candidates], -scores[candidates]))
+    return candidates[order]
+
+def prepare_catalog(df):
+    """Clean a raw policy sheet and derive the matching columns"""
+    required_columns = ['Policies', 'WhyGet', 'Desc']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}")
     
-    for category, keywords in categories.items():
-        if any(keyword in user_input_lower for keyword in keywords):
-            matched_categories.append(category)
+    # Clean and process data
+    df['Policies'] = clean_text_series(df['Policies'])
+    df['WhyGet'] = clean_text_series(df['WhyGet'].fillna(''))
+    df['Desc'] = clean_text_series(df['Desc'].fillna(''))
     
-    return matched_categories
+    # Create combined text for better feature extraction
+    df['Combined_Text'] = df['Policies'] + ' ' + df['WhyGet'] + ' ' + df['Desc']
+    
+    # Create policy categories and rule-match bitmasks based on keywords
+    combined_text = df['Combined_Text'].tolist()
+    df['Category'] = pd.Series(
+        POLICY_CATEGORY_MATCHER.first_names(POLICY_CATEGORY_MATCHER.masks(combined_text), 'general'),
+        index=df.index
+    )
+    df['Rule_Mask'] = RULE_MATCHER.masks(combined_text)
+    
+    policy_descriptions = dict(zip(df['Policies'], df['WhyGet']))
+    
+    label_encoder = LabelEncoder()
+    df['Policy_Label'] = label_encoder.fit_transform(df['Policies'])
+    
+    # Remember the catalog version so fitted indexes can be reused
+    df.attrs['catalog_fingerprint'] = catalog_fingerprint(df)
+    
+    return df, policy_descriptions, label_encoder
 
+@timing.timed('data_load')
 def load_and_prepare_data():
     """Load and prepare the Excel data with enhanced processing"""
     try:
@@ -96,29 +199,14 @@ def load_and_prepare_data():
         
         if not os.path.exists(excel_path):
             raise FileNotFoundError(f"Excel file not found at: {excel_path}")
-            
-        df = pd.read_excel(excel_path)
-        
-        required_columns = ['Policies', 'WhyGet', 'Desc']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise ValueError(f"Missing required columns: {missing_columns}")
-        
-        # Clean and process data
-        df['Policies'] = df['Policies'].apply(clean_text)
-        df['WhyGet'] = df['WhyGet'].fillna('').apply(clean_text)
-        df['Desc'] = df['Desc'].fillna('').apply(clean_text)
         
-        # Create combined text for better feature extraction
-        df['Combined_Text'] = df['Policies'] + ' ' + df['WhyGet'] + ' ' + df['Desc']
-        
-        # Create policy categories based on keywords
-        df['Category'] = df['Combined_Text'].apply(lambda x: get_policy_category(x))
+        # Read the compiled bundle; Excel is only parsed when the bundle is stale
+        df, label_classes = load_prepared_catalog(excel_path)
         
         policy_descriptions = dict(zip(df['Policies'], df['WhyGet']))
         
         label_encoder = LabelEncoder()
-        df['Policy_Label'] = label_encoder.fit_transform(df['Policies'])
+        label_encoder.classes_ = label_classes
         
         return df, policy_descriptions, label_encoder
     except Exception as e:
@@ -127,126 +215,805 @@ def load_and_prepare_data():
 
 def get_policy_category(policy_text):
     """Assign category to policy based on its description"""
-    policy_text = policy_text.lower()
-    
-    if any(word in policy_text for word in ['pension', 'retirement', 'annuity']):
-        return 'retirement'
-    elif any(word in policy_text for word in ['term', 'protection', 'cover']):
-        return 'protection'
-    elif any(word in policy_text for word in ['ulip', 'investment', 'growth', 'market']):
-        return 'investment'
-    elif any(word in policy_text for word in ['child', 'education', 'future']):
-        return 'child'
-    elif any(word in policy_text for word in ['money back', 'return', 'liquidity']):
-        return 'savings'
-    else:
-        return 'general'
+    return POLICY_CATEGORY_MATCHER.first(POLICY_CATEGORY_MATCHER.mask(policy_text), 'general')
     
-def enhanced_policy_matching(user_input, df, policy_descriptions):
-    """Enhanced policy matching using multiple approaches - Updated for array return"""
-    try:
-        # Approach 1: Rule-based matching
-        user_categories = categorize_user_query(user_input)
-        rule_based_matches = []
-        
-        if user_categories:
-            for category in user_categories:
-                if category == 'high_risk':
-                    matches = df[df['Combined_Text'].str.contains('ulip|investment|market|growth', case=False, na=False)]
-                elif category == 'low_risk':
-                    matches = df[df['Combined_Text'].str.contains('traditional|endowment|guaranteed|assured', case=False, na=False)]
-                elif category == 'long_term':
-                    matches = df[df['Combined_Text'].str.contains('pension|retirement|child|education', case=False, na=False)]
-                elif category == 'retirement':
-                    matches = df[df['Combined_Text'].str.contains('pension|retirement|annuity', case=False, na=False)]
-                else:
-                    continue
+def policy_row_digests(df):
+    """Per-policy content hashes of the columns the matchers are fitted on"""
+    return [
+        hashlib.sha256(f"{name}\0{text}".encode('utf-8')).digest()
+        for name, text in zip(df['Policies'], df['Combined_Text'])
+    ]
+
+def catalog_fingerprint(df, row_digests=None):
+    """Content hash of the catalog, folded from per-policy digests
+
+    Folding row digests lets an incrementally edited catalog recompute its
+    fingerprint by hashing only the changed rows.
+    """
+    digest = hashlib.sha256()
+    for row_digest in (row_digests if row_digests is not None else policy_row_digests(df)):
+        digest.update(row_digest)
+    return digest.hexdigest()
+
+# Semantic feature mode: 'tfidf' fits a vocabulary per catalog; 'hashing'
+# hashes terms into a fixed number of columns and keeps IDF up to date as
+# policies are added, so the index never refits and its size stays bounded
+SEMANTIC_FEATURES = os.environ.get('SEMANTIC_FEATURES', 'tfidf')
+HASHING_FEATURES = 2 ** 18
+
+def semantic_vectorizer_params(features):
+    """Vectorizer settings of the semantic index
+    
+    Every index equals a full fit of its catalog, so the catalog version,
+    the feature mode and these settings determine its answers.
+    """
+    if features == 'hashing':
+        return {'stop_words': 'english', 'ngram_range': (1, 2), 'n_features': HASHING_FEATURES,
+                'alternate_sign': False, 'norm': None}
+    return {'stop_words': 'english', 'max_features': 1000, 'min_df': 1, 'ngram_range': (1, 2)}
+
+class PolicyCatalogIndex:
+    """Fitted matchers for one catalog version, built once and reused per query"""
+    
+    def __init__(self, df, persist_classifier=True, features=None):
+        start = time.perf_counter()
+        self.fingerprint = df.attrs.get('catalog_fingerprint') or catalog_fingerprint(df)
+        self.size = len(df)
+        self.persist_classifier = persist_classifier
+        self.features = features or SEMANTIC_FEATURES
+        if self.features not in ('tfidf', 'hashing'):
+            raise ValueError(f"Unknown semantic feature mode: {self.features}")
+        
+        # Semantic matcher: rows are normalised once so cosine is a single sparse product
+        if self.features == 'hashing':
+            self.semantic_vectorizer = HashingVectorizer(**semantic_vectorizer_params('hashing'))
+            term_counts = self.semantic_vectorizer.transform(df['Combined_Text'])
+            self._set_term_counts(term_counts, np.bincount(term_counts.indices, minlength=HASHING_FEATURES))
+        else:
+            self.semantic_vectorizer = TfidfVectorizer(**semantic_vectorizer_params('tfidf'))
+            self.policy_matrix = normalize(self.semantic_vectorizer.fit_transform(df['Combined_Text'])).tocsr()
+            self._build_postings()
+        
+        # Classifier inputs are kept so the forest is trained only if the fallback is used
+        self._classifier_texts = df['Combined_Text'].astype(str).tolist()
+        self._classifier_labels = df['Policy_Label'].to_numpy()
+        self._classifier_names = df['Policies'].tolist()
+        self.classifier_vectorizer = None
+        self.classifier = None
+        self.label_encoder = None
+        
+        self.build_times_ms = {'semantic': (time.perf_counter() - start) * 1000}
+    
+    @property
+    def build_time_ms(self):
+        """Total time spent fitting this index"""
+        return sum(self.build_times_ms.values())
+    
+    def _set_term_counts(self, term_counts, document_frequency):
+        """Hashing mode: reweight raw term counts with IDF from document frequencies
+        
+        Uses the same smoothed IDF as TfidfVectorizer, ln((1 + n) / (1 + df)) + 1.
+        """
+        self.term_counts = term_counts.tocsr().astype(np.float32)  # counts are exact in float32
+        self.document_frequency = document_frequency
+        self.idf = np.log((1 + self.term_counts.shape[0]) / (1 + document_frequency)) + 1
+        self.policy_matrix = self._weighted_vectors(self.term_counts)
+        self._build_postings()
+    
+    def _weighted_vectors(self, features):
+        """L2-normalised semantic vectors from vectorizer output"""
+        if self.features == 'hashing':
+            features = features.astype(np.float64)
+            features.data *= self.idf[features.indices]
+        return normalize(features).tocsr()
+    
+    def _query_vectors(self, user_inputs):
+        return self._weighted_vectors(self.semantic_vectorizer.transform(user_inputs))
+    
+    def _build_postings(self):
+        """Inverted index: row t of the transpose lists the policies containing term t"""
+        self._policy_matrix_t = self.policy_matrix.T.tocsr()
+        self._policy_matrix_t.sort_indices()  # posting lists ordered by policy
+        self.term_max_weights = self._policy_matrix_t.max(axis=1).toarray().ravel()
+    
+    def semantic_similarities(self, user_input):
+        """Cosine similarity of the query against every policy"""
+        user_vector = self._query_vectors([user_input])
+        return (user_vector @ self._policy_matrix_t).toarray()[0]
+    
+    def _posting(self, term):
+        """(policy rows, weights) of one term, ordered by row"""
+        postings = self._policy_matrix_t
+        start, end = postings.indptr[term], postings.indptr[term + 1]
+        return postings.indices[start:end], postings.data[start:end]
+    
+    def _lookups_cheaper(self, terms, n_rows):
+        """Whether binary-searching n_rows in each posting beats scanning the postings"""
+        posting_lengths = np.diff(self._policy_matrix_t.indptr)[terms]
+        return n_rows * np.log2(posting_lengths + 2).sum() <= posting_lengths.sum()
+    
+    def _lookup_scores(self, user_vector, rows):
+        """Similarities of the given sorted rows from posting-list lookups
+        
+        Adds the same products in the same term order as the sparse product,
+        so the scores are bit-identical to semantic_similarities.
+        """
+        scores = np.zeros(len(rows))
+        for term, weight in zip(user_vector.indices, user_vector.data):
+            policies, policy_weights = self._posting(term)
+            if len(policies) == 0:
+                continue
+            positions = np.minimum(np.searchsorted(policies, rows), len(policies) - 1)
+            scores += np.where(policies[positions] == rows, weight * policy_weights[positions], 0.0)
+        return scores
+    
+    def semantic_scores(self, user_input, rows):
+        """Cosine similarity of the query against the given sorted policy rows only"""
+        user_vector = self._query_vectors([user_input])
+        rows = np.asarray(rows)
+        if self._lookups_cheaper(user_vector.indices, len(rows)):
+            return self._lookup_scores(user_vector, rows)
+        return (user_vector @ self._policy_matrix_t).toarray()[0][rows]
+    
+    def semantic_candidates(self, user_input, top_k=1, min_score=0.0):
+        """Top-k (indices, similarities) scoring only policies that share a query term
+        
+        Same result as top_k_indices over semantic_similarities, restricted to
+        scores above min_score. Query terms are taken in order of their best
+        possible contribution (query weight times the term's largest policy
+        weight). The k-th best share of the strongest term bounds the final
+        k-th score from below; terms whose combined contributions cannot
+        reach it only add to policies already found (max-score pruning).
+        Those candidates are scored by posting-list lookups; otherwise one
+        sparse product over the query terms' postings is used.
+        """
+        user_vector = self._query_vectors([user_input])
+        terms, weights = user_vector.indices, user_vector.data
+        if len(terms) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        
+        bounds = weights * self.term_max_weights[terms]
+        order = np.argsort(-bounds, kind='stable')
+        # remaining[i]: most any policy can gain from the terms after order[i]
+        remaining = np.append(np.cumsum(bounds[order][::-1])[::-1][1:], 0.0)
+        
+        # A policy's share from the strongest term alone is a lower bound on its score
+        first_shares = weights[order[0]] * self._posting(terms[order[0]])[1]
+        threshold = min_score
+        if len(first_shares) >= top_k:
+            threshold = max(threshold, np.partition(first_shares, len(first_shares) - top_k)[len(first_shares) - top_k])
+        essential = int(np.argmax(remaining * (1 + 1e-9) < threshold)) + 1 if threshold > 0 else len(terms)
+        
+        candidates = None
+        if essential < len(terms):
+            in_essential_posting = np.zeros(self.size, dtype=bool)
+            for term in terms[order[:essential]]:
+                in_essential_posting[self._posting(term)[0]] = True
+            candidates = np.flatnonzero(in_essential_posting)
+            if not self._lookups_cheaper(terms, len(candidates)):
+                candidates = None
+        
+        if candidates is not None:
+            scores = self._lookup_scores(user_vector, candidates)
+        else:
+            # One sparse product over all postings of the query terms
+            row = (user_vector @ self._policy_matrix_t).tocsr()
+            candidates, scores = row.indices, row.data
+        
+        keep = scores > min_score
+        candidates, scores = candidates[keep], scores[keep]
+        best = top_k_indices(scores, top_k, tie_keys=candidates)
+        return candidates[best], scores[best]
+    
+    def top_semantic_matches(self, user_inputs, top_k=1):
+        """Top-k (indices, similarities) for each query, scored in one sparse product"""
+        user_vectors = self._query_vectors(user_inputs)
+        scores = (user_vectors @ self._policy_matrix_t).tocsr()
+        scores.sort_indices()  # ties resolve to the first policy, as with np.argmax
+        
+        matches = []
+        for row in range(scores.shape[0]):
+            row_scores = scores.data[scores.indptr[row]:scores.indptr[row + 1]]
+            row_indices = scores.indices[scores.indptr[row]:scores.indptr[row + 1]]
+            best = top_k_indices(row_scores, top_k)
+            matches.append((row_indices[best], row_scores[best]))
+        return matches
+    
+    def incremental(self, df, old_rows):
+        """Index for an edited catalog, equal to a full build of df
+
+        old_rows[i] is the row of this index that is identical to row i of df,
+        or -1 for added or changed rows. With hashing features only those rows
+        are transformed and unchanged vectors are copied; document frequencies
+        are adjusted for the added and removed rows and every row is
+        reweighted, which keeps IDF exact without refitting. With TF-IDF
+        features any edit can change the vocabulary and every IDF weight, so
+        the index is refitted.
+        """
+        if self.features != 'hashing':
+            return PolicyCatalogIndex(df, persist_classifier=self.persist_classifier, features=self.features)
+        
+        start = time.perf_counter()
+        old_rows = np.asarray(old_rows)
+        changed = np.flatnonzero(old_rows < 0)
+        
+        index = copy.copy(self)
+        index.fingerprint = get_catalog_version(df)
+        index.size = len(df)
+        
+        source = old_rows.copy()
+        source[changed] = self.size + np.arange(len(changed))
+        new_features = self.semantic_vectorizer.transform(df['Combined_Text'].iloc[changed])
+        kept = np.zeros(self.size, dtype=bool)
+        kept[old_rows[old_rows >= 0]] = True
+        removed_counts = self.term_counts[np.flatnonzero(~kept)]
+        document_frequency = (self.document_frequency
+                              + np.bincount(new_features.indices, minlength=HASHING_FEATURES)
+                              - np.bincount(removed_counts.indices, minlength=HASHING_FEATURES))
+        index._set_term_counts(sp.vstack([self.term_counts, new_features]).tocsr()[source], document_frequency)
+        
+        # The classifier depends on the whole label space, so it is retrained lazily
+        index._classifier_texts = df['Combined_Text'].astype(str).tolist()
+        index._classifier_labels = df['Policy_Label'].to_numpy()
+        index._classifier_names = df['Policies'].tolist()
+        index.classifier_vectorizer = None
+        index.classifier = None
+        index.label_encoder = None
+        
+        index.build_times_ms = {'incremental': (time.perf_counter() - start) * 1000}
+        return index
+    
+    def get_classifier(self):
+        """Return (vectorizer, classifier, label_encoder), loading or training them on first use"""
+        if self.classifier is None:
+            start = time.perf_counter()
+            cached = load_cached_classifier(self.fingerprint) if self.persist_classifier else None
+            if cached is not None:
+                vectorizer, classifier, label_encoder = cached
+            else:
+                vectorizer = TfidfVectorizer(stop_words='english', max_features=500, min_df=1)
+                X = vectorizer.fit_transform(self._classifier_texts)
                 
-                if not matches.empty:
-                    rule_based_matches.extend(matches.to_dict('records'))
-        
-        # Return rule-based match if found
-        if rule_based_matches:
-            # Sort by relevance and take the best match
-            best_match = rule_based_matches[0]
-            return {
-                'name': best_match['Policies'],
-                'why': policy_descriptions.get(best_match['Policies'], 'No description available'),
-                'confidence': 0.8,  # High confidence for rule-based matches
-                'method': 'rule_based'
-            }
+                classifier = RandomForestClassifier(n_estimators=100, random_state=42)
+                classifier.fit(X, self._classifier_labels)
+                
+                label_encoder = LabelEncoder()
+                label_encoder.fit(self._classifier_names)
+                
+                if self.persist_classifier:
+                    save_cached_classifier(self.fingerprint, vectorizer, classifier, label_encoder)
+            
+            self.classifier_vectorizer = vectorizer
+            self.label_encoder = label_encoder
+            self.classifier = classifier
+            self.build_times_ms['classifier'] = (time.perf_counter() - start) * 1000
+        return self.classifier_vectorizer, self.classifier, self.label_encoder
+    
+    def memory_bytes(self):
+        """Approximate memory held by the index (sparse arrays plus pickled models)"""
+        total = 0
+        for matrix in (self.policy_matrix, getattr(self, 'term_counts', None)):
+            if matrix is not None:
+                total += matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        if self.features == 'hashing':
+            total += self.document_frequency.nbytes + self.idf.nbytes
+        for model in (self.semantic_vectorizer, self.classifier_vectorizer, self.classifier, self.label_encoder):
+            if model is not None:
+                total += len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+        return total
+    
+    def stats(self):
+        """Build time and size summary for diagnostics"""
+        return {
+            'fingerprint': self.fingerprint,
+            'policies': self.size,
+            'features': self.features,
+            'build_time_ms': round(self.build_time_ms, 3),
+            'build_times_ms': {stage: round(ms, 3) for stage, ms in self.build_times_ms.items()},
+            'memory_bytes': self.memory_bytes()
+        }
+
+CLASSIFIER_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'sbilife.classifier.joblib')
+CLASSIFIER_CACHE_VERSION = 1
+
+def load_cached_classifier(fingerprint, cache_path=CLASSIFIER_CACHE_PATH):
+    """Load the persisted fallback classifier if it matches this catalog and sklearn"""
+    try:
+        if not os.path.exists(cache_path):
+            return None
         
-        # Approach 2: Semantic similarity (fallback)
-        vectorizer = TfidfVectorizer(stop_words='english', max_features=1000, min_df=1, ngram_range=(1, 2))
-        policy_vectors = vectorizer.fit_transform(df['Combined_Text'])
-        user_vector = vectorizer.transform([user_input])
-        
-        similarities = cosine_similarity(user_vector, policy_vectors)[0]
-        best_match_idx = np.argmax(similarities)
-        best_similarity = similarities[best_match_idx]
-        
-        if best_similarity > 0.1:  # Minimum similarity threshold
-            best_match = df.iloc[best_match_idx]
-            return {
-                'name': best_match['Policies'],
-                'why': policy_descriptions.get(best_match['Policies'], 'No description available'),
-                'confidence': float(best_similarity),
-                'method': 'semantic_similarity'
-            }
+        artifact = joblib.load(cache_path, mmap_mode='r')
+        if (artifact.get('cache_version') != CLASSIFIER_CACHE_VERSION or
+                artifact.get('fingerprint') != fingerprint or
+                artifact.get('sklearn_version') != sklearn.__version__):
+            print(f"Classifier cache at {cache_path} is stale, rebuilding", file=sys.stderr)
+            return None
+        
+        return artifact['vectorizer'], artifact['classifier'], artifact['label_encoder']
+    except Exception as e:
+        print(f"Classifier cache load error: {str(e)}", file=sys.stderr)
+        return None
+
+def save_cached_classifier(fingerprint, vectorizer, classifier, label_encoder, cache_path=CLASSIFIER_CACHE_PATH):
+    """Persist the fallback classifier atomically next to the catalog"""
+    try:
+        artifact = {
+            'cache_version': CLASSIFIER_CACHE_VERSION,
+            'fingerprint': fingerprint,
+            'sklearn_version': sklearn.__version__,
+            'vectorizer': vectorizer,
+            'classifier': classifier,
+            'label_encoder': label_encoder
+        }
+        
+        # Written through a temporary file so concurrent readers never see a partial artifact
+        write_atomic(cache_path, lambda path: joblib.dump(artifact, path))
+    except Exception as e:
+        print(f"Classifier cache save error: {str(e)}", file=sys.stderr)
+
+_CATALOG_INDEXES = {}
+_MAX_CATALOG_INDEXES = 4
+
+def get_catalog_version(df):
+    """Catalog fingerprint, computed once and remembered on the DataFrame"""
+    fingerprint = df.attrs.get('catalog_fingerprint')
+    if fingerprint is None:
+        fingerprint = catalog_fingerprint(df)
+        df.attrs['catalog_fingerprint'] = fingerprint
+    return fingerprint
+
+def register_catalog_index(index):
+    """Make a prebuilt index the one used for its catalog version"""
+    if index.fingerprint not in _CATALOG_INDEXES and len(_CATALOG_INDEXES) >= _MAX_CATALOG_INDEXES:
+        _CATALOG_INDEXES.pop(next(iter(_CATALOG_INDEXES)))
+    _CATALOG_INDEXES[index.fingerprint] = index
+    return index
+
+def get_catalog_index(df):
+    """Return the fitted index for this catalog version, building it once"""
+    fingerprint = get_catalog_version(df)
+    
+    index = _CATALOG_INDEXES.get(fingerprint)
+    if index is None:
+        index = register_catalog_index(PolicyCatalogIndex(df))
+        timing.debug("Built catalog index in %.1f ms", index.build_time_ms)
+    return index
+
+_TRUST_LOOKUPS = {}
+_TRUST_CALCULATORS = {}
+TRUST_PROFILE_FIELDS = ['age', 'salary', 'credit_score', 'balance', 'num_products']
+
+def trust_name_rows(df, raw):
+    """Cleaned policy name -> row of the raw sheet whose trust scores it gets
+    
+    Matches carry cleaned names; the trust sheet is keyed by raw names, and
+    a raw name resolves to the first row with the same lowercased name, as
+    the trust calculator's exact lookup does. None marks a name whose raw
+    name is not text, which gets the default scores. raw is the sheet df
+    was prepared from, row for row; otherwise the mapping is empty.
+    """
+    raw_names = raw['Policies'].tolist()
+    first_rows = {}
+    for row, raw_name in enumerate(raw_names):
+        if isinstance(raw_name, str):
+            first_rows.setdefault(raw_name.lower(), row)
+    rows = {}
+    if len(raw) == len(df):
+        for name, raw_name in zip(df['Policies'].tolist(), raw_names):
+            if name not in rows:
+                rows[name] = first_rows[raw_name.lower()] if isinstance(raw_name, str) else None
+    return rows
+
+def get_trust_lookup(df, raw=None):
+    """(trust scores of each raw row, cleaned name -> row) for this catalog version
+    
+    By default raw is the raw sheet of the already loaded bundle. The
+    --serve watcher keeps the same pair on its snapshots, updated
+    incrementally.
+    """
+    fingerprint = get_catalog_version(df)
+    lookup = _TRUST_LOOKUPS.get(fingerprint)
+    if lookup is None:
+        # Imported lazily so recommendations without trust do not load it
+        from trust_policy import policy_score_rows
+        
+        if raw is None:
+            raw = load_raw_catalog()
+        lookup = (policy_score_rows(raw), trust_name_rows(df, raw))
+        if len(_TRUST_LOOKUPS) >= _MAX_CATALOG_INDEXES:
+            _TRUST_LOOKUPS.pop(next(iter(_TRUST_LOOKUPS)))
+        _TRUST_LOOKUPS[fingerprint] = lookup
+    return lookup
+
+def get_trust_calculator(df, raw=None):
+    """Trust calculator over the raw sheet, for names that are not catalog rows"""
+    fingerprint = get_catalog_version(df)
+    calculator = _TRUST_CALCULATORS.get(fingerprint)
+    if calculator is None:
+        from trust_policy import PolicyClassifierAndTrustCalculator
         
-        # Final fallback: return most general policy
-        fallback_policy = df.iloc[0]
+        calculator = PolicyClassifierAndTrustCalculator(policy_data=load_raw_catalog() if raw is None else raw)
+        if len(_TRUST_CALCULATORS) >= _MAX_CATALOG_INDEXES:
+            _TRUST_CALCULATORS.pop(next(iter(_TRUST_CALCULATORS)))
+        _TRUST_CALCULATORS[fingerprint] = calculator
+    return calculator
+
+def trust_profile(result, request=None):
+    """Profile for trust adjustments: the stored user profile, then fields sent with the request"""
+    profile = dict(result.get('user_profile') or {})
+    if request:
+        profile.update({field: request[field] for field in TRUST_PROFILE_FIELDS if request.get(field) is not None})
+    return profile
+
+@timing.timed('trust')
+def attach_trust_scores(result, df, profile, raw=None, lookup=None):
+    """Add trust_score, confidence_level and interpretation to every returned policy
+    
+    All policies are scored in one batch from the trust scores of their
+    catalog rows (lookup, or get_trust_lookup for this catalog), so no
+    separate trust_policy.py process is needed.
+    """
+    policies = result.get('policies')
+    if not policies:
+        return result
+    try:
+        from trust_policy import SCORE_DEFAULTS, trust_scores_from_matrix
+        
+        scores, rows = lookup if lookup is not None else get_trust_lookup(df, raw)
+        names = [policy['name'] for policy in policies]
+        matrix = np.empty((len(names), len(SCORE_DEFAULTS)))
+        unknown = []
+        for position, name in enumerate(names):
+            if name not in rows:
+                unknown.append(position)
+            elif rows[name] is None:
+                matrix[position] = list(SCORE_DEFAULTS.values())
+            else:
+                matrix[position] = scores[rows[name]]
+        if unknown:
+            # Not a catalog row: the calculator's exact and partial name search
+            matrix[unknown] = get_trust_calculator(df, raw).policy_score_matrix([names[position] for position in unknown])
+        
+        trust = trust_scores_from_matrix(matrix, [profile])
+        for position, policy in enumerate(policies):
+            policy['trust_score'] = float(trust['trust_score'][position, 0])
+            policy['confidence_level'] = trust['confidence_level'][position, 0]
+            policy['interpretation'] = dict(trust['interpretation'][position, 0])
+    except Exception as e:
+        print(f"Trust scoring error: {str(e)}", file=sys.stderr)
+    return result
+
+def policy_match(row, df, policy_descriptions, score):
+    """Name, reason and score for one catalog row"""
+    policy = df.iloc[row]
+    return {
+        'name': policy['Policies'],
+        'why': policy_descriptions.get(policy['Policies'], 'No description available'),
+        'score': float(score)
+    }
+
+def rule_candidates(user_input, df):
+    """(rows, rank keys) of policies matching the query's rule categories
+    
+    Rows are ranked by (first matching query category, catalog order), as
+    the original per-category scans listed them; lower keys rank higher.
+    """
+    user_categories = [category for category in categorize_user_query(user_input) if category in RULE_MATCHER.bits]
+    if not user_categories:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64)
+    
+    rule_masks = get_rule_masks(df)
+    unmatched = np.iinfo(np.int64).max
+    rank_keys = np.full(len(rule_masks), unmatched, dtype=np.int64)
+    for rank in reversed(range(len(user_categories))):
+        rows = np.flatnonzero(rule_masks & RULE_MATCHER.bits[user_categories[rank]])
+        rank_keys[rows] = rank * len(rule_masks) + rows
+    
+    candidates = np.flatnonzero(rank_keys != unmatched)
+    return candidates, rank_keys[candidates]
+
+def rule_based_match(user_input, df, policy_descriptions, top_k=1):
+    """Top policies matching the query's rule categories, or None"""
+    candidates, rank_keys = rule_candidates(user_input, df)
+    if not candidates.size:
+        return None
+    
+    best_rows = candidates[top_k_indices(-rank_keys, top_k)]
+    matches = [policy_match(row, df, policy_descriptions, 0.8) for row in best_rows]
+    return {
+        'name': matches[0]['name'],
+        'why': matches[0]['why'],
+        'confidence': 0.8,  # High confidence for rule-based matches
+        'method': 'rule_based',
+        'matches': matches
+    }
+
+SEMANTIC_MIN_SIMILARITY = 0.1  # Minimum similarity threshold
+
+def semantic_match(best_indices, best_similarities, df, policy_descriptions):
+    """Semantic match result for the ranked best policies, or the general fallback"""
+    if len(best_indices) and best_similarities[0] > SEMANTIC_MIN_SIMILARITY:
+        matches = [
+            policy_match(row, df, policy_descriptions, similarity)
+            for row, similarity in zip(best_indices, best_similarities)
+            if similarity > SEMANTIC_MIN_SIMILARITY
+        ]
         return {
-            'name': fallback_policy['Policies'],
-            'why': policy_descriptions.get(fallback_policy['Policies'], 'No description available'),
-            'confidence': 0.3,
-            'method': 'fallback'
+            'name': matches[0]['name'],
+            'why': matches[0]['why'],
+            'confidence': float(best_similarities[0]),
+            'method': 'semantic_similarity',
+            'matches': matches
         }
+    
+    # Final fallback: return most general policy
+    fallback = policy_match(0, df, policy_descriptions, 0.3)
+    return {
+        'name': fallback['name'],
+        'why': fallback['why'],
+        'confidence': 0.3,
+        'method': 'fallback',
+        'matches': [fallback]
+    }
+
+def enhanced_policy_matching(user_input, df, policy_descriptions, index=None, top_k=1):
+    """Enhanced policy matching using multiple approaches - Updated for array return"""
+    try:
+        # Approach 1: Rule-based matching over precomputed category bitmasks
+        result = rule_based_match(user_input, df, policy_descriptions, top_k)
+        if result:
+            return result
+        
+        # Approach 2: Semantic similarity (fallback), scoring only policies sharing a query term
+        index = index or get_catalog_index(df)
+        best_indices, best_similarities = index.semantic_candidates(user_input, top_k, min_score=SEMANTIC_MIN_SIMILARITY)
+        return semantic_match(best_indices, best_similarities, df, policy_descriptions)
         
     except Exception as e:
         print(f"Enhanced matching error: {str(e)}", file=sys.stderr)
+
+def cached_policy_matching(user_input, df, policy_descriptions, top_k=1):
+    """enhanced_policy_matching behind the cross-process result cache"""
+    cache = get_recommendation_cache()
+    if cache is None:
+        return enhanced_policy_matching(user_input, df, policy_descriptions, top_k=top_k)
+    
+    # The index is identified by catalog version and settings without building it
+    key = cache.make_key(user_input, get_catalog_version(df), top_k=top_k, features=SEMANTIC_FEATURES,
+                         semantic_index=semantic_vectorizer_params(SEMANTIC_FEATURES))
+    try:
+        result = cache.get(key)
+        if result is not None:
+            return result
+    except Exception as e:
+        print(f"Recommendation cache read error: {str(e)}", file=sys.stderr)
+    
+    result = enhanced_policy_matching(user_input, df, policy_descriptions, top_k=top_k)
+    if result:
+        try:
+            cache.set(key, result)
+        except Exception as e:
+            print(f"Recommendation cache write error: {str(e)}", file=sys.stderr)
+    return result
+
+def build_enhanced_query(user_input, user_data):
+    """Enrich the query with bucketed profile tokens"""
+    enhanced_input = user_input
+    if user_data:
+        age_group = "young" if user_data['age'] < 30 else "middle-aged" if user_data['age'] < 50 else "senior"
+        income_group = "high" if user_data['salary'] > 100000 else "medium" if user_data['salary'] > 50000 else "low"
         
-def predict_policy_enhanced(user_input, username, df, policy_descriptions):
+        enhanced_input += f" {age_group} {income_group} income {user_data['gender']} {user_data['marital_status']}"
+    return enhanced_input
+
+def format_policies(matches, top_k=1):
+    """Policies array for the frontend; scores are included for top-k requests"""
+    if top_k == 1:
+        return [{'name': match['name'], 'why': match['why']} for match in matches[:1]]
+    return [dict(match) for match in matches[:top_k]]
+
+def format_enhanced_prediction(result, enhanced_input, user_data, top_k=1):
+    """Convert a matching result to the response format expected by the frontend"""
+    policy_array = format_policies(result.get('matches') or [result], top_k)
+    
+    return {
+        'policies': policy_array,  # Frontend expects 'policies' array
+        'confidence': result.get('confidence', 0.5),
+        'method': result.get('method', 'enhanced'),
+        'enhanced_query': enhanced_input,
+        'user_data_used': user_data is not None,
+        'user_profile': user_data
+    }
+
+def predict_policy_enhanced(user_input, username, df, policy_descriptions, top_k=1):
     """Enhanced policy prediction with multiple approaches - Returns array format"""
     try:
-        # Get user data if available
-        user_data = get_user_data(username) if username else None
-        
-        # Enhance user input with user data and context
-        enhanced_input = user_input
-        if user_data:
-            age_group = "young" if user_data['age'] < 30 else "middle-aged" if user_data['age'] < 50 else "senior"
-            income_group = "high" if user_data['salary'] > 100000 else "medium" if user_data['salary'] > 50000 else "low"
+        with timing.span('feature_prep'):
+            # Get user data if available
+            user_data = get_user_data(username) if username else None
             
-            enhanced_input += f" {age_group} {income_group} income {user_data['gender']} {user_data['marital_status']}"
-        
-        # Use enhanced matching
-        result = enhanced_policy_matching(enhanced_input, df, policy_descriptions)
+            # Enhance user input with user data and context
+            enhanced_input = build_enhanced_query(user_input, user_data)
         
-        if result:
-            # Convert single result to array format expected by frontend
-            policy_array = [{
-                'name': result['name'],
-                'why': result['why']
-            }]
+        with timing.span('inference'):
+            # Use enhanced matching, reusing results for identical enriched queries
+            result = cached_policy_matching(enhanced_input, df, policy_descriptions, top_k=top_k)
             
-            return {
-                'policies': policy_array,  # Frontend expects 'policies' array
-                'confidence': result.get('confidence', 0.5),
-                'method': result.get('method', 'enhanced'),
-                'enhanced_query': enhanced_input,
-                'user_data_used': user_data is not None,
-                'user_profile': user_data
-            }
-        
-        # Fallback to original approach if enhanced matching fails
-        return predict_policy_original(user_input, username, df, policy_descriptions)
+            if result:
+                return format_enhanced_prediction(result, enhanced_input, user_data, top_k)
+            
+            # Fallback to original approach if enhanced matching fails
+            return predict_policy_original(user_input, username, df, policy_descriptions, top_k=top_k)
         
     except Exception as e:
         print(f"Enhanced prediction error: {str(e)}", file=sys.stderr)
         return {'error': f"Enhanced prediction failed: {str(e)}"}
 
-def predict_policy_original(user_input, username, df, policy_descriptions):
+CASCADE_STAGES = ['rules', 'semantic', 'rerank']
+
+DEFAULT_CASCADE_CONFIG = {
+    'stages': CASCADE_STAGES,
+    'shortlist_size': 20,  # policies the classifier reranks
+    'budgets_ms': {'rules': 5.0, 'semantic': 50.0, 'rerank': 250.0}
+}
+
+def cascade_config(options=None):
+    """DEFAULT_CASCADE_CONFIG updated with a request's 'cascade' options"""
+    config = dict(DEFAULT_CASCADE_CONFIG, budgets_ms=dict(DEFAULT_CASCADE_CONFIG['budgets_ms']))
+    if isinstance(options, dict):
+        if 'stages' in options:
+            config['stages'] = list(options['stages'])
+        if 'shortlist_size' in options:
+            config['shortlist_size'] = int(options['shortlist_size'])
+        config['budgets_ms'].update({stage: float(budget) for stage, budget in options.get('budgets_ms', {}).items()})
+    
+    unknown = set(config['stages']) - set(CASCADE_STAGES)
+    if unknown:
+        raise ValueError(f"Unknown cascade stages: {sorted(unknown)}")
+    return config
+
+def cascade_match(user_input, df, policy_descriptions, index=None, top_k=1, config=None):
+    """Rank policies through rules -> TF-IDF -> classifier rerank
+    
+    Rules prune the catalog to policies in the query's categories (all
+    policies if none match), TF-IDF ranks the survivors and keeps a
+    shortlist, and the classifier reorders only that shortlist. Each stage
+    keeps the previous order for ties. Budgets are checked between stages:
+    once a stage overruns its budget the remaining stages are skipped and
+    the ranking so far is returned.
+    """
+    config = config or cascade_config()
+    index = index or get_catalog_index(df)
+    
+    rows = np.arange(len(df))  # candidates, best first
+    scores = np.zeros(len(rows))
+    method = None
+    stages = []
+    exhausted = False
+    
+    for stage in CASCADE_STAGES:
+        if stage not in config['stages']:
+            continue
+        budget_ms = config['budgets_ms'].get(stage)
+        if exhausted:
+            stages.append({'stage': stage, 'skipped': True, 'elapsed_ms': 0.0, 'budget_ms': budget_ms, 'candidates': len(rows)})
+            continue
+        
+        start = time.perf_counter()
+        if stage == 'rules':
+            candidates, rank_keys = rule_candidates(user_input, df)
+            if candidates.size:
+                rows = candidates[np.argsort(rank_keys, kind='stable')]
+                scores = np.full(len(rows), 0.8)
+                method = 'rule_based'
+        elif stage == 'semantic':
+            by_row = np.argsort(rows, kind='stable')
+            similarities = np.empty(len(rows))
+            similarities[by_row] = index.semantic_scores(user_input, rows[by_row])
+            best = top_k_indices(similarities, config['shortlist_size'])
+            rows, scores = rows[best], similarities[best]
+            method = 'semantic_similarity'
+        elif stage == 'rerank':
+            rows, scores = rows[:config['shortlist_size']], scores[:config['shortlist_size']]
+            vectorizer, classifier, label_encoder = index.get_classifier()
+            probabilities = classifier.predict_proba(vectorizer.transform([user_input]))[0]
+            labels = df['Policy_Label'].to_numpy()[rows]
+            shortlist_probabilities = probabilities[np.searchsorted(classifier.classes_, labels)]
+            best = top_k_indices(shortlist_probabilities, len(rows))
+            rows, scores = rows[best], shortlist_probabilities[best]
+            method = 'machine_learning'
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stages.append({'stage': stage, 'skipped': False, 'elapsed_ms': round(elapsed_ms, 3), 'budget_ms': budget_ms, 'candidates': len(rows)})
+        exhausted = budget_ms is not None and elapsed_ms > budget_ms
+    
+    matches = [policy_match(row, df, policy_descriptions, score) for row, score in zip(rows[:top_k], scores[:top_k])]
+    return {
+        'name': matches[0]['name'],
+        'why': matches[0]['why'],
+        'confidence': float(scores[0]) if method else 0.3,
+        'method': f"cascade:{method or 'fallback'}",
+        'matches': matches,
+        'stages': stages
+    }
+
+def predict_policy_cascade(user_input, username, df, policy_descriptions, top_k=1, config=None):
+    """predict_policy_enhanced through the staged ranking cascade, with per-stage timings"""
+    try:
+        with timing.span('feature_prep'):
+            user_data = get_user_data(username) if username else None
+            enhanced_input = build_enhanced_query(user_input, user_data)
+        
+        with timing.span('inference'):
+            result = cascade_match(enhanced_input, df, policy_descriptions, top_k=top_k, config=config)
+        response = format_enhanced_prediction(result, enhanced_input, user_data, top_k)
+        response['stages'] = result['stages']
+        return response
+        
+    except Exception as e:
+        print(f"Cascade prediction error: {str(e)}", file=sys.stderr)
+        return {'error': f"Cascade prediction failed: {str(e)}"}
+
+def predict_policy(user_input, username, df, policy_descriptions, top_k=1, cascade=None):
+    """Single-method prediction, or the cascade when 'cascade' options are given
+    
+    cascade may be true for the default configuration or a dict of
+    overrides for cascade_config.
+    """
+    if cascade:
+        config = cascade_config(cascade if isinstance(cascade, dict) else None)
+        return predict_policy_cascade(user_input, username, df, policy_descriptions, top_k, config)
+    return predict_policy_enhanced(user_input, username, df, policy_descriptions, top_k)
+
+def predict_policy_chunk(requests, df, policy_descriptions, index, top_k=1):
+    """Predict a list of (username, description) requests with one sparse product"""
+    profiles = get_user_data_many(username for username, _ in requests)
+    user_data_list = [profiles.get(username) if username else None for username, _ in requests]
+    enhanced_inputs = [
+        build_enhanced_query(user_input, user_data)
+        for (_, user_input), user_data in zip(requests, user_data_list)
+    ]
+    
+    results = [None] * len(requests)
+    pending = []
+    try:
+        for position, enhanced_input in enumerate(enhanced_inputs):
+            results[position] = rule_based_match(enhanced_input, df, policy_descriptions, top_k)
+            if results[position] is None:
+                pending.append(position)
+        
+        if pending:
+            matches = index.top_semantic_matches([enhanced_inputs[position] for position in pending], top_k)
+            for position, (best_indices, best_similarities) in zip(pending, matches):
+                results[position] = semantic_match(best_indices, best_similarities, df, policy_descriptions)
+    except Exception as e:
+        # Fall back to the per-request path, which has its own error handling
+        print(f"Batch matching error: {str(e)}", file=sys.stderr)
+        return [predict_policy_enhanced(user_input, username, df, policy_descriptions, top_k) for username, user_input in requests]
+    
+    return [
+        format_enhanced_prediction(result, enhanced_input, user_data, top_k)
+        for result, enhanced_input, user_data in zip(results, enhanced_inputs, user_data_list)
+    ]
+
+def predict_policy_batch(requests, df, policy_descriptions, chunk_size=1000, top_k=1):
+    """Recommend policies for many (username, description) requests
+
+    Requests are consumed lazily and scored chunk_size at a time, so memory is
+    bounded by the chunk rather than the input. Results are yielded in input
+    order and match predict_policy_enhanced for each request.
+    """
+    index = get_catalog_index(df)
+    chunk = []
+    for request in requests:
+        chunk.append(request)
+        if len(chunk) >= chunk_size:
+            yield from predict_policy_chunk(chunk, df, policy_descriptions, index, top_k)
+            chunk = []
+    if chunk:
+        yield from predict_policy_chunk(chunk, df, policy_descriptions, index, top_k)
+
+def predict_policy_original(user_input, username, df, policy_descriptions, index=None, top_k=1):
     """Original prediction method as fallback - Returns array format"""
     try:
         user_data = get_user_data(username) if username else None
@@ -258,28 +1025,24 @@ def predict_policy_original(user_input, username, df, policy_descriptions):
             enhanced_input += f"I am {user_data['marital_status']}. "
             enhanced_input += f"My annual salary is {user_data['salary']} and I have a balance of {user_data['balance']}."
         
-        # Use TF-IDF and Random Forest
-        vectorizer = TfidfVectorizer(stop_words='english', max_features=500, min_df=1)
-        X = vectorizer.fit_transform(df['Combined_Text'].astype(str))
-        y = df['Policy_Label']
-        
-        classifier = RandomForestClassifier(n_estimators=100, random_state=42)
-        classifier.fit(X, y)
+        # Use TF-IDF and Random Forest from the fitted catalog index
+        index = index or get_catalog_index(df)
+        vectorizer, classifier, label_encoder = index.get_classifier()
         
         user_vector = vectorizer.transform([enhanced_input])
-        prediction = classifier.predict(user_vector)
         probabilities = classifier.predict_proba(user_vector)[0]
+        best_classes = top_k_indices(probabilities, top_k)
         
-        label_encoder = LabelEncoder()
-        label_encoder.fit(df['Policies'])
-        policy_name = label_encoder.inverse_transform(prediction)[0]
-        confidence = max(probabilities)
+        policy_names = label_encoder.inverse_transform(classifier.classes_[best_classes])
+        confidence = probabilities[best_classes[0]]
         
         # Return in array format expected by frontend
-        policy_array = [{
+        matches = [{
             'name': policy_name,
-            'why': policy_descriptions.get(policy_name, 'No description available')
-        }]
+            'why': policy_descriptions.get(policy_name, 'No description available'),
+            'score': float(probability)
+        } for policy_name, probability in zip(policy_names, probabilities[best_classes])]
+        policy_array = format_policies(matches, top_k)
         
         return {
             'policies': policy_array,  # Frontend expects 'policies' array
@@ -293,30 +1056,175 @@ def predict_policy_original(user_input, username, df, policy_descriptions):
         print(f"Original prediction error: {str(e)}", file=sys.stderr)
         return {'error': f"Original prediction failed: {str(e)}"}
     
+TOP_K_ERROR = "top_k must be a positive integer"
+
+def parse_top_k(value):
+    """top_k of a request as a positive int, or None when it is not one"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, str):
+        try:
+            value = int(value)
+        except ValueError:
+            return None
+    if not isinstance(value, int) or value < 1:
+        return None
+    return value
+
+def serve(input_stream=None, output_stream=None):
+    """Serve newline-delimited JSON requests from one long-lived process
+
+    Each input line is a JSON object with 'description', 'username' and
+    optional 'id', 'top_k', 'cascade', 'with_trust' and 'timings'; each output line is {"id": ..., "result": ...} where
+    'result' is exactly what the one-shot CLI would print. With 'timings' the
+    line also gets the request's 'timings_ms'.
+    """
+    from catalog_watcher import CatalogWatcher
+    
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    
+    # Load the catalog once and hot-reload it when the workbook changes
+    watcher = CatalogWatcher().start()
+    timing.info("Loaded %d policies from Excel, serving requests", len(watcher.snapshot.df))
+    served_version = None
+    
+    for line in input_stream:
+        line = line.strip()
+        if not line:
+            continue
+        
+        timing.reset()
+        
+        # Each request works on one immutable snapshot, even if a reload lands meanwhile
+        snapshot = watcher.snapshot
+        if snapshot.version != served_version:
+            register_catalog_index(snapshot.index)
+            served_version = snapshot.version
+        
+        request_id = None
+        request = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            top_k = parse_top_k(request.get('top_k', 1))
+            if top_k is None:
+                result = {'error': TOP_K_ERROR}
+            else:
+                result = predict_policy(
+                    request.get('description', ''),
+                    request.get('username'),
+                    snapshot.df,
+                    snapshot.policy_descriptions,
+                    top_k=min(top_k, len(snapshot.df)),
+                    cascade=request.get('cascade')
+                )
+            if request.get('with_trust') and 'error' not in result:
+                attach_trust_scores(result, snapshot.df, trust_profile(result, request), snapshot.raw,
+                                    (snapshot.trust_scores, snapshot.trust_rows))
+        except Exception as e:
+            result = {
+                'error': str(e),
+                'traceback': traceback.format_exc()
+            }
+        
+        output_stream.write(timing.dumps({'id': request_id, 'result': result}, timing.requested(request)) + '\n')
+        output_stream.flush()
+
+def read_batch_requests(input_stream, input_format):
+    """Yield (request_id, username, description) from CSV or JSONL input"""
+    if input_format == 'csv':
+        rows = csv.DictReader(input_stream)
+    else:
+        rows = (json.loads(line) for line in input_stream if line.strip())
+    
+    for position, row in enumerate(rows):
+        yield row.get('id', position), row.get('username') or None, row.get('description') or ''
+
+def run_batch(argv):
+    """Command-line entry point for batch recommendations"""
+    parser = argparse.ArgumentParser(prog='policy_recommend.py --batch',
+                                     description='Recommend policies for a CSV/JSONL file of username, description rows')
+    parser.add_argument('input', help="CSV or JSONL input file, or '-' for JSONL on stdin")
+    parser.add_argument('--output', default='-', help="JSONL output file (default: stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (default: from file extension)")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="Queries scored per sparse product")
+    parser.add_argument('--top-k', type=int, default=1, help="Policies returned per request")
+    parser.add_argument('--with-trust', action='store_true', help="Attach trust scores to every returned policy")
+    args = parser.parse_args(argv)
+    if args.top_k < 1:
+        parser.error(TOP_K_ERROR)
+    
+    input_format = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+    input_stream = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    
+    try:
+        df, policy_descriptions, label_encoder = load_and_prepare_data()
+        timing.debug("Loaded %d policies from Excel", len(df))
+        
+        start = time.perf_counter()
+        request_ids = deque()  # ids of requests read but not yet written
+        
+        def requests():
+            for request_id, username, description in read_batch_requests(input_stream, input_format):
+                request_ids.append(request_id)
+                yield username, description
+        
+        count = 0
+        for result in predict_policy_batch(requests(), df, policy_descriptions, chunk_size=args.chunk_size,
+                                             top_k=min(args.top_k, len(df))):
+            if args.with_trust and 'error' not in result:
+                attach_trust_scores(result, df, trust_profile(result))
+            output_stream.write(json.dumps({'id': request_ids.popleft(), 'result': result}) + '\n')
+            count += 1
+        
+        elapsed = time.perf_counter() - start
+        timing.info("Scored %d requests in %.2fs", count, elapsed)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+TEST_QUERIES = [
+    "Give me a high risk policy",
+    "I need a long term policy",
+    "Suggest a pension plan",
+    "I want term insurance",
+    "Child education policy"
+]
+
 def main():
     """Main function with comprehensive error handling"""
+    timing.record_import()
     try:
+        if len(sys.argv) == 2 and sys.argv[1] == '--serve':
+            serve()
+            return
+        
+        if len(sys.argv) >= 2 and sys.argv[1] == '--batch':
+            run_batch(sys.argv[2:])
+            return
+        
         if len(sys.argv) < 2:
             # Test mode
             print("No arguments provided. Running test mode...", file=sys.stderr)
-            test_cases = [
-                "Give me a high risk policy",
-                "I need a long term policy", 
-                "Suggest a pension plan",
-                "I want term insurance",
-                "Child education policy"
-            ]
-            
             df, policy_descriptions, label_encoder = load_and_prepare_data()
             print(f"Loaded {len(df)} policies from Excel", file=sys.stderr)
             
-            for test_case in test_cases:
+            for test_case in TEST_QUERIES:
                 print(f"\nTesting: {test_case}", file=sys.stderr)
                 result = predict_policy_enhanced(test_case, "test_user", df, policy_descriptions)
                 print(json.dumps(result, indent=2))
             return
         
         # Parse arguments
+        top_k = 1
+        cascade = None
+        request = None
         if len(sys.argv) == 2:
             # Single argument could be user description or JSON data
             arg = sys.argv[1]
@@ -325,6 +1233,9 @@ def main():
                 data = json.loads(arg)
                 user_description = data.get('description', '')
                 username = data.get('username')
+                top_k = parse_top_k(data.get('top_k', 1))
+                cascade = data.get('cascade')
+                request = data
             except json.JSONDecodeError:
                 # Treat as plain description
                 user_description = arg
@@ -333,18 +1244,26 @@ def main():
             user_description = sys.argv[1]
             username = sys.argv[2] if len(sys.argv) > 2 else None
         
-        print(f"Processing request for user: {username}", file=sys.stderr)
-        print(f"User description: {user_description}", file=sys.stderr)
+        if top_k is None:
+            print(json.dumps({'error': TOP_K_ERROR}))
+            sys.exit(1)
+        
+        timing.debug("Processing request for user: %s", username)
+        timing.debug("User description: %s", user_description)
         
         # Load and prepare data
         df, policy_descriptions, label_encoder = load_and_prepare_data()
-        print(f"Loaded {len(df)} policies from Excel", file=sys.stderr)
+        timing.debug("Loaded %d policies from Excel", len(df))
+        
+        # Make prediction using enhanced method, or the ranking cascade when requested
+        result = predict_policy(user_description, username, df, policy_descriptions, top_k=min(top_k, len(df)), cascade=cascade)
         
-        # Make prediction using enhanced method
-        result = predict_policy_enhanced(user_description, username, df, policy_descriptions)
+        # Trust scores for every returned policy, in the same process and response
+        if request and request.get('with_trust') and 'error' not in result:
+            attach_trust_scores(result, df, trust_profile(result, request))
         
-        # Output result as JSON
-        print(json.dumps(result))
+        # Output result as JSON, with per-stage timings when requested
+        print(timing.dumps(result, timing.requested(request)))
         
     except Exception as e:
         error_result = {
@@ -0,0 +1,123 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'users.db')
+
+PROFILE_COLUMNS = "username, gender, age, marital_status, salary, balance"
+PROFILE_QUERY = f"SELECT {PROFILE_COLUMNS} FROM users WHERE username = ?"
+
+def row_to_profile(row):
+    """Profile dict with the defaults the recommenders expect for missing fields"""
+    return {
+        'gender': row[1] or 'Unknown',
+        'age': row[2] or 25,
+        'marital_status': row[3] or 'Single',
+        'salary': row[4] or 50000,
+        'balance': row[5] or 10000
+    }
+
+class ProfileRepository:
+    """Read-only access to user profiles in users.db
+
+    One connection is opened lazily in read-only, query_only mode and reused
+    for every lookup, with a small TTL-bounded LRU cache in front of it.
+    Lookups return None for unknown users.
+    """
+
+    def __init__(self, db_path=DB_PATH, cache_size=1024, ttl_seconds=60.0, batch_size=500):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size  # stays under SQLite's bound-parameter limit
+        self._connection = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            if not os.path.exists(self.db_path):
+                raise FileNotFoundError(f"Database file not found at: {self.db_path}")
+            # Read-only URI connections never take write locks, so they coexist with WAL writers
+            connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            connection.execute("PRAGMA query_only = ON")
+            self._connection = connection
+        return self._connection
+
+    def _cached(self, username, now):
+        entry = self._cache.get(username)
+        if entry is None:
+            return False, None
+        expires_at, profile = entry
+        if expires_at < now:
+            del self._cache[username]
+            return False, None
+        self._cache.move_to_end(username)
+        return True, profile
+
+    def _store(self, username, profile, now):
+        self._cache[username] = (now + self.ttl_seconds, profile)
+        self._cache.move_to_end(username)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, username):
+        """Profile for one username, or None if the user does not exist"""
+        with self._lock:
+            now = time.monotonic()
+            found, profile = self._cached(username, now)
+            if not found:
+                row = self._connect().execute(PROFILE_QUERY, (username,)).fetchone()
+                profile = row_to_profile(row) if row else None
+                self._store(username, profile, now)
+        return dict(profile) if profile else None
+
+    def get_many(self, usernames):
+        """Profiles for many usernames as {username: profile or None}"""
+        with self._lock:
+            now = time.monotonic()
+            profiles = {}
+            missing = []
+            for username in dict.fromkeys(usernames):
+                found, profile = self._cached(username, now)
+                if found:
+                    profiles[username] = profile
+                else:
+                    missing.append(username)
+
+            connection = self._connect() if missing else None
+            for start in range(0, len(missing), self.batch_size):
+                batch = missing[start:start + self.batch_size]
+                placeholders = ', '.join('?' * len(batch))
+                rows = connection.execute(
+                    f"SELECT {PROFILE_COLUMNS} FROM users WHERE username IN ({placeholders})", batch
+                ).fetchall()
+                found_rows = {row[0]: row for row in rows}
+                for username in batch:
+                    row = found_rows.get(username)
+                    profiles[username] = row_to_profile(row) if row else None
+                    self._store(username, profiles[username], now)
+
+        return {username: dict(profile) if profile else None for username, profile in profiles.items()}
+
+    def clear(self):
+        """Drop cached profiles, e.g. after a profile update"""
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+_REPOSITORIES = {}
+
+def get_profile_repository(db_path=DB_PATH):
+    """Shared repository per database path for the lifetime of the process"""
+    repository = _REPOSITORIES.get(db_path)
+    if repository is None:
+        repository = _REPOSITORIES[db_path] = ProfileRepository(db_path)
+    return repository
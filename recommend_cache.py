@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import atexit
+import hashlib
+import sqlite3
+
+CACHE_PATH = os.environ.get(
+    'RECOMMEND_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recommend_cache.db')
+)
+
+# Part of every key; bump it when matching or the result format changes so
+# entries written by older code are never served
+KEY_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0), ('evictions', 0);
+"""
+
+def normalize_query(query):
+    """Cache-key form of a query; only changes that cannot alter the match
+
+    Both rule keywords and TF-IDF tokens are matched on lowercased text, and
+    surrounding whitespace never contributes to a match. Inner whitespace is
+    kept because multi-word keywords such as 'money back' depend on it.
+    """
+    return str(query).strip().lower()
+
+class RecommendationCache:
+    """On-disk cache of matching results shared by short-lived processes
+
+    Backed by SQLite in WAL mode, so readers never block and concurrent
+    writers from several processes are serialised by SQLite's own locking.
+    get() only reads; hit/miss counts and access times are buffered and
+    written with the next set() or every flush_every lookups, skipped while
+    another process holds the write lock. Entries expire after ttl_seconds,
+    and the least recently used entries are evicted once the cache holds
+    more than max_entries.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl_seconds=24 * 3600, max_entries=10000, timeout=5.0, flush_every=32):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.flush_every = flush_every
+        # Lookups not yet written to the database
+        self._hits = 0
+        self._misses = 0
+        self._accessed = {}
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    @staticmethod
+    def make_key(query, catalog_version, **options):
+        """Key for a normalized query against one catalog version and KEY_VERSION"""
+        payload = json.dumps([KEY_VERSION, normalize_query(query), catalog_version, options], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Cached value for key, or None on a miss or expiry"""
+        now = time.time()
+        row = self._connection.execute(
+            "SELECT value, created_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < now - self.ttl_seconds:
+            self._misses += 1
+            value = None
+        else:
+            self._hits += 1
+            self._accessed[key] = now
+            value = json.loads(row[0])
+        if self._hits + self._misses >= self.flush_every:
+            self.flush(wait=False)
+        return value
+
+    def _write_pending(self):
+        """Apply buffered lookups; the caller holds the write transaction"""
+        connection = self._connection
+        connection.executemany(
+            "UPDATE results SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+        )
+        connection.execute("UPDATE stats SET value = value + ? WHERE name = 'hits'", (self._hits,))
+        connection.execute("UPDATE stats SET value = value + ? WHERE name = 'misses'", (self._misses,))
+
+    def _clear_pending(self):
+        self._hits = 0
+        self._misses = 0
+        self._accessed = {}
+
+    def flush(self, wait=True):
+        """Write buffered hit/miss counts and access times
+
+        With wait=False this gives up at once, keeping them buffered, when
+        another process holds the write lock. Returns whether they were written.
+        """
+        if not (self._hits or self._misses):
+            return True
+        connection = self._connection
+        if not wait:
+            connection.execute("PRAGMA busy_timeout = 0")
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            return False
+        finally:
+            if not wait:
+                connection.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+        try:
+            self._write_pending()
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self._clear_pending()
+        return True
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value, evicting expired and LRU entries"""
+        now = time.time()
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Access times first, so eviction sees the buffered hits
+            self._write_pending()
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            evicted = connection.execute(
+                "DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            overflow = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                # Evict a little extra so eviction does not run on every write
+                evicted += connection.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed_at LIMIT ?)",
+                    (overflow + self.max_entries // 10,)
+                ).rowcount
+            if evicted:
+                connection.execute("UPDATE stats SET value = value + ? WHERE name = 'evictions'", (evicted,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self._clear_pending()
+
+    def stats(self):
+        """Hit/miss/eviction counters, including buffered lookups, and current entry count"""
+        counters = dict(self._connection.execute("SELECT name, value FROM stats").fetchall())
+        counters['hits'] += self._hits
+        counters['misses'] += self._misses
+        counters['entries'] = self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return counters
+
+    def clear(self):
+        self._connection.execute("DELETE FROM results")
+        self._connection.execute("UPDATE stats SET value = 0")
+        self._clear_pending()
+
+    def close(self):
+        """Write buffered lookups if the write lock is free, then close"""
+        try:
+            self.flush(wait=False)
+        except sqlite3.Error:
+            pass
+        self._connection.close()
+
+_CACHE = None
+
+def get_recommendation_cache():
+    """Process-wide cache, or None when disabled or unavailable"""
+    global _CACHE
+    if os.environ.get('RECOMMEND_CACHE_DISABLED', '') in ('1', 'true', 'yes'):
+        return None
+    if _CACHE is None:
+        try:
+            _CACHE = RecommendationCache()
+            atexit.register(_CACHE.close)
+        except Exception as e:
+            print(f"Recommendation cache unavailable: {str(e)}", file=sys.stderr)
+            _CACHE = False
+    return _CACHE or None
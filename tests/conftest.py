@@ -0,0 +1,6 @@
+"""Tests import the top-level modules of the repository directly"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
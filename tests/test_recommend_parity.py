@@ -0,0 +1,32 @@
+"""Vectorized ingest and inverted-index semantic matching against their reference paths on sbilife.xlsx"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import policy_recommend
+from benchmark_recommend import EDGE_TEXTS, ingest_mismatches, semantic_case
+
+@pytest.fixture(scope='module')
+def raw():
+    return policy_recommend.load_raw_catalog()
+
+@pytest.fixture(scope='module')
+def index(raw):
+    df = policy_recommend.prepare_catalog(raw.copy())[0]
+    return policy_recommend.PolicyCatalogIndex(df, persist_classifier=False, features='tfidf')
+
+def test_ingest_matches_per_row_stages(raw):
+    assert ingest_mismatches(raw) == 0
+
+def test_ingest_matches_per_row_stages_on_edge_cases():
+    edge = pd.DataFrame({'Policies': EDGE_TEXTS, 'Desc': EDGE_TEXTS[::-1], 'Why': EDGE_TEXTS, 'WhyGet': EDGE_TEXTS})
+    assert ingest_mismatches(edge) == 0
+
+@pytest.mark.parametrize('k', [1, 5, 20])
+def test_semantic_candidates_match_full_scan(index, k):
+    rng = np.random.default_rng(0)
+    terms = list(index.semantic_vectorizer.vocabulary_)
+    queries = policy_recommend.TEST_QUERIES + [text for text in EDGE_TEXTS if isinstance(text, str)]
+    queries += [' '.join(rng.choice(terms, size=rng.integers(1, 6))) for _ in range(200)]
+    assert semantic_case(index, queries, k)[2] == 0
@@ -0,0 +1,25 @@
+"""Indexed lookups, batch scoring and policy type classification against their reference paths on sbilife.xlsx"""
+
+import os
+import contextlib
+import pytest
+
+from trust_policy import PolicyClassifierAndTrustCalculator, PolicyScoreIndex
+from benchmark_trust import (lookup_names, lookup_mismatches, random_profiles, batch_parity,
+                             catalog_policies, adhoc_policies, type_mismatches)
+
+@pytest.fixture(scope='module')
+def calculator():
+    with contextlib.redirect_stderr(open(os.devnull, 'w')):
+        return PolicyClassifierAndTrustCalculator()
+
+def test_indexed_lookup_matches_pandas_scans(calculator):
+    sheet = calculator.policy_data
+    assert lookup_mismatches(sheet, PolicyScoreIndex(sheet), lookup_names(sheet, 500)) == []
+
+def test_batch_scores_match_scalar(calculator):
+    assert batch_parity(calculator, random_profiles(2000), 2000, synthetic_size=200) == {'sheet': 0, 'synthetic': 0}
+
+def test_policy_types_match_keyword_scans(calculator):
+    mismatches = type_mismatches(calculator, catalog_policies(calculator.policy_data), adhoc_policies(500))
+    assert mismatches == {'catalog': 0, 'adhoc': 0}
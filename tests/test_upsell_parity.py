@@ -0,0 +1,19 @@
+"""NumPy tree engine and pandas-free feature encoding against the scikit-learn pipeline"""
+
+import pytest
+
+from upsell_tree_engine import export_model
+from benchmark_upsell import synthetic_customers, synthetic_pipeline, engine_mismatches, encoder_mismatches
+
+@pytest.fixture(scope='module')
+def pipeline():
+    # A small stand-in for the upsell model, which is not part of the repository
+    return synthetic_pipeline(2000, n_trees=30, n_stages=10)
+
+def test_engine_matches_pipeline(pipeline):
+    difference, mismatches = engine_mismatches(pipeline, export_model(pipeline), synthetic_customers(2000, seed=1), 1e-9)
+    assert mismatches == {'probabilities': 0, 'classes': 0}
+
+def test_encoder_matches_column_transformers(pipeline):
+    records, mismatches = encoder_mismatches(pipeline, synthetic_customers(2000, seed=2))
+    assert mismatches == {name: {'float64': 0, 'float32': 0} for name in ('preprocessor.pkl', 'model')}
@@ -0,0 +1,102 @@
+"""Per-stage timings and level-gated stderr logging for the Python scripts
+
+span(name) is a context manager and timed(name) a decorator; both add the
+elapsed milliseconds of a stage to the current timings. record_import()
+records the time from process start (the first import of this module) to
+the call. dumps() serialises a result and, when timings were requested with
+a 'timings' flag or SCRIPT_TIMINGS=1, splices a 'timings_ms' block onto it.
+
+debug(), info() and warning() print to stderr only at or above
+SCRIPT_LOG_LEVEL (debug, info, warning or error; default info). Arguments
+are %-formatted lazily, so suppressed messages cost one level comparison.
+"""
+
+import os
+import sys
+import json
+import time
+import functools
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+
+LOG_LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+LOG_LEVEL = LOG_LEVELS.get(os.environ.get('SCRIPT_LOG_LEVEL', 'info').lower(), LOG_LEVELS['info'])
+
+_timings = {}
+_start = PROCESS_START
+
+def log_enabled(level):
+    return LOG_LEVELS[level] >= LOG_LEVEL
+
+def log(level, message, *args):
+    """Print message % args to stderr if level is enabled"""
+    if LOG_LEVELS[level] >= LOG_LEVEL:
+        print(message % args if args else message, file=sys.stderr)
+
+def debug(message, *args):
+    log('debug', message, *args)
+
+def info(message, *args):
+    log('info', message, *args)
+
+def warning(message, *args):
+    log('warning', message, *args)
+
+def reset():
+    """Start a new set of timings, e.g. for the next request of a server"""
+    global _start
+    _timings.clear()
+    _start = time.perf_counter()
+
+def record(name, elapsed_ms):
+    """Add elapsed_ms to stage name; repeated stages accumulate"""
+    _timings[name] = _timings.get(name, 0.0) + elapsed_ms
+
+def record_import(name='import'):
+    """Record the time from process start to now, i.e. imports and module setup"""
+    record(name, (time.perf_counter() - PROCESS_START) * 1000)
+
+@contextmanager
+def span(name):
+    """Time the body of a with block as stage name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+def timed(name):
+    """Decorator timing every call of a function as stage name"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def timings():
+    """Stage timings so far plus 'total' since process start or the last reset()"""
+    result = {name: round(elapsed_ms, 3) for name, elapsed_ms in _timings.items()}
+    result['total'] = round((time.perf_counter() - _start) * 1000, 3)
+    return result
+
+def requested(options=None):
+    """Whether to attach timings: SCRIPT_TIMINGS=1 or a true 'timings' field in options"""
+    if os.environ.get('SCRIPT_TIMINGS', '') in ('1', 'true', 'yes'):
+        return True
+    return isinstance(options, dict) and bool(options.get('timings'))
+
+def dumps(result, with_timings=False):
+    """json.dumps(result), timed as 'serialization', with 'timings_ms' appended if asked
+
+    The block is spliced onto the encoded object so it can include the time
+    spent encoding it.
+    """
+    with span('serialization'):
+        encoded = json.dumps(result)
+    if not with_timings or not isinstance(result, dict):
+        return encoded
+    separator = ', ' if result else ''
+    return f'{encoded[:-1]}{separator}"timings_ms": {json.dumps(timings())}}}'
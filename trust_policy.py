@@ -1,24 +1,267 @@
 #!/usr/bin/env python3
+import timing  # first, so its import time marks the process start
 import sys
 import json
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
+import re
+from functools import lru_cache
+from catalog_bundle import load_raw_catalog
+from keyword_matcher import KeywordMatcher
+
+SCORE_DEFAULTS = {
+    'transparency_score': 0.8,
+    'suitability_score': 0.8,
+    'financial_safety_score': 0.85,
+    'compliance_score': 0.9
+}
+REGEX_METACHARACTERS = set('.^$*+?{}[]\\|()')
+
+# Batch trust scoring: profile defaults and the step factors of calculate_trust_score
+PROFILE_DEFAULTS = {'age': 35, 'salary': 50000, 'credit_score': 650, 'balance': 100000}
+TRUST_LEVELS = [
+    # (confidence_level, interpretation), indexed by trust level code
+    ("Low", {
+        'level': "Low Trust",
+        'description': "This policy has concerning trust indicators for your profile.",
+        'recommendation': "Review Thoroughly"
+    }),
+    ("Medium", {
+        'level': "Medium Trust",
+        'description': "This policy has good trust indicators but may require some consideration.",
+        'recommendation': "Consider Carefully"
+    }),
+    ("High", {
+        'level': "High Trust",
+        'description': "This policy shows strong alignment with your profile and has excellent trust indicators.",
+        'recommendation': "Recommended"
+    })
+]
+
+def profile_arrays(profiles):
+    """Column arrays of age, salary, credit_score and balance from a DataFrame or a list of dicts
+    
+    Missing fields take calculate_trust_score's defaults. Missing or NaN
+    values get the neutral factor 1.0, as they do in the scalar path.
+    """
+    if isinstance(profiles, pd.DataFrame):
+        return {
+            field: profiles[field].to_numpy(dtype=float) if field in profiles.columns else np.full(len(profiles), float(default))
+            for field, default in PROFILE_DEFAULTS.items()
+        }
+    return {
+        field: np.array([profile.get(field, default) for profile in profiles], dtype=float)
+        for field, default in PROFILE_DEFAULTS.items()
+    }
+
+def adjustment_factors(age, credit_score, salary, balance):
+    """Step factors of calculate_trust_score for arrays of profile values"""
+    return (
+        np.select([age < 30, age > 50], [1.05, 0.98], 1.0),
+        np.select([credit_score > 750, credit_score < 600], [1.1, 0.9], 1.0),
+        np.select([salary > 100000, salary < 30000], [1.05, 0.95], 1.0),
+        np.select([balance > 200000, balance < 50000], [1.03, 0.97], 1.0)
+    )
+
+def round_scores(scores, decimals=3):
+    """Python's round() for an array of floats
+    
+    np.round scales by 10**decimals, which can round the other way when a
+    value sits next to a tie. Those values are re-rounded with round().
+    """
+    rounded = np.round(scores, decimals)
+    scaled = scores * 10.0 ** decimals
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        # Scores repeat heavily across profiles, so round each distinct value once
+        values, inverse = np.unique(scores[near_tie], return_inverse=True)
+        rounded[near_tie] = np.array([round(float(value), decimals) for value in values])[inverse]
+    return rounded
+
+def policy_score_rows(policy_data):
+    """(n_rows, 4) scores of every sheet row, as policy_score_matrix reads them
+    
+    Score columns the sheet lacks are 0.8, as add_missing_columns fills
+    them; a row with an unreadable cell gets the default scores.
+    """
+    columns = [
+        policy_data[column].tolist() if column in policy_data.columns else [0.8] * len(policy_data)
+        for column in SCORE_DEFAULTS
+    ]
+    rows = np.empty((len(policy_data), len(SCORE_DEFAULTS)))
+    for row, values in enumerate(zip(*columns)):
+        try:
+            rows[row] = [float(value) for value in values]
+        except Exception:
+            rows[row] = list(SCORE_DEFAULTS.values())
+    return rows
+
+def trust_scores_from_matrix(score_matrix, profiles, chunk_size=1000000):
+    """Trust scores of policies, given as score rows, for every profile
+    
+    score_matrix is (n_policies, 4) in SCORE_DEFAULTS order. Work proceeds
+    in blocks of about chunk_size pairs. Returns arrays of shape
+    (n_policies, n_profiles): 'trust_score' with the same rounding as
+    calculate_trust_score, 'level' as an index into TRUST_LEVELS, and
+    'confidence_level' and 'interpretation' from it.
+    """
+    transparency, suitability, financial_safety, compliance = np.asarray(score_matrix, dtype=float).reshape(-1, len(SCORE_DEFAULTS)).T
+    # Same operation order as the scalar path, so every pair rounds identically
+    base_trust_score = suitability * 0.4 + financial_safety * 0.3 + transparency * 0.2 + compliance * 0.1
+
+    columns = profile_arrays(profiles)
+    age_factor, credit_factor, salary_factor, balance_factor = adjustment_factors(
+        columns['age'], columns['credit_score'], columns['salary'], columns['balance'])
+
+    n_policies, n_profiles = len(base_trust_score), len(age_factor)
+    trust_score = np.empty((n_policies, n_profiles))
+    level = np.empty((n_policies, n_profiles), dtype=np.int8)
+    step = max(1, chunk_size // max(n_policies, 1))
+    for start in range(0, n_profiles, step):
+        block = slice(start, start + step)
+        adjusted = (base_trust_score[:, None] * age_factor[block] * credit_factor[block]
+                    * salary_factor[block] * balance_factor[block])
+        # max(0.0, min(1.0, x)), including NaN -> 1.0
+        adjusted = np.where(adjusted < 1.0, adjusted, 1.0)
+        adjusted = np.where(adjusted > 0.0, adjusted, 0.0)
+        level[:, block] = (adjusted >= 0.6).astype(np.int8) + (adjusted >= 0.8)
+        trust_score[:, block] = round_scores(adjusted)
+
+    confidence_levels = np.array([confidence for confidence, _ in TRUST_LEVELS], dtype=object)
+    interpretations = np.empty(len(TRUST_LEVELS), dtype=object)
+    interpretations[:] = [interpretation for _, interpretation in TRUST_LEVELS]
+    return {
+        'trust_score': trust_score,
+        'level': level,
+        'confidence_level': confidence_levels[level],
+        'interpretation': interpretations[level]
+    }
+
+# Policy type keywords in classification precedence order
+POLICY_TYPE_KEYWORDS = {
+    'Term Insurance': ['term', 'protection', 'cover', 'shield'],
+    'ULIP': ['ulip', 'investment', 'growth', 'market', 'fund'],
+    'Endowment': ['endowment', 'traditional', 'assured', 'guaranteed'],
+    'Pension': ['pension', 'retirement', 'annuity'],
+    'Child Plan': ['child', 'education', 'future'],
+    'Money Back': ['money back', 'return', 'savings'],
+    'Health Insurance': ['health', 'medical', 'critical']
+}
+POLICY_TYPE_MATCHER = KeywordMatcher(POLICY_TYPE_KEYWORDS)
+
+@lru_cache(maxsize=4096)
+def policy_type_of_text(combined_text):
+    """Policy type of a lowercased 'name description' text; memoised for ad-hoc policies"""
+    return POLICY_TYPE_MATCHER.first_match(combined_text, 'General Insurance')
+
+class PolicyScoreIndex:
+    """Policy name lookups over a loaded policy sheet
+    
+    Built once per sheet. Exact names resolve through a dict of lowercased
+    names. Partial names intersect the trigram posting sets of the query and
+    confirm candidates in row order. Both return the first matching row, as
+    the pandas column scans did. Names that str.contains would treat as a
+    regex, or that are too short for trigrams, are searched row by row.
+    
+    Policy types of the catalog rows are classified here too, keyed by the
+    (name, description) pairs classify_policy_type is called with: the name
+    alone and the name with each description column.
+    """
+    
+    def __init__(self, policy_data):
+        self.source = policy_data
+        self.names = [name.lower() if isinstance(name, str) else None for name in policy_data['Policies'].tolist()]
+        
+        self.exact_rows = {}
+        self.trigram_rows = {}
+        for row, name in enumerate(self.names):
+            if name is None:
+                continue
+            self.exact_rows.setdefault(name, row)
+            for start in range(len(name) - 2):
+                self.trigram_rows.setdefault(name[start:start + 3], set()).add(row)
+        
+        # Raw cell values; converted per lookup so bad cells fail as they did before
+        columns = [
+            policy_data[column].tolist() if column in policy_data.columns else [default] * len(policy_data)
+            for column, default in SCORE_DEFAULTS.items()
+        ]
+        for column, default in [('Policies', None), ('Description', ''), ('Combined_Text', '')]:
+            columns.append(policy_data[column].tolist() if column in policy_data.columns else [default] * len(policy_data))
+        self.records = list(zip(*columns))
+        
+        raw_names = policy_data['Policies'].tolist()
+        pairs = [(name, '') for name in raw_names]
+        for column in ('Desc', 'Description'):
+            if column in policy_data.columns:
+                pairs += zip(raw_names, policy_data[column].tolist())
+        pairs = [pair for pair in pairs if isinstance(pair[0], str) and isinstance(pair[1], str)]
+        texts = [f"{name} {description}".lower() for name, description in pairs]
+        policy_types = POLICY_TYPE_MATCHER.first_names(POLICY_TYPE_MATCHER.masks(texts), 'General Insurance')
+        self.policy_types = dict(zip(pairs, policy_types.tolist()))
+    
+    def find_exact(self, name_lower):
+        """First row whose lowercased name equals name_lower, or None"""
+        return self.exact_rows.get(name_lower)
+    
+    def find_partial(self, name_lower):
+        """First row whose lowercased name contains name_lower, or None
+        
+        Follows str.contains: name_lower is a regular expression, so invalid
+        patterns raise re.error.
+        """
+        if len(name_lower) < 3 or REGEX_METACHARACTERS.intersection(name_lower):
+            pattern = re.compile(name_lower)
+            return next((row for row, name in enumerate(self.names) if name is not None and pattern.search(name)), None)
+        
+        postings = []
+        for start in range(len(name_lower) - 2):
+            rows = self.trigram_rows.get(name_lower[start:start + 3])
+            if rows is None:
+                return None
+            postings.append(rows)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        return next((row for row in sorted(candidates) if name_lower in self.names[row]), None)
+    
+    def scores(self, row, policy_name):
+        """Score record of a row in get_policy_scores_from_excel's format"""
+        transparency, suitability, financial_safety, compliance, name, description, combined_text = self.records[row]
+        return {
+            'transparency_score': float(transparency),
+            'suitability_score': float(suitability),
+            'financial_safety_score': float(financial_safety),
+            'compliance_score': float(compliance),
+            'policy_name': policy_name if name is None else name,
+            'description': description,
+            'combined_text': combined_text
+        }
 
 class PolicyClassifierAndTrustCalculator:
-    def __init__(self, excel_path=None):
-        """Initialize with Excel file path"""
+    def __init__(self, excel_path=None, policy_data=None):
+        """Initialize with Excel file path, or with an already loaded raw policy sheet"""
         if excel_path is None:
             excel_path = os.path.join(os.path.dirname(__file__), 'sbilife.xlsx')
         self.excel_path = excel_path
         self.policy_data = None
-        self.load_policy_data()
+        self._score_index = None
+        if policy_data is None:
+            self.load_policy_data()
+        else:
+            # Shallow copy: missing score columns are added without touching the caller's frame
+            self.policy_data = policy_data.copy(deep=False)
+            self.add_missing_columns()
+        try:
+            self.get_score_index()
+        except Exception as e:
+            print(f"[TRUST] Error indexing policy data: {e}", file=sys.stderr)
     
     def load_policy_data(self):
         """Load policy data from Excel file"""
         try:
-            print(f"[TRUST] Attempting to load Excel file from: {self.excel_path}", file=sys.stderr)
+            timing.debug("[TRUST] Attempting to load Excel file from: %s", self.excel_path)
             
             # Check if file exists
             if not os.path.exists(self.excel_path):
@@ -35,24 +278,12 @@ class PolicyClassifierAndTrustCalculator:
                 })
                 return
             
-            # Try to load Excel file
-            self.policy_data = pd.read_excel(self.excel_path)
-            print(f"[TRUST] Successfully loaded {len(self.policy_data)} policies from Excel", file=sys.stderr)
-            print(f"[TRUST] Excel columns: {self.policy_data.columns.tolist()}", file=sys.stderr)
+            # Load the sheet from the compiled bundle, parsing Excel only when it is stale
+            self.policy_data = load_raw_catalog(self.excel_path)
+            timing.debug("[TRUST] Successfully loaded %d policies from Excel", len(self.policy_data))
+            timing.debug("[TRUST] Excel columns: %s", self.policy_data.columns.tolist())
             
-            # Ensure required columns exist
-            required_columns = ['Policies', 'transparency_score', 'suitability_score', 
-                              'financial_safety_score', 'compliance_score']
-            
-            missing_columns = [col for col in required_columns if col not in self.policy_data.columns]
-            if missing_columns:
-                print(f"[TRUST] Missing required columns: {missing_columns}", file=sys.stderr)
-                # Add missing columns with default values
-                for col in missing_columns:
-                    if col == 'Policies':
-                        self.policy_data[col] = ['Default Policy']
-                    else:
-                        self.policy_data[col] = 0.8  # Default score for missing columns
+            self.add_missing_columns()
         
         except Exception as e:
             print(f"[TRUST] Error loading Excel file: {e}", file=sys.stderr)
@@ -67,45 +298,59 @@ class PolicyClassifierAndTrustCalculator:
                 'Combined_Text': ['Default policy combined text']
             })
     
+    def add_missing_columns(self):
+        """Ensure required columns exist"""
+        required_columns = ['Policies', 'transparency_score', 'suitability_score', 
+                          'financial_safety_score', 'compliance_score']
+        
+        missing_columns = [col for col in required_columns if col not in self.policy_data.columns]
+        if missing_columns:
+            timing.info("[TRUST] Missing required columns: %s", missing_columns)
+            # Add missing columns with default values
+            for col in missing_columns:
+                if col == 'Policies':
+                    self.policy_data[col] = ['Default Policy']
+                else:
+                    self.policy_data[col] = 0.8  # Default score for missing columns
+    
+    def get_score_index(self):
+        """Name index of the loaded policy data, rebuilt if policy_data is replaced"""
+        if self.policy_data is None:
+            return None
+        if self._score_index is None or self._score_index.source is not self.policy_data:
+            self._score_index = PolicyScoreIndex(self.policy_data)
+        return self._score_index
+    
     def get_policy_scores_from_excel(self, policy_name):
         """Get policy scores from Excel file"""
         try:
             if self.policy_data is None or self.policy_data.empty:
-                print(f"[TRUST] No policy data available, using default scores", file=sys.stderr)
+                timing.info("[TRUST] No policy data available, using default scores")
                 return self.get_default_scores(policy_name)
             
-            print(f"[TRUST] Searching for policy: {policy_name}", file=sys.stderr)
+            timing.debug("[TRUST] Searching for policy: %s", policy_name)
             
             # Search for policy by name (case-insensitive partial match)
             policy_name_lower = policy_name.lower()
+            index = self.get_score_index()
             
             # Try exact match first
-            exact_match = self.policy_data[self.policy_data['Policies'].str.lower() == policy_name_lower]
-            if not exact_match.empty:
-                policy_row = exact_match.iloc[0]
-                print(f"[TRUST] Found exact match for policy: {policy_name}", file=sys.stderr)
+            row = index.find_exact(policy_name_lower)
+            if row is not None:
+                timing.debug("[TRUST] Found exact match for policy: %s", policy_name)
             else:
                 # Try partial match
-                partial_match = self.policy_data[self.policy_data['Policies'].str.lower().str.contains(policy_name_lower, na=False)]
-                if not partial_match.empty:
-                    policy_row = partial_match.iloc[0]
-                    print(f"[TRUST] Found partial match for policy: {policy_name}", file=sys.stderr)
+                row = index.find_partial(policy_name_lower)
+                if row is not None:
+                    timing.debug("[TRUST] Found partial match for policy: %s", policy_name)
                 else:
-                    print(f"[TRUST] Policy '{policy_name}' not found in Excel, using default scores", file=sys.stderr)
+                    timing.info("[TRUST] Policy '%s' not found in Excel, using default scores", policy_name)
                     return self.get_default_scores(policy_name)
             
-            # Extract scores from Excel
-            scores = {
-                'transparency_score': float(policy_row.get('transparency_score', 0.8)),
-                'suitability_score': float(policy_row.get('suitability_score', 0.8)),
-                'financial_safety_score': float(policy_row.get('financial_safety_score', 0.85)),
-                'compliance_score': float(policy_row.get('compliance_score', 0.9)),
-                'policy_name': policy_row.get('Policies', policy_name),
-                'description': policy_row.get('Description', ''),
-                'combined_text': policy_row.get('Combined_Text', '')
-            }
+            # Extract scores from the indexed row
+            scores = index.scores(row, policy_name)
             
-            print(f"[TRUST] Found policy scores for '{policy_name}': {scores}", file=sys.stderr)
+            timing.debug("[TRUST] Found policy scores for '%s': %s", policy_name, scores)
             return scores
             
         except Exception as e:
@@ -127,7 +372,7 @@ class PolicyClassifierAndTrustCalculator:
     def get_enhanced_trust_scores(self, policy_name, policy_description="", user_profile=None):
         """Get enhanced trust scores with policy classification - NEW METHOD"""
         try:
-            print(f"[TRUST] Getting enhanced trust scores for policy: {policy_name}", file=sys.stderr)
+            timing.debug("[TRUST] Getting enhanced trust scores for policy: %s", policy_name)
             
             # Get policy scores from Excel
             policy_scores = self.get_policy_scores_from_excel(policy_name)
@@ -143,7 +388,7 @@ class PolicyClassifierAndTrustCalculator:
                     'description': policy_description,
                     'combined_text': policy_description
                 }
-                print(f"[TRUST] Using enhanced default scores for unknown policy: {policy_name}", file=sys.stderr)
+                timing.info("[TRUST] Using enhanced default scores for unknown policy: %s", policy_name)
             
             # Classify policy type based on name and description
             policy_type = self.classify_policy_type(policy_name, policy_description)
@@ -202,30 +447,48 @@ class PolicyClassifierAndTrustCalculator:
     def classify_policy_type(self, policy_name, policy_description=""):
         """Classify policy type based on name and description"""
         try:
-            combined_text = f"{policy_name} {policy_description}".lower()
+            # Catalog policies were classified when the sheet was indexed
+            index = self._score_index
+            if index is not None and index.source is self.policy_data and isinstance(policy_name, str) and isinstance(policy_description, str):
+                policy_type = index.policy_types.get((policy_name, policy_description))
+                if policy_type is not None:
+                    return policy_type
             
-            # Define policy type keywords
-            if any(keyword in combined_text for keyword in ['term', 'protection', 'cover', 'shield']):
-                return 'Term Insurance'
-            elif any(keyword in combined_text for keyword in ['ulip', 'investment', 'growth', 'market', 'fund']):
-                return 'ULIP'
-            elif any(keyword in combined_text for keyword in ['endowment', 'traditional', 'assured', 'guaranteed']):
-                return 'Endowment'
-            elif any(keyword in combined_text for keyword in ['pension', 'retirement', 'annuity']):
-                return 'Pension'
-            elif any(keyword in combined_text for keyword in ['child', 'education', 'future']):
-                return 'Child Plan'
-            elif any(keyword in combined_text for keyword in ['money back', 'return', 'savings']):
-                return 'Money Back'
-            elif any(keyword in combined_text for keyword in ['health', 'medical', 'critical']):
-                return 'Health Insurance'
-            else:
-                return 'General Insurance'
+            combined_text = f"{policy_name} {policy_description}".lower()
+            return policy_type_of_text(combined_text)
                 
         except Exception as e:
             print(f"[TRUST] Error classifying policy type: {e}", file=sys.stderr)
             return 'Unknown'
     
+    def policy_score_matrix(self, policy_names):
+        """(n_policies, 4) array of transparency, suitability, financial safety and compliance
+        
+        Resolves names like get_policy_scores_from_excel, without its logging:
+        unknown names and unreadable rows get the default scores.
+        """
+        index = self.get_score_index() if self.policy_data is not None and not self.policy_data.empty else None
+        matrix = np.empty((len(policy_names), 4))
+        for position, policy_name in enumerate(policy_names):
+            try:
+                policy_name_lower = policy_name.lower()
+                row = index.find_exact(policy_name_lower)
+                if row is None:
+                    row = index.find_partial(policy_name_lower)
+                scores = index.scores(row, policy_name) if row is not None else self.get_default_scores(policy_name)
+            except Exception:
+                scores = self.get_default_scores(policy_name)
+            matrix[position] = [scores[column] for column in SCORE_DEFAULTS]
+        return matrix
+    
+    def calculate_trust_scores_batch(self, policy_names, profiles, chunk_size=1000000):
+        """Trust scores of every policy for every profile
+        
+        policy_names are resolved once; profiles is a DataFrame or a list of
+        profile dicts. See trust_scores_from_matrix for the result.
+        """
+        return trust_scores_from_matrix(self.policy_score_matrix(policy_names), profiles, chunk_size)
+    
     def calculate_trust_score(self, policy_scores, user_profile):
         """Calculate trust score using policy scores and user profile"""
         try:
@@ -329,6 +592,7 @@ class PolicyClassifierAndTrustCalculator:
             return None
 
 def main():
+    timing.record_import()
     try:
         if len(sys.argv) != 3:
             raise ValueError("Usage: python trust_policy.py '<user_data_json>' '<policy_data_json>'")
@@ -337,22 +601,24 @@ def main():
         user_data = json.loads(sys.argv[1])
         policy_data = json.loads(sys.argv[2])
         
-        print(f"[TRUST] Processing trust prediction for policy: {policy_data.get('name', 'Unknown')}", file=sys.stderr)
-        print(f"[TRUST] User data: {user_data}", file=sys.stderr)
+        timing.debug("[TRUST] Processing trust prediction for policy: %s", policy_data.get('name', 'Unknown'))
+        timing.debug("[TRUST] User data: %s", user_data)
         
         # Initialize trust predictor with Excel path
         excel_path = os.path.join(os.path.dirname(__file__), 'sbilife.xlsx')
-        predictor = PolicyClassifierAndTrustCalculator(excel_path)
+        with timing.span('data_load'):
+            predictor = PolicyClassifierAndTrustCalculator(excel_path)
         
-        # Get policy scores from Excel
-        policy_name = policy_data.get('name', '')
-        policy_scores = predictor.get_policy_scores_from_excel(policy_name)
-        
-        if policy_scores is None:
-            raise ValueError(f"Policy '{policy_name}' not found in Excel file")
-        
-        # Calculate trust score
-        trust_result = predictor.calculate_trust_score(policy_scores, user_data)
+        with timing.span('inference'):
+            # Get policy scores from Excel
+            policy_name = policy_data.get('name', '')
+            policy_scores = predictor.get_policy_scores_from_excel(policy_name)
+            
+            if policy_scores is None:
+                raise ValueError(f"Policy '{policy_name}' not found in Excel file")
+            
+            # Calculate trust score
+            trust_result = predictor.calculate_trust_score(policy_scores, user_data)
         
         if trust_result is None:
             raise ValueError("Failed to calculate trust score")
@@ -370,10 +636,10 @@ def main():
             'prediction_timestamp': datetime.now().isoformat()
         }
         
-        print(f"[TRUST] Trust prediction successful: {result['trust_score']}", file=sys.stderr)
+        timing.debug("[TRUST] Trust prediction successful: %s", result['trust_score'])
         
-        # Output JSON result
-        print(json.dumps(result))
+        # Output JSON result, with per-stage timings when requested
+        print(timing.dumps(result, timing.requested(policy_data)))
         
     except Exception as e:
         error_result = {
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Canonical artifact of the upsell model in model_upsell/
+
+upsell_ensemble_model.pkl has been written by different tools over time, so
+reading it may need joblib, plain pickle or a latin1 pickle. It is converted
+once into upsell_ensemble_model.joblib, stored uncompressed so its numpy
+arrays can be memory-mapped, with a JSON sidecar recording the scikit-learn
+version, the feature order and the class mapping. Runtime loads read the
+artifact through one path and never probe.
+
+The artifact is reconverted automatically when the .pkl changes (mtime and
+size, or failing that its SHA-256).
+
+Usage:
+    python upsell_artifact.py convert    # convert the .pkl now
+    python upsell_artifact.py info       # print the sidecar
+"""
+
+import os
+import sys
+import json
+import pickle
+import joblib
+import sklearn
+
+import timing
+from atomic_io import file_sha256, source_signature, write_atomic
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_upsell')
+SOURCE_PATH = os.path.join(MODEL_DIR, 'upsell_ensemble_model.pkl')
+ARTIFACT_VERSION = 1
+
+# Column order prepare_data_for_prediction builds for the model
+FEATURE_ORDER = ['CreditScore', 'Geography', 'Gender', 'Age', 'Tenure', 'Balance',
+                 'NumOfProducts', 'HasCrCard', 'IsActiveMember', 'EstimatedSalary', 'Exited']
+
+def artifact_paths(source_path=SOURCE_PATH):
+    """(artifact, sidecar) paths that belong to a source .pkl"""
+    stem = os.path.splitext(source_path)[0]
+    return stem + '.joblib', stem + '.json'
+
+def load_pickle(path, **options):
+    with open(path, 'rb') as f:
+        return pickle.load(f, **options)
+
+def load_source_model(source_path=SOURCE_PATH):
+    """Read the original .pkl, trying each format it has been written in"""
+    loaders = [
+        ('joblib', joblib.load),
+        ('pickle', load_pickle),
+        ('latin1 pickle', lambda path: load_pickle(path, encoding='latin1'))
+    ]
+    errors = []
+    for name, load in loaders:
+        try:
+            model = load(source_path)
+        except Exception as e:
+            errors.append(f"{name}: {str(e)}")
+            continue
+        if not hasattr(model, 'predict'):
+            raise ValueError(f"{source_path} does not hold a model with predict(): {type(model)}")
+        return model
+    raise ValueError(f"Could not read {source_path} ({'; '.join(errors)})")
+
+def model_metadata(model, source_path):
+    """Sidecar contents for a loaded model"""
+    classes = getattr(model, 'classes_', None)
+    feature_order = getattr(model, 'feature_names_in_', None)
+    return {
+        'artifact_version': ARTIFACT_VERSION,
+        'source': dict(source_signature(source_path, with_hash=True), path=os.path.basename(source_path)),
+        'sklearn_version': sklearn.__version__,
+        'model_sklearn_version': getattr(model, '_sklearn_version', None),
+        'model_type': f"{type(model).__module__}.{type(model).__name__}",
+        'feature_order': list(feature_order) if feature_order is not None else FEATURE_ORDER,
+        # Column of predict_proba -> class label
+        'classes': [c.item() if hasattr(c, 'item') else c for c in classes] if classes is not None else None
+    }
+
+def convert_model(source_path=SOURCE_PATH):
+    """Convert the .pkl into the artifact and sidecar; returns (model, metadata)
+
+    If the artifact cannot be written, the model read from the .pkl is
+    still returned and the conversion is retried on the next load.
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Model file not found at: {source_path}")
+    artifact_path, sidecar_path = artifact_paths(source_path)
+
+    model = load_source_model(source_path)
+    metadata = model_metadata(model, source_path)
+
+    def write_sidecar(path):
+        with open(path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+    try:
+        # compress=0 keeps arrays as raw buffers that joblib can memory-map
+        write_atomic(artifact_path, lambda path: joblib.dump(model, path, compress=0))
+        write_atomic(sidecar_path, write_sidecar)
+    except OSError as e:
+        # A read-only model directory still serves the model loaded from the .pkl
+        timing.warning("Upsell model artifact write error: %s", str(e))
+    return model, metadata
+
+def read_sidecar(source_path=SOURCE_PATH):
+    """Sidecar of the artifact for a .pkl, or None if there is none"""
+    sidecar_path = artifact_paths(source_path)[1]
+    if not os.path.exists(sidecar_path):
+        return None
+    with open(sidecar_path) as f:
+        return json.load(f)
+
+def is_fresh(metadata, source_path=SOURCE_PATH):
+    """Whether a sidecar still describes the .pkl on disk (or the .pkl is gone)"""
+    if metadata is None or metadata.get('artifact_version') != ARTIFACT_VERSION:
+        return False
+    if not os.path.exists(source_path):
+        # Deployments may ship only the converted artifact
+        return True
+    source = metadata.get('source', {})
+    current = source_signature(source_path)
+    if current['mtime_ns'] == source.get('mtime_ns') and current['size'] == source.get('size'):
+        return True
+    return current['size'] == source.get('size') and file_sha256(source_path) == source.get('sha256')
+
+def load_artifact(source_path=SOURCE_PATH):
+    """(model, metadata) from the canonical artifact, converting the .pkl first if needed"""
+    artifact_path = artifact_paths(source_path)[0]
+    metadata = read_sidecar(source_path)
+    if not os.path.exists(artifact_path) or not is_fresh(metadata, source_path):
+        timing.info("Converting %s to %s", source_path, artifact_path)
+        return convert_model(source_path)
+
+    if metadata.get('sklearn_version') != sklearn.__version__:
+        timing.warning("Upsell model artifact was written with scikit-learn %s, running %s",
+                       metadata.get('sklearn_version'), sklearn.__version__)
+    return joblib.load(artifact_path, mmap_mode='r'), metadata
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'convert'
+    if command == 'convert':
+        model, metadata = convert_model()
+        print(json.dumps(dict(metadata, artifact_path=artifact_paths()[0]), indent=2))
+        if read_sidecar() != metadata:
+            sys.exit(1)
+    elif command == 'info':
+        print(json.dumps(read_sidecar(), indent=2))
+    else:
+        raise SystemExit(__doc__)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Pandas-free feature encoding for single upsell predictions
+
+FeatureEncoder compiles a fitted ColumnTransformer, such as
+model_upsell/preprocessor.pkl or the preprocessing step of the upsell
+pipeline, into a gather of the numeric fields with scaler mean/scale
+vectors and a lookup table per one-hot field. encode() turns one input dict
+straight into a model input row without building a DataFrame: float32, the
+dtype the trees see, or float64 for estimators that take the
+ColumnTransformer's output as is. Rows are identical to the
+ColumnTransformer's output in that dtype (checked by benchmark_upsell.py
+features).
+
+StandardScaler, OneHotEncoder, 'passthrough' and 'drop' are supported;
+other transformers raise ValueError so callers can keep the pandas path.
+
+Usage:
+    python upsell_features.py [preprocessor.pkl]    # print the compiled layout
+"""
+
+import os
+import sys
+import json
+import joblib
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+
+from upsell_artifact import MODEL_DIR
+
+PREPROCESSOR_PATH = os.path.join(MODEL_DIR, 'preprocessor.pkl')
+
+def column_names(transformer, columns):
+    """Input column names a ColumnTransformer entry selects"""
+    names = transformer.feature_names_in_
+    if isinstance(columns, slice):
+        return list(names[columns])
+    columns = list(np.atleast_1d(columns))
+    if columns and isinstance(columns[0], (bool, np.bool_)):
+        return [name for name, selected in zip(names, columns) if selected]
+    return [names[column] if isinstance(column, (int, np.integer)) else column for column in columns]
+
+class FeatureEncoder:
+    """Fitted ColumnTransformer as lookup tables: input dict -> (1, n_features) row"""
+
+    def __init__(self, preprocessor, dtype=np.float32):
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise ValueError(f"Cannot compile {type(preprocessor).__name__}, expected a ColumnTransformer")
+        if not hasattr(preprocessor, 'feature_names_in_'):
+            raise ValueError("The preprocessor was fitted without column names")
+
+        # Numeric outputs: row[position] = (record[column] - offset) / scale
+        numeric_columns, positions, offsets, scales = [], [], [], []
+        # One-hot outputs: (column, {category: position}, known_only)
+        self.one_hot = []
+        position = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            columns = column_names(preprocessor, columns)
+            if isinstance(transformer, str) and transformer == 'drop' or not columns:
+                continue
+            if isinstance(transformer, str) and transformer == 'passthrough':
+                numeric_columns += columns
+                positions += range(position, position + len(columns))
+                offsets += [0.0] * len(columns)
+                scales += [1.0] * len(columns)
+                position += len(columns)
+            elif isinstance(transformer, StandardScaler):
+                numeric_columns += columns
+                positions += range(position, position + len(columns))
+                offsets += list(transformer.mean_) if transformer.with_mean else [0.0] * len(columns)
+                scales += list(transformer.scale_) if transformer.with_std else [1.0] * len(columns)
+                position += len(columns)
+            elif isinstance(transformer, OneHotEncoder):
+                if getattr(transformer, '_infrequent_enabled', False):
+                    raise ValueError(f"One-hot step {name!r} groups infrequent categories")
+                drop_idx = transformer.drop_idx_
+                for i, (column, categories) in enumerate(zip(columns, transformer.categories_)):
+                    dropped = None if drop_idx is None else drop_idx[i]
+                    # The dropped category is known but has no output
+                    table = {}
+                    for j, category in enumerate(categories):
+                        category = category.item() if hasattr(category, 'item') else category
+                        if j == dropped:
+                            table[category] = None
+                        else:
+                            table[category] = position
+                            position += 1
+                    self.one_hot.append((column, table, transformer.handle_unknown == 'error'))
+            else:
+                raise ValueError(f"Cannot compile {name!r} step {type(transformer).__name__}")
+
+        self.numeric_columns = numeric_columns
+        self.positions = np.asarray(positions, dtype=np.intp)
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.n_features = position
+        self.input_columns = list(preprocessor.feature_names_in_)
+        self.dtype = dtype
+
+    @classmethod
+    def from_model(cls, model, dtype=np.float32):
+        """Encoder for the preprocessing of a fitted pipeline (ColumnTransformer + final estimator)"""
+        if not isinstance(model, Pipeline) or len(model.steps) != 2:
+            raise ValueError("Expected a pipeline of one preprocessing step and the estimator")
+        return cls(model[0], dtype)
+
+    def encode(self, record):
+        """(1, n_features) model input for one dict of input fields"""
+        row = np.zeros(self.n_features)
+        numeric = np.array([record[column] for column in self.numeric_columns], dtype=np.float64)
+        row[self.positions] = (numeric - self.offsets) / self.scales
+        for column, table, known_only in self.one_hot:
+            value = record[column]
+            if value in table:
+                if table[value] is not None:
+                    row[table[value]] = 1.0
+            elif known_only:
+                raise ValueError(f"Found unknown category {value!r} in column {column!r}")
+        return row.astype(self.dtype, copy=False)[None, :]
+
+    def layout(self):
+        """Output columns and their source, for inspection"""
+        columns = [None] * self.n_features
+        for column, position, offset, scale in zip(self.numeric_columns, self.positions, self.offsets, self.scales):
+            columns[position] = {'column': column, 'offset': float(offset), 'scale': float(scale)}
+        for column, table, _ in self.one_hot:
+            for category, position in table.items():
+                if position is not None:
+                    columns[position] = {'column': column, 'category': category}
+        return columns
+
+def load_encoder(path=PREPROCESSOR_PATH, dtype=np.float32):
+    """FeatureEncoder for a preprocessor saved on its own"""
+    return FeatureEncoder(joblib.load(path), dtype)
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else PREPROCESSOR_PATH
+    encoder = load_encoder(path)
+    print(json.dumps({'input_columns': encoder.input_columns, 'n_features': encoder.n_features,
+                      'features': encoder.layout()}, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
@@ -1,98 +1,150 @@
 #This is upsell_predictor.py
 
+import timing  # first, so its import time marks the process start
 import sys
 import json
-import joblib
 import pandas as pd
 import numpy as np
 import os
+import time
+import argparse
 import traceback
+import collections
+import multiprocessing
+from upsell_artifact import load_artifact, FEATURE_ORDER, SOURCE_PATH
+from upsell_features import FeatureEncoder
 
-def load_model():
-    """Load the upselling model"""
+# Model input columns: (type, default when the field is missing)
+FEATURE_DEFAULTS = {
+    'CreditScore': (int, 600),
+    'Geography': (str, 'France'),
+    'Gender': (str, 'Male'),
+    'Age': (int, 30),
+    'Tenure': (int, 5),
+    'Balance': (float, 50000),
+    'NumOfProducts': (int, 2),
+    'HasCrCard': (int, 0),
+    'IsActiveMember': (int, 1),
+    'EstimatedSalary': (float, 100000),
+    'Exited': (int, 0)
+}
+
+# Recommendations mapping based on model classes
+RECOMMENDATIONS = {
+    0: 'Cross-sell opportunity: Suggest savings or credit products with low fees',
+    1: 'Engagement incentive: Personalized offers or loyalty points for early tenure engagement',
+    2: 'General offer: Reward program or tailored financial review',
+    3: 'Long-tenured customer: Recommend premium financial products or exclusive memberships',
+    4: 'Mid-term tenure: Suggest insurance, fixed deposits, or personal loans with incentives',
+    5: 'Premium policy offer: Investment or wealth management plans',
+    6: 'Retention offer: Special cashback or reduced fees to retain the customer'
+}
+
+def class_from_label(label):
+    """Recommendation class of a string label, from keywords in it"""
+    pred_str = str(label).lower()
+    if 'cross-sell' in pred_str or 'savings' in pred_str:
+        return 0
+    elif 'engagement' in pred_str or 'early tenure' in pred_str:
+        return 1
+    elif 'general offer' in pred_str:
+        return 2
+    elif 'long-tenured' in pred_str or 'premium' in pred_str:
+        return 3
+    elif 'mid-term' in pred_str or 'insurance' in pred_str:
+        return 4
+    elif 'investment' in pred_str or 'wealth' in pred_str:
+        return 5
+    elif 'retention' in pred_str:
+        return 6
+    else:
+        return 2  # default to general offer
+
+def label_class(label):
+    """Recommendation class of one model label: numbers as they are, strings by keyword"""
+    if isinstance(label, (bool, int, float, complex, np.number)):
+        return int(getattr(label, 'real', label))
+    return class_from_label(label)
+
+def class_table(labels):
+    """Recommendation class of every label, e.g. of each predict_proba column from classes_"""
+    return np.array([label_class(label) for label in labels], dtype=np.int64)
+
+# 'numpy' evaluates the trees with upsell_tree_engine instead of scikit-learn
+ENGINE = os.environ.get('UPSELL_ENGINE', 'sklearn').lower()
+
+_MODELS = {}
+
+@timing.timed('model_load')
+def load_model(source_path=SOURCE_PATH):
+    """Load the upselling model from its canonical artifact, once per process"""
+    if source_path in _MODELS:
+        return _MODELS[source_path]
     try:
-        # Print environment info
-        import sklearn
-        import platform
-        print(f"Python version: {platform.python_version()}", file=sys.stderr)
-        print(f"scikit-learn version: {sklearn.__version__}", file=sys.stderr)
-        
-        model_path = os.path.join(os.path.dirname(__file__), 'model_upsell', 'upsell_ensemble_model.pkl')
-        print(f"Loading model from: {model_path}", file=sys.stderr)
-        
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"Model file not found at: {model_path}")
-        
-        # Try loading with different pickle protocols
-        for protocol in ['highest_protocol', 'default', 'compatibility']:
+        pipeline, metadata = load_artifact(source_path)
+        timing.debug("Model loaded (%s, scikit-learn %s)", metadata.get('model_type'), metadata.get('sklearn_version'))
+        if ENGINE == 'numpy':
+            from upsell_tree_engine import export_model
             try:
-                if protocol == 'highest_protocol':
-                    pipeline = joblib.load(model_path)
-                elif protocol == 'default':
-                    import pickle
-                    with open(model_path, 'rb') as f:
-                        pipeline = pickle.load(f)
-                else:
-                    import pickle
-                    with open(model_path, 'rb') as f:
-                        pipeline = pickle.load(f, encoding='latin1')
-                
-                # Verify the loaded object is a proper scikit-learn model/pipeline
-                if not hasattr(pipeline, 'predict'):
-                    print(f"Warning: Loaded object is not a valid scikit-learn model/pipeline. Type: {type(pipeline)}", file=sys.stderr)
-                    # If it's a numpy array, try to wrap it in a simple predictor
-                    if isinstance(pipeline, np.ndarray):
-                        class SimplePredictor:
-                            def __init__(self, predictions):
-                                self.predictions = predictions
-                            
-                            def predict(self, X):
-                                return self.predictions
-                            
-                            def predict_proba(self, X):
-                                # Create a simple probability distribution
-                                n_classes = len(np.unique(self.predictions))
-                                probs = np.zeros((len(X), n_classes))
-                                for i, pred in enumerate(self.predictions):
-                                    probs[i, pred] = 1.0
-                                return probs
-                        
-                        pipeline = SimplePredictor(pipeline)
-                
-                print(f"Model loaded successfully using {protocol} protocol", file=sys.stderr)
-                print(f"Model type: {type(pipeline)}", file=sys.stderr)
-                return pipeline
-            except Exception as e:
-                print(f"Failed to load with {protocol} protocol: {str(e)}", file=sys.stderr)
-                continue
-                
-        raise Exception("Failed to load model with any available protocol")
+                pipeline = export_model(pipeline)
+            except ValueError as e:
+                timing.warning("NumPy engine unavailable, using scikit-learn: %s", e)
+        _MODELS[source_path] = pipeline
+        return pipeline
     except Exception as e:
         error_msg = f"Failed to load model: {str(e)}\nTraceback:\n{traceback.format_exc()}"
         print(error_msg, file=sys.stderr)
         raise Exception(error_msg)
 
+_ROW_MODELS = {}
+_CLASS_TABLES = {}
+
+def class_mapping(source_path=SOURCE_PATH):
+    """predict_proba column -> recommendation class for a model, or None without classes_"""
+    if source_path not in _CLASS_TABLES:
+        classes = getattr(load_model(source_path), 'classes_', None)
+        _CLASS_TABLES[source_path] = class_table(classes) if classes is not None else None
+    return _CLASS_TABLES[source_path]
+
+def row_model(source_path=SOURCE_PATH):
+    """(FeatureEncoder, final estimator) scoring one customer without pandas, or None
+
+    None when the model's preprocessing cannot be compiled; callers then go
+    through prepare_data_for_prediction and the full pipeline.
+    """
+    if source_path not in _ROW_MODELS:
+        model = load_model(source_path)
+        # A TreeEnsemble keeps the pipeline it was exported from
+        pipeline = getattr(model, 'model', model)
+        try:
+            if hasattr(model, 'without_preprocessing'):
+                # The NumPy engine compares float32 features, like scikit-learn's trees
+                encoder, estimator = FeatureEncoder.from_model(pipeline), model.without_preprocessing()
+            else:
+                # Exactly the ColumnTransformer's float64 output, whatever the estimator
+                encoder, estimator = FeatureEncoder.from_model(pipeline, np.float64), pipeline[-1]
+            _ROW_MODELS[source_path] = (encoder, estimator)
+        except ValueError as e:
+            timing.info("Feature fast path unavailable, using pandas: %s", e)
+            _ROW_MODELS[source_path] = None
+    return _ROW_MODELS[source_path]
+
+def model_input(user_data):
+    """Model input fields of a customer, with defaults and types applied"""
+    return {
+        column: cast(user_data.get(column, default))
+        for column, (cast, default) in FEATURE_DEFAULTS.items()
+    }
+
+@timing.timed('feature_prep')
 def prepare_data_for_prediction(user_data):
     """Prepare user data for model prediction"""
     try:
         # Define the expected column order for the model
-        expected_columns = ['CreditScore', 'Geography', 'Gender', 'Age', 'Tenure', 'Balance', 
-                           'NumOfProducts', 'HasCrCard', 'IsActiveMember', 'EstimatedSalary', 'Exited']
+        expected_columns = FEATURE_ORDER
         
         # Map user data to model format
-        model_data = {
-            'CreditScore': int(user_data.get('CreditScore', 600)),
-            'Geography': str(user_data.get('Geography', 'France')),
-            'Gender': str(user_data.get('Gender', 'Male')),
-            'Age': int(user_data.get('Age', 30)),
-            'Tenure': int(user_data.get('Tenure', 5)),
-            'Balance': float(user_data.get('Balance', 50000)),
-            'NumOfProducts': int(user_data.get('NumOfProducts', 2)),
-            'HasCrCard': int(user_data.get('HasCrCard', 0)),
-            'IsActiveMember': int(user_data.get('IsActiveMember', 1)),
-            'EstimatedSalary': float(user_data.get('EstimatedSalary', 100000)),
-            'Exited': int(user_data.get('Exited', 0))
-        }
+        model_data = model_input(user_data)
         
         # Create DataFrame with expected column order
         df = pd.DataFrame([model_data], columns=expected_columns)
@@ -102,92 +154,56 @@ def prepare_data_for_prediction(user_data):
     except Exception as e:
         raise Exception(f"Data preparation error: {str(e)}")
 
+@timing.timed('feature_prep')
+def encode_for_prediction(encoder, user_data):
+    """prepare_data_for_prediction's row, already preprocessed, as an array"""
+    try:
+        return encoder.encode(model_input(user_data))
+    except Exception as e:
+        raise Exception(f"Data preparation error: {str(e)}")
+
 def make_upselling_prediction(user_data):
     """Make upselling prediction for user using ML model only"""
     try:
         # Load model (required - no fallback)
         pipeline = load_model()
         
-        # Prepare data for prediction
-        df = prepare_data_for_prediction(user_data)
-        
-        # Make prediction
-        raw_prediction = pipeline.predict(df)
-        
-        # Ensure we get a numeric prediction
-        if isinstance(raw_prediction, np.ndarray):
-            if raw_prediction.dtype.kind in 'fc':  # float or complex
-                prediction_class = int(raw_prediction[0])
-            elif raw_prediction.dtype.kind in 'iu':  # integer or unsigned integer
-                prediction_class = int(raw_prediction[0])
-            else:
-                # Handle string predictions - extract numeric part or map to category
-                pred_str = str(raw_prediction[0])
-                # Try to find category mapping based on string content
-                if 'cross-sell' in pred_str.lower() or 'savings' in pred_str.lower():
-                    prediction_class = 0
-                elif 'engagement' in pred_str.lower() or 'early tenure' in pred_str.lower():
-                    prediction_class = 1
-                elif 'general offer' in pred_str.lower():
-                    prediction_class = 2
-                elif 'long-tenured' in pred_str.lower() or 'premium' in pred_str.lower():
-                    prediction_class = 3
-                elif 'mid-term' in pred_str.lower() or 'insurance' in pred_str.lower():
-                    prediction_class = 4
-                elif 'investment' in pred_str.lower() or 'wealth' in pred_str.lower():
-                    prediction_class = 5
-                elif 'retention' in pred_str.lower():
-                    prediction_class = 6
-                else:
-                    prediction_class = 2  # default to general offer
+        # Prepare data for prediction: encoded straight to model input when the
+        # preprocessing compiles, otherwise a DataFrame for the full pipeline
+        fast_path = row_model()
+        if fast_path is not None:
+            encoder, pipeline = fast_path
+            df = encode_for_prediction(encoder, user_data)
         else:
-            # Handle single value prediction
-            if isinstance(raw_prediction, (int, np.integer)):
-                prediction_class = int(raw_prediction)
-            elif isinstance(raw_prediction, (float, np.floating)):
-                prediction_class = int(raw_prediction)
-            else:
-                # String prediction - map to category
-                pred_str = str(raw_prediction)
-                if 'cross-sell' in pred_str.lower() or 'savings' in pred_str.lower():
-                    prediction_class = 0
-                elif 'engagement' in pred_str.lower() or 'early tenure' in pred_str.lower():
-                    prediction_class = 1
-                elif 'general offer' in pred_str.lower():
-                    prediction_class = 2
-                elif 'long-tenured' in pred_str.lower() or 'premium' in pred_str.lower():
-                    prediction_class = 3
-                elif 'mid-term' in pred_str.lower() or 'insurance' in pred_str.lower():
-                    prediction_class = 4
-                elif 'investment' in pred_str.lower() or 'wealth' in pred_str.lower():
-                    prediction_class = 5
-                elif 'retention' in pred_str.lower():
-                    prediction_class = 6
-                else:
-                    prediction_class = 2  # default to general offer
+            df = prepare_data_for_prediction(user_data)
         
-        # Get prediction probabilities
+        # One model pass: the predicted class is the most probable column, as
+        # the model's own predict() picks it
+        class_ids = class_mapping()
         try:
-            prediction_proba = pipeline.predict_proba(df)
+            with timing.span('inference'):
+                prediction_proba = pipeline.predict_proba(df)
             probabilities = prediction_proba[0].tolist() if len(prediction_proba) > 0 else []
-        except:
-            # If predict_proba fails, create dummy probabilities based on prediction
-            probabilities = [0.0] * 7
-            probabilities[prediction_class] = 1.0
+        except Exception:
+            prediction_proba = None
+        
+        if prediction_proba is not None and len(prediction_proba) > 0 and class_ids is not None:
+            prediction_class = int(class_ids[int(np.argmax(prediction_proba[0]))])
+        else:
+            # No probabilities or classes_ to map them: ask the model for its class
+            with timing.span('inference'):
+                raw_prediction = pipeline.predict(df)
+            prediction_class = int(prediction_classes(np.ravel(raw_prediction))[0])
+            if prediction_proba is None:
+                # If predict_proba fails, create dummy probabilities based on prediction
+                probabilities = [0.0] * 7
+                probabilities[prediction_class] = 1.0
         
         if not probabilities:
             raise Exception("Model failed to generate prediction probabilities")
         
         # Recommendations mapping based on model classes
-        recommendations_mapping = {
-            0: 'Cross-sell opportunity: Suggest savings or credit products with low fees',
-            1: 'Engagement incentive: Personalized offers or loyalty points for early tenure engagement',
-            2: 'General offer: Reward program or tailored financial review',
-            3: 'Long-tenured customer: Recommend premium financial products or exclusive memberships',
-            4: 'Mid-term tenure: Suggest insurance, fixed deposits, or personal loans with incentives',
-            5: 'Premium policy offer: Investment or wealth management plans',
-            6: 'Retention offer: Special cashback or reduced fees to retain the customer'
-        }
+        recommendations_mapping = RECOMMENDATIONS
         
         # Create recommendations with confidence
         recommendations_with_confidence = []
@@ -253,7 +269,221 @@ def make_upselling_prediction(user_data):
             "model_loaded": False
         }
 
+def prepare_batch(customers):
+    """Model input for a DataFrame of customers, with prepare_data_for_prediction's defaults and types
+
+    Returns the inputs and a Series of per-customer errors, None for valid
+    rows. A row with a value that is not a number, or not a finite one for
+    an integer column, gets the error and defaults in place of such values.
+    """
+    columns = {}
+    errors = pd.Series(None, index=customers.index, dtype=object)
+    for column, (cast, default) in FEATURE_DEFAULTS.items():
+        if column not in customers.columns:
+            values = pd.Series(default, index=customers.index)
+        else:
+            values = customers[column].fillna(default)
+        if cast is str:
+            columns[column] = values.astype(str)
+        else:
+            numbers = pd.to_numeric(values, errors='coerce')
+            invalid = numbers.isna() if cast is float else ~np.isfinite(numbers.astype(float))
+            if invalid.any():
+                # Report the first bad field of each row
+                first = invalid & errors.isna()
+                errors[first] = [f"Data preparation error: invalid {column} value {value!r}" for value in values[first]]
+                numbers = numbers.where(~invalid, default)
+            columns[column] = numbers.astype(np.int64) if cast is int else numbers.astype(float)
+    return pd.DataFrame(columns, columns=FEATURE_ORDER), errors
+
+def prediction_classes(raw_predictions):
+    """Recommendation class of each of an array of predict() labels"""
+    raw_predictions = np.asarray(raw_predictions)
+    if raw_predictions.dtype.kind in 'biufc':
+        return raw_predictions.real.astype(np.int64)
+    codes, labels = pd.factorize(raw_predictions)
+    return class_table(labels)[codes]
+
+def score_batch(customers, source_path=SOURCE_PATH):
+    """Score a DataFrame of customers; one output row per customer
+
+    Columns: id, success, prediction_class, recommendation,
+    churn_probability, probability_<class> for every class of the model, and
+    error. Customers whose input cannot be prepared get success False, the
+    error as make_upselling_prediction reports it, and nulls.
+    """
+    pipeline = load_model(source_path)
+    features, errors = prepare_batch(customers)
+    valid = errors.isna().to_numpy()
+    
+    # One model pass, as in make_upselling_prediction
+    class_ids = class_mapping(source_path)
+    try:
+        probabilities = np.asarray(pipeline.predict_proba(features), dtype=float)
+    except Exception:
+        probabilities = None
+    if probabilities is not None and class_ids is not None:
+        classes = class_ids[probabilities.argmax(axis=1)]
+    else:
+        classes = prediction_classes(pipeline.predict(features))
+    if probabilities is None:
+        # Same fallback as the single-customer path: all weight on the predicted class
+        probabilities = np.zeros((len(classes), len(RECOMMENDATIONS)))
+        probabilities[np.arange(len(classes)), np.clip(classes, 0, len(RECOMMENDATIONS) - 1)] = 1.0
+    
+    n_classes = probabilities.shape[1]
+    in_range = (classes >= 0) & (classes < n_classes)
+    churn_probability = np.where(in_range, probabilities[np.arange(len(classes)), np.clip(classes, 0, n_classes - 1)], 0.0)
+    recommendation_table = np.array([RECOMMENDATIONS.get(i) for i in range(max(n_classes, len(RECOMMENDATIONS)))], dtype=object)
+    recommendations = np.where((classes >= 0) & (classes < len(recommendation_table)),
+                               recommendation_table[np.clip(classes, 0, len(recommendation_table) - 1)], None)
+    
+    # Rows with invalid input were scored on defaults; blank them out
+    ids = customers['id'].to_numpy() if 'id' in customers.columns else customers.index.to_numpy()
+    result = pd.DataFrame({
+        'id': ids,
+        'success': valid,
+        'prediction_class': pd.array(classes, dtype='Int64'),
+        'recommendation': np.where(valid, recommendations, None),
+        'churn_probability': np.where(valid, churn_probability, np.nan)
+    })
+    result.loc[~valid, 'prediction_class'] = pd.NA
+    for i in range(n_classes):
+        result[f'probability_{i}'] = np.where(valid, probabilities[:, i], np.nan)
+    result['error'] = ("ML Prediction error: " + errors.astype('string')).to_numpy()
+    return result
+
+def read_customer_chunks(path, input_format, chunk_size):
+    """Yield DataFrames of up to chunk_size customers from CSV, JSONL or Parquet
+
+    Rows without an 'id' column are numbered by their position in the file.
+    """
+    if input_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input requires pyarrow (pip install pyarrow)")
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size))
+    elif input_format == 'csv':
+        chunks = pd.read_csv(sys.stdin if path == '-' else path, chunksize=chunk_size)
+    else:
+        chunks = pd.read_json(sys.stdin if path == '-' else path, lines=True, chunksize=chunk_size)
+    
+    start = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+class ResultWriter:
+    """Streams scored chunks to JSONL (default) or Parquet"""
+    
+    def __init__(self, path, output_format):
+        self.path = path
+        self.output_format = output_format
+        self._parquet = None
+        if output_format == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+            self._pyarrow = pyarrow
+        else:
+            self._stream = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8')
+    
+    def write(self, results):
+        if self.output_format == 'parquet':
+            table = self._pyarrow.Table.from_pandas(results, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = self._pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            # json.dumps writes floats at repr precision, so probabilities
+            # round-trip; to_json's double_precision counts decimal places
+            records = results.astype(object).where(results.notna(), None).to_dict('records')
+            self._stream.write(''.join(json.dumps(record) + '\n' for record in records))
+            if not self._stream.isatty():
+                self._stream.flush()
+    
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        elif self.output_format != 'parquet' and self._stream is not sys.stdout:
+            self._stream.close()
+
+def _score_chunk(task):
+    """Pool worker: (chunk, model path) -> scored chunk; the model loads once per worker"""
+    chunk, source_path = task
+    return score_batch(chunk, source_path)
+
+def pool_results(pool, tasks, window):
+    """pool.imap(_score_chunk, tasks) with at most window tasks read ahead
+
+    Pool.imap consumes its whole input up front; this pulls the next task
+    only after the oldest result has been yielded, so memory stays bounded
+    by the window rather than the input size.
+    """
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(pool.apply_async(_score_chunk, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+def run_batch(argv):
+    """Command-line entry point for batch upsell scoring"""
+    parser = argparse.ArgumentParser(prog='upsell_predictor.py --batch',
+                                     description='Score a CSV/JSONL/Parquet file of customers for upsell offers')
+    parser.add_argument('input', help="CSV, JSONL or Parquet input file, or '-' for JSONL on stdin")
+    parser.add_argument('--output', default='-', help="Output file (default: JSONL on stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl', 'parquet'], help="Input format (default: from file extension)")
+    parser.add_argument('--output-format', choices=['jsonl', 'parquet'], help="Output format (default: from file extension)")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Customers scored per model call")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes; chunks are sharded across them")
+    parser.add_argument('--model', default=SOURCE_PATH, help="Upsell model .pkl (its converted artifact is used)")
+    args = parser.parse_args(argv)
+    
+    extension = os.path.splitext(args.input.lower())[1]
+    input_format = args.format or {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet'}.get(extension, 'jsonl')
+    output_format = args.output_format or ('parquet' if args.output.lower().endswith(('.parquet', '.pq')) else 'jsonl')
+    if output_format == 'parquet' and args.output == '-':
+        parser.error("Parquet output needs an --output file")
+    
+    # Convert or load the artifact once before any worker starts
+    load_model(args.model)
+    
+    writer = ResultWriter(args.output, output_format)
+    chunks = read_customer_chunks(args.input, input_format, args.chunk_size)
+    start = time.perf_counter()
+    count = 0
+    pool = None
+    try:
+        if args.workers > 1:
+            pool = multiprocessing.Pool(args.workers)
+            scored = pool_results(pool, ((chunk, args.model) for chunk in chunks), 2 * args.workers)
+        else:
+            scored = (score_batch(chunk, args.model) for chunk in chunks)
+        
+        for results in scored:
+            writer.write(results)
+            count += len(results)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        writer.close()
+    
+    elapsed = time.perf_counter() - start
+    timing.info("Scored %d customers in %.2fs (%.0f rows/s, %d workers)",
+                count, elapsed, count / elapsed if elapsed else 0.0, args.workers)
+
 def main():
+    timing.record_import()
+    if len(sys.argv) >= 2 and sys.argv[1] == '--batch':
+        run_batch(sys.argv[2:])
+        return
     try:
         # Read input data from command line arguments or stdin
         if len(sys.argv) > 1:
@@ -272,8 +502,8 @@ def main():
         # Make upselling prediction using ML model only
         result = make_upselling_prediction(input_data)
         
-        # Output result
-        print(json.dumps(result))
+        # Output result, with per-stage timings when requested
+        print(timing.dumps(result, timing.requested(input_data)))
         
     except Exception as e:
         error_result = {
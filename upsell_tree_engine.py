@@ -0,0 +1,221 @@
+"""Pure-NumPy inference for the upsell tree ensemble
+
+export_model() flattens the fitted trees of a model into contiguous node
+arrays (feature, threshold, children, leaf values), and
+TreeEnsemble.predict_proba() walks every tree for a whole batch at once,
+one depth level per step, instead of going through scikit-learn's per-tree
+Python dispatch. Probabilities match pipeline.predict_proba within float
+tolerance: inputs are cast to float32 and compared with the float64
+thresholds, as scikit-learn's trees do.
+
+The gain is in per-call overhead: a single customer is scored many times
+faster, while large batches are still faster through scikit-learn's
+compiled tree traversal (see benchmark_upsell.py engine).
+
+Supported final estimators are decision trees, random/extra-trees forests,
+gradient boosting and soft-voting ensembles of those. Anything else raises
+ValueError so callers can keep the scikit-learn model.
+"""
+
+import copy
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier, GradientBoostingClassifier, VotingClassifier
+from sklearn.dummy import DummyClassifier
+from scipy.special import expit, softmax
+
+# Upper bound on trees x rows x outputs of leaf values gathered at once
+BLOCK_VALUES = 1 << 22
+
+class TreeGroup:
+    """Trees flattened into one set of node arrays, evaluated together"""
+
+    def __init__(self, trees, values):
+        # trees: sklearn Tree objects; values: per tree, leaf values by node (n_nodes or n_nodes x n_outputs)
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        self.roots = offsets[:-1].astype(np.intp)
+        self.depth = max(tree.max_depth for tree in trees)
+
+        nodes = np.arange(offsets[-1], dtype=np.intp)
+        self.is_leaf = np.concatenate([tree.children_left == -1 for tree in trees])
+        left = np.concatenate([tree.children_left + offset for tree, offset in zip(trees, self.roots)])
+        right = np.concatenate([tree.children_right + offset for tree, offset in zip(trees, self.roots)])
+        # children[2 * node + went_right]; leaves point at themselves
+        self.children = np.column_stack([np.where(self.is_leaf, nodes, left),
+                                         np.where(self.is_leaf, nodes, right)]).astype(np.intp).ravel()
+        self.feature = np.where(self.is_leaf, 0, np.concatenate([tree.feature for tree in trees])).astype(np.intp)
+        self.threshold = np.concatenate([tree.threshold for tree in trees]).astype(np.float64)
+        self.missing_left = np.concatenate([
+            np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count)), dtype=bool) for tree in trees
+        ]) & ~self.is_leaf
+        self.values = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def leaves(self, X):
+        """(n_trees, n_samples) leaf node every row reaches in every tree
+
+        All (tree, row) pairs step down one level at a time. Leaves point at
+        themselves, so finished pairs can keep stepping; they are dropped
+        from the working set once they are at least half of it.
+        """
+        n_samples, n_features = X.shape
+        X = X.astype(np.float64).ravel()
+        with_missing = bool(np.isnan(X).any())
+        # Tree-major, so neighbouring pairs read the same tree's nodes
+        node = np.repeat(self.roots, n_samples)
+        row_start = np.tile(np.arange(n_samples, dtype=np.intp) * n_features, self.n_trees)
+        leaves = node.copy()
+        pair = np.arange(len(node), dtype=np.intp)
+        for _ in range(self.depth):
+            x = X.take(row_start + self.feature.take(node))
+            went_right = ~(x <= self.threshold.take(node))
+            if with_missing:
+                went_right &= ~(np.isnan(x) & self.missing_left.take(node))
+            node = self.children.take(2 * node + went_right)
+            done = self.is_leaf.take(node)
+            if 2 * np.count_nonzero(done) >= len(node):
+                leaves[pair[done]] = node[done]
+                running = ~done
+                node, row_start, pair = node[running], row_start[running], pair[running]
+                if not len(node):
+                    break
+        leaves[pair] = node
+        return leaves.reshape(self.n_trees, n_samples)
+
+    def leaf_values(self, X):
+        """(n_trees, n_samples[, n_outputs]) value of the leaf each row reaches in each tree"""
+        return self.values.take(self.leaves(X), axis=0)
+
+    def block_rows(self):
+        """Rows per block that keep leaf_values() within BLOCK_VALUES"""
+        return max(1, BLOCK_VALUES // (self.n_trees * self.values[0].size))
+
+def in_blocks(function, X, block_rows):
+    """function(X) computed over row blocks and stacked"""
+    if len(X) <= block_rows:
+        return function(X)
+    return np.concatenate([function(X[start:start + block_rows]) for start in range(0, len(X), block_rows)])
+
+def tree_probabilities(tree):
+    """Leaf class proportions of a classification tree, as DecisionTreeClassifier.predict_proba returns them"""
+    value = tree.value[:, 0, :]
+    normalizer = value.sum(axis=1, keepdims=True)
+    normalizer[normalizer == 0.0] = 1.0
+    return value / normalizer
+
+class ForestModel:
+    """Mean class probabilities of classification trees (a forest, or one tree)"""
+
+    def __init__(self, estimators):
+        for estimator in estimators:
+            if estimator.n_outputs_ != 1:
+                raise ValueError("Multi-output trees are not supported")
+        trees = [estimator.tree_ for estimator in estimators]
+        self.group = TreeGroup(trees, [tree_probabilities(tree) for tree in trees])
+        self.n_trees = self.group.n_trees
+
+    def predict_proba(self, X):
+        total = in_blocks(lambda block: self.group.leaf_values(block).sum(axis=0), X, self.group.block_rows())
+        return total / self.group.n_trees
+
+class GradientBoostingModel:
+    """Gradient boosting: prior + learning_rate * sum of regression tree values, through the loss link"""
+
+    def __init__(self, model):
+        if getattr(model, 'loss', 'log_loss') not in ('log_loss', 'deviance'):
+            raise ValueError(f"Gradient boosting loss {model.loss!r} is not supported")
+        self.n_stages, self.n_outputs = model.estimators_.shape
+        if model.init_ == 'zero':
+            self.init = np.zeros(self.n_outputs)
+        elif isinstance(model.init_, DummyClassifier):
+            # A prior is the same raw score for every row
+            self.init = np.asarray(model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32)))[0]
+        else:
+            raise ValueError(f"Gradient boosting init {type(model.init_).__name__} is not supported")
+
+        # Stage by stage; tree k of a stage adds to raw score k
+        trees = [estimator.tree_ for estimator in model.estimators_.ravel()]
+        self.group = TreeGroup(trees, [model.learning_rate * tree.value[:, 0, 0] for tree in trees])
+        self.n_trees = self.group.n_trees
+
+    def raw_scores(self, X):
+        leaf_values = self.group.leaf_values(X).reshape(self.n_stages, self.n_outputs, len(X))
+        return leaf_values.sum(axis=0).T
+
+    def predict_proba(self, X):
+        raw = self.init + in_blocks(self.raw_scores, X, self.group.block_rows())
+        if self.n_outputs == 1:
+            positive = expit(raw[:, 0])
+            return np.column_stack([1.0 - positive, positive])
+        return softmax(raw, axis=1)
+
+class SoftVotingModel:
+    """Weighted mean of the member models' probabilities"""
+
+    def __init__(self, model):
+        if model.voting != 'soft':
+            raise ValueError("Only soft voting has probabilities to average")
+        self.members = [compile_estimator(estimator) for estimator in model.estimators_]
+        self.weights = model._weights_not_none
+        self.n_trees = sum(member.n_trees for member in self.members)
+
+    def predict_proba(self, X):
+        return np.average([member.predict_proba(X) for member in self.members], axis=0, weights=self.weights)
+
+def compile_estimator(estimator):
+    """NumPy counterpart of a fitted classifier; ValueError if it is not a supported tree model"""
+    if isinstance(estimator, (RandomForestClassifier, ExtraTreesClassifier)):
+        return ForestModel(estimator.estimators_)
+    if isinstance(estimator, DecisionTreeClassifier):
+        return ForestModel([estimator])
+    if isinstance(estimator, GradientBoostingClassifier):
+        return GradientBoostingModel(estimator)
+    if isinstance(estimator, VotingClassifier):
+        return SoftVotingModel(estimator)
+    raise ValueError(f"No NumPy engine for {type(estimator).__name__}")
+
+class TreeEnsemble:
+    """Drop-in for a fitted pipeline's predict/predict_proba using the NumPy engine
+
+    Preprocessing steps before the final estimator still run through
+    scikit-learn; only the trees are replaced.
+    """
+
+    def __init__(self, model):
+        if isinstance(model, Pipeline):
+            self.preprocessor = model[:-1] if len(model.steps) > 1 else None
+            estimator = model[-1]
+        else:
+            self.preprocessor = None
+            estimator = model
+        self.engine = compile_estimator(estimator)
+        self.classes_ = estimator.classes_
+        self.model = model
+
+    def without_preprocessing(self):
+        """The same engine taking already preprocessed rows"""
+        estimator = copy.copy(self)
+        estimator.preprocessor = None
+        return estimator
+
+    def transform(self, X):
+        """Model input as a float32 matrix, the way scikit-learn's trees see it"""
+        if self.preprocessor is not None:
+            X = self.preprocessor.transform(X)
+        if hasattr(X, 'toarray'):
+            X = X.toarray()
+        return np.asarray(X, dtype=np.float32)
+
+    def predict_proba(self, X):
+        return self.engine.predict_proba(self.transform(X))
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+def export_model(model):
+    """TreeEnsemble for a fitted model or pipeline; ValueError if its estimator is not supported"""
+    return TreeEnsemble(model)